@@ -30,7 +30,7 @@ enum MatchMethod: String, Codable {
 //
 // MATCHING PIPELINE:
 // 1. Clean ingredient name (remove cooking methods, adjectives)
-// 2. Check shortcuts dictionary (instant match for common foods)
+// 2. Check shortcuts dictionary, then the generated ingredient_shortcuts table
 // 3. Search USDA database with LIKE queries
 // 4. Send candidates to GeminiReranker for semantic selection
 //
@@ -69,6 +69,10 @@ enum MatchMethod: String, Codable {
 // 6. Key = cleaned name (lowercase, no cooking methods/adjectives)
 // 7. Value = USDA fdcId (verified to return correct micronutrients)
 //
+// Beyond the dictionary, evaluation/build_shortcut_table.py resolves observed
+// ingredient names in batch and writes them to the ingredient_shortcuts table
+// in usda_nutrients.db; the dictionary wins when both have a name.
+//
 
 /// Service for fuzzy matching ingredient names to local USDA database
 class FuzzyMatchingService {
@@ -284,6 +288,9 @@ class FuzzyMatchingService {
             } else {
                 print("  ⚠️  Shortcut fdcId \(fdcId) not found in database (cleanup needed)")
             }
+        } else if let food = LocalUSDAService.shared.getShortcut(name: cleanedName) {
+            print("  ⚡ Shortcut match (table): '\(food.description)' (fdcId: \(food.fdcId))")
+            return (food, .shortcut)
         } else {
             print("  🔍 No shortcut found for '\(cleanedName)', searching database...")
         }
@@ -301,6 +301,45 @@ class LocalUSDAService {
         return food
     }
 
+    /// Look up a generated shortcut by cleaned ingredient name
+    /// - Parameter name: Cleaned ingredient name (FuzzyMatchingService.cleanIngredientName output)
+    /// - Returns: USDAFood or nil if there is no shortcut (or no ingredient_shortcuts table)
+    func getShortcut(name: String) -> USDAFood? {
+        guard let db = db else { return nil }
+
+        // Primary-key lookup; the table is built by evaluation/build_shortcut_table.py
+        let sql = """
+            SELECT f.fdc_id, f.description, f.common_name, f.category
+            FROM ingredient_shortcuts s
+            JOIN usda_foods f ON f.fdc_id = s.fdc_id
+            WHERE s.name = ?
+        """
+
+        var statement: OpaquePointer?
+        guard sqlite3_prepare_v2(db, sql, -1, &statement, nil) == SQLITE_OK else {
+            return nil
+        }
+
+        // SQLITE_TRANSIENT tells SQLite to make its own copy
+        let SQLITE_TRANSIENT = unsafeBitCast(-1, to: sqlite3_destructor_type.self)
+        name.withCString { cString in
+            sqlite3_bind_text(statement, 1, cString, -1, SQLITE_TRANSIENT)
+        }
+
+        var food: USDAFood?
+        if sqlite3_step(statement) == SQLITE_ROW {
+            let id = Int(sqlite3_column_int(statement, 0))
+            let desc = String(cString: sqlite3_column_text(statement, 1))
+            let common = sqlite3_column_text(statement, 2).map { String(cString: $0) }
+            let category = sqlite3_column_text(statement, 3).map { String(cString: $0) }
+
+            food = USDAFood(fdcId: id, description: desc, commonName: common, category: category)
+        }
+
+        sqlite3_finalize(statement)
+        return food
+    }
+
     // MARK: - Helper Methods
 
     private func cleanSearchQuery(_ query: String) -> String {
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Column Projection Benchmark
+
+Fetches each table the dashboard loads twice, the old way and the new way,
+and reports what each costs:
+
+    - select=*    every column, untyped (what the queries used to do)
+    - projected   only the columns the pages use (utils/columns.py), typed
+                  with apply_schema at fetch time
+
+For each it prints the bytes transferred (response bodies as downloaded,
+counted with an httpx response hook on the Supabase client) and the
+resident DataFrame memory (memory_usage(deep=True)). For meals it also
+prints each page's frame.
+
+Read-only; uses the same .env credentials as the dashboard.
+
+Usage:
+    python benchmark_columns.py
+    python benchmark_columns.py --table meals
+"""
+
+import argparse
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from utils.supabase_client import get_supabase_client
+from utils.paging import fetch_frame
+from utils.columns import (
+    INGREDIENT_COLUMNS, INGREDIENT_SCHEMA, MEAL_CACHE_COLUMNS, MEAL_SCHEMA, PAGE_MEAL_COLUMNS,
+    PROFILE_SCHEMA, apply_schema, select_list,
+)
+
+
+# ==============================================================================
+# Configuration
+# ==============================================================================
+
+# table -> (order, filters, projected columns, schema); same fetches as utils/queries.py
+TABLES: Dict[str, Tuple[Tuple[str, ...], Optional[Callable], Tuple[str, ...], Dict[str, str]]] = {
+    "meals": (("id",), lambda query: query.is_("deleted_at", "null"), MEAL_CACHE_COLUMNS, MEAL_SCHEMA),
+    "meal_ingredients": (("id",), None, INGREDIENT_COLUMNS, INGREDIENT_SCHEMA),
+    "profiles": (("id",), None, tuple(PROFILE_SCHEMA), PROFILE_SCHEMA),
+}
+
+MB = 1024 * 1024
+
+
+class TransferCounter:
+    """Counts response bytes downloaded by the Supabase client's PostgREST session"""
+
+    def __init__(self, client):
+        self.bytes = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        client.postgrest.session.event_hooks["response"].append(self._on_response)
+
+    def _on_response(self, response):
+        response.read()
+        with self._lock:
+            self.bytes += response.num_bytes_downloaded
+            self.requests += 1
+
+    def reset(self):
+        with self._lock:
+            self.bytes = 0
+            self.requests = 0
+
+
+def frame_mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / MB
+
+
+def measure(counter: TransferCounter, fetch: Callable[[], pd.DataFrame]) -> Dict:
+    counter.reset()
+    start = time.perf_counter()
+    df = fetch()
+    return {
+        "frame": df,
+        "rows": len(df),
+        "transfer_mb": counter.bytes / MB,
+        "requests": counter.requests,
+        "memory_mb": frame_mb(df),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def benchmark(tables: List[str]) -> List[Dict]:
+    client = get_supabase_client()
+    counter = TransferCounter(client)
+
+    results = []
+    for table in tables:
+        order, filters, columns, schema = TABLES[table]
+        star = measure(counter, lambda: fetch_frame(client, table, order=order, filters=filters))
+        projected = measure(counter, lambda: apply_schema(
+            fetch_frame(client, table, columns=select_list(columns), order=order, filters=filters), schema
+        ))
+        results.append({"table": table, "star": star, "projected": projected})
+    return results
+
+
+def print_results(results: List[Dict]):
+    print(f"{'Table':<18} {'rows':>8} {'transfer MB':>22} {'memory MB':>22} {'requests':>9}")
+    print(f"{'':<18} {'':>8} {'select=*':>10} {'projected':>11} {'select=*':>10} {'projected':>11}")
+    print("-" * 84)
+    for r in results:
+        star, projected = r["star"], r["projected"]
+        print(
+            f"{r['table']:<18} {projected['rows']:>8,} "
+            f"{star['transfer_mb']:>10.2f} {projected['transfer_mb']:>11.2f} "
+            f"{star['memory_mb']:>10.2f} {projected['memory_mb']:>11.2f} {projected['requests']:>9}"
+        )
+
+    meals = next((r for r in results if r["table"] == "meals"), None)
+    if meals and not meals["projected"]["frame"].empty:
+        frame = meals["projected"]["frame"]
+        print()
+        print("Meals page frames (projected, typed):")
+        for page, columns in PAGE_MEAL_COLUMNS.items():
+            present = [column for column in columns if column in frame.columns]
+            print(f"   {page:<16} {len(present):>2} columns {frame_mb(frame[present]):>8.2f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure transfer and memory: select=* vs projected, typed fetches")
+    parser.add_argument(
+        "--table",
+        action="append",
+        choices=list(TABLES),
+        help="Table to measure (repeatable; default: all)"
+    )
+    args = parser.parse_args()
+
+    tables = args.table or list(TABLES)
+    print(f"📏 Measuring {', '.join(tables)}")
+    print()
+    print_results(benchmark(tables))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Meals Scoping Benchmark
+
+Times how the dashboard pages cut the meals frame by user and time range,
+on synthetic meals shaped like the real table:
+
+    - legacy      filter_by_user + the old filter_by_time: mask on user_id,
+                  then copy the frame, pd.to_datetime the timestamp strings
+                  and mask on the cutoff (every page, every rerun)
+    - mask        boolean masks on an already-typed frame (no copy, no parse)
+    - meals_frame MealsFrame.scope: searchsorted on the sorted timestamps and
+                  the per-user index
+
+Each workload is one scope (all users or one user) and one time range from
+the page filters. MealsFrame's one-off build cost (sort + index, paid once
+per cache refresh) is reported separately.
+
+Usage:
+    python benchmark_meals_frame.py
+    python benchmark_meals_frame.py --meals 200000 --users 500 --iterations 20
+"""
+
+import argparse
+import statistics
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.meals_frame import MealsFrame
+
+
+# ==============================================================================
+# Configuration
+# ==============================================================================
+
+MEALS = 1_000_000
+USERS = 2_000
+HISTORY_DAYS = 730  # Meals are spread over this many days before now
+ITERATIONS = 10  # Timed executions per workload (median reported)
+SEED = 1234
+
+# Same choices as utils.filters.TIME_RANGES
+TIME_RANGES = {
+    "24h": pd.Timedelta(hours=24),
+    "7d": pd.Timedelta(days=7),
+    "30d": pd.Timedelta(days=30),
+    "90d": pd.Timedelta(days=90),
+    "All": None,
+}
+
+
+def make_meals(meals: int, users: int, seed: int) -> pd.DataFrame:
+    """Synthetic meals with ISO timestamp strings, as PostgREST returns them."""
+    rng = np.random.default_rng(seed)
+    now = pd.Timestamp.now(tz="UTC").floor("s")
+    seconds = rng.integers(0, HISTORY_DAYS * 86_400, meals)
+    timestamps = (now - pd.to_timedelta(seconds, unit="s")).strftime("%Y-%m-%dT%H:%M:%S+00:00")
+    user_ids = np.array([f"{i:08x}-0000-4000-8000-{i:012x}" for i in range(users)])
+    # Long-tailed activity: a few heavy loggers, many occasional ones
+    weights = 1 / (np.arange(users) + 10)
+    return pd.DataFrame({
+        "id": [f"meal-{i}" for i in range(meals)],
+        "user_id": rng.choice(user_ids, meals, p=weights / weights.sum()),
+        "meal_type": pd.Categorical(rng.choice(["breakfast", "lunch", "dinner", "snack"], meals)),
+        "timestamp": timestamps,
+    })
+
+
+def legacy_scope(df: pd.DataFrame, user_id: Optional[str], cutoff) -> pd.DataFrame:
+    """filter_by_user + filter_by_time as they were before MealsFrame."""
+    if user_id is not None:
+        df = df[df["user_id"] == user_id]
+    if cutoff is None:
+        return df
+    df = df.copy()
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    return df[df["timestamp"] >= cutoff]
+
+
+def mask_scope(df: pd.DataFrame, user_id: Optional[str], cutoff) -> pd.DataFrame:
+    """Boolean masks on a frame whose timestamps are already parsed."""
+    if user_id is not None:
+        df = df[df["user_id"] == user_id]
+    if cutoff is None:
+        return df
+    return df[df["timestamp"] >= cutoff]
+
+
+def time_ms(fn: Callable[[], pd.DataFrame], iterations: int) -> Dict[str, float]:
+    rows = len(fn())  # Warmup
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"ms": statistics.median(timings), "rows": rows}
+
+
+def benchmark(meals: int, users: int, iterations: int, seed: int) -> List[Dict]:
+    raw = make_meals(meals, users, seed)
+    typed = raw.assign(timestamp=pd.to_datetime(raw["timestamp"], utc=True, format="ISO8601"))
+
+    start = time.perf_counter()
+    frame = MealsFrame(typed)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"MealsFrame build (once per refresh): {build_ms:.0f} ms")
+    print()
+
+    # The busiest user, like a heavy account picked in the scope selector
+    busiest = raw["user_id"].value_counts().index[0]
+    now = pd.Timestamp.now(tz="UTC")
+
+    results = []
+    for scope, user_id in (("global", None), ("user", busiest)):
+        for label, delta in TIME_RANGES.items():
+            cutoff = now - delta if delta is not None else None
+            row = {"workload": f"{scope}/{label}"}
+            for name, fn in (
+                ("legacy", lambda: legacy_scope(raw, user_id, cutoff)),
+                ("mask", lambda: mask_scope(typed, user_id, cutoff)),
+                ("meals_frame", lambda: frame.scope(user_id, cutoff)),
+            ):
+                row[name] = time_ms(fn, iterations)
+            counts = {row[name]["rows"] for name in ("legacy", "mask", "meals_frame")}
+            if len(counts) != 1:
+                raise AssertionError(f"{row['workload']}: row counts differ {counts}")
+            results.append(row)
+    return results
+
+
+def speedup(before: float, after: float) -> str:
+    """before / after as "12.3x", or "—" when either time prints as zero"""
+    # Same precision as the ms columns: legacy/mask 2 decimals, frame 3
+    if round(before, 2) == 0 or round(after, 3) == 0:
+        return "—"
+    return f"{before / after:.1f}x"
+
+
+def print_results(results: List[Dict]):
+    print(f"{'Workload':<12} {'rows':>9} {'legacy ms':>10} {'mask ms':>9} {'frame ms':>9} {'vs legacy':>10} {'vs mask':>8}")
+    print("-" * 74)
+    for r in results:
+        legacy, mask, frame = r["legacy"]["ms"], r["mask"]["ms"], r["meals_frame"]["ms"]
+        print(
+            f"{r['workload']:<12} {r['meals_frame']['rows']:>9} {legacy:>10.2f} {mask:>9.2f} {frame:>9.3f}"
+            f" {speedup(legacy, frame):>10} {speedup(mask, frame):>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark meals scoping (legacy vs MealsFrame)")
+    parser.add_argument("--meals", type=int, default=MEALS, help="Synthetic meals to generate")
+    parser.add_argument("--users", type=int, default=USERS, help="Distinct users")
+    parser.add_argument("--iterations", type=int, default=ITERATIONS, help="Timed runs per workload")
+    parser.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args()
+
+    print(f"⏱️  Scoping {args.meals:,} meals across {args.users:,} users ({args.iterations} iterations per workload)")
+    results = benchmark(args.meals, args.users, args.iterations, args.seed)
+    print_results(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,21 +7,22 @@ import pandas as pd
 st.set_page_config(page_title="Overview", page_icon="📊", layout="wide")
 
 try:
-    from utils.queries import get_all_users, get_all_meals
-    from utils.filters import render_filters, filter_by_user, filter_by_time, get_filter_description
+    from utils.queries import get_all_users, get_meals_frame, get_meals_per_day, get_meal_type_distribution
+    from utils.columns import PAGE_MEAL_COLUMNS
+    from utils.filters import render_filters, get_filter_description
 
     # Load data
     users_df = get_all_users()
-    all_meals_df = get_all_meals()
+    meals = get_meals_frame()
 
     # Unified filters in header
     scope, user_id, user_info, time_cutoff, time_label = render_filters(
         title="Overview", icon="📊", users_df=users_df, key="overview", allow_global=True
     )
 
-    # Apply filters
-    meals_df = filter_by_user(all_meals_df, scope, user_id)
-    meals_df = filter_by_time(meals_df, time_cutoff)
+    # Apply filters (binary-search time window, per-user index - no copies)
+    scope_user_id = user_id if scope != "global" else None
+    meals_df = meals.scope(scope_user_id, time_cutoff, PAGE_MEAL_COLUMNS["overview"])
 
     st.caption(f"{get_filter_description(scope, user_info, time_label)} · {len(meals_df)} meals")
     st.markdown("---")
@@ -43,8 +44,7 @@ try:
         avg_cal = meals_df["total_calories"].mean() if not meals_df.empty else 0
         col3.metric("Avg Cal", f"{avg_cal:.0f}" if pd.notna(avg_cal) else "—")
         if not meals_df.empty:
-            meals_df["timestamp"] = pd.to_datetime(meals_df["timestamp"])
-            col4.metric("Last", str(meals_df["timestamp"].max())[:10])
+            col4.metric("Last", str(meals_df["timestamp"].iloc[0])[:10])
         else:
             col4.metric("Last", "—")
 
@@ -53,13 +53,9 @@ try:
     # Activity chart
     if not meals_df.empty:
         st.markdown("### Activity")
-        chart_df = meals_df.copy()
-        chart_df["timestamp"] = pd.to_datetime(chart_df["timestamp"])
-        chart_df["date"] = chart_df["timestamp"].dt.date
-        daily = chart_df.groupby("date").size().reset_index(name="count")
-        daily["date"] = pd.to_datetime(daily["date"])
+        daily = get_meals_per_day(days=None, user_id=scope_user_id, since=time_cutoff)
 
-        fig = px.area(daily.sort_values("date"), x="date", y="count", color_discrete_sequence=["#3b82f6"])
+        fig = px.area(daily, x="date", y="count", color_discrete_sequence=["#3b82f6"])
         fig.update_layout(height=260, margin=dict(l=20, r=20, t=10, b=20), xaxis_title="", yaxis_title="Meals")
         fig.update_traces(fill="tozeroy")
         st.plotly_chart(fig, use_container_width=True)
@@ -70,8 +66,8 @@ try:
     if not meals_df.empty and "meal_type" in meals_df.columns:
         st.markdown("### Meal Types")
         col1, col2 = st.columns([1, 2])
-        types = meals_df["meal_type"].value_counts().reset_index()
-        types.columns = ["type", "count"]
+        types = get_meal_type_distribution(scope_user_id, time_cutoff)
+        types.columns = ["type", "count", "percentage"]
 
         with col1:
             fig = px.pie(types, values="count", names="type", color="type",
@@ -82,8 +78,7 @@ try:
 
         with col2:
             for _, row in types.iterrows():
-                pct = round(row["count"] / len(meals_df) * 100, 1)
-                st.metric(row["type"].title(), f"{row['count']} ({pct}%)")
+                st.metric(row["type"].title(), f"{row['count']} ({row['percentage']}%)")
     else:
         st.info("No data")
 
@@ -8,21 +8,22 @@ import pandas as pd
 st.set_page_config(page_title="Activity", page_icon="🕐", layout="wide")
 
 try:
-    from utils.queries import get_all_users, get_all_meals
-    from utils.filters import render_filters, filter_by_user, filter_by_time, get_filter_description
+    from utils.queries import get_all_users, get_meals_frame, get_hourly_activity, get_meal_type_distribution
+    from utils.columns import PAGE_MEAL_COLUMNS
+    from utils.filters import render_filters, get_filter_description
 
     # Load data
     users_df = get_all_users()
-    all_meals_df = get_all_meals()
+    meals = get_meals_frame()
 
     # Unified filters
     scope, user_id, user_info, time_cutoff, time_label = render_filters(
         title="Activity Patterns", icon="🕐", users_df=users_df, key="activity", allow_global=True
     )
 
-    # Apply filters
-    meals_df = filter_by_user(all_meals_df, scope, user_id)
-    meals_df = filter_by_time(meals_df, time_cutoff)
+    # Apply filters (binary-search time window, per-user index - no copies)
+    scope_user_id = user_id if scope != "global" else None
+    meals_df = meals.scope(scope_user_id, time_cutoff, PAGE_MEAL_COLUMNS["activity"])
 
     st.caption(f"{get_filter_description(scope, user_info, time_label)} · {len(meals_df)} meals")
 
@@ -30,16 +31,11 @@ try:
         st.warning("No data")
         st.stop()
 
-    meals_df = meals_df.copy()
-    meals_df["timestamp"] = pd.to_datetime(meals_df["timestamp"])
-    meals_df["day_of_week"] = meals_df["timestamp"].dt.dayofweek
-    meals_df["hour"] = meals_df["timestamp"].dt.hour
-
     st.markdown("---")
 
     # Heatmap
     st.markdown("### When Meals Are Logged")
-    hourly = meals_df.groupby(["day_of_week", "hour"]).size().reset_index(name="count")
+    hourly = get_hourly_activity(scope_user_id, time_cutoff)
     days = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
 
     full_grid = pd.DataFrame([{"day_of_week": d, "hour": h, "count": 0} for d in range(7) for h in range(24)])
@@ -70,7 +66,7 @@ try:
     # Meal types
     if "meal_type" in meals_df.columns:
         st.markdown("### Meal Types")
-        types = meals_df["meal_type"].value_counts().reset_index()
+        types = get_meal_type_distribution(scope_user_id, time_cutoff)[["meal_type", "count"]]
         types.columns = ["type", "count"]
         fig = px.bar(types, x="type", y="count", color="type",
                      color_discrete_map={"breakfast": "#f59e0b", "lunch": "#10b981", "dinner": "#6366f1", "snack": "#ec4899"})
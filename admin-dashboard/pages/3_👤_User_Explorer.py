@@ -180,9 +180,8 @@ try:
         st.stop()
 
     # Prepare data
+    # Already typed and newest first (get_user_meals); copy before adding columns
     user_meals = user_meals.copy()
-    user_meals["timestamp"] = pd.to_datetime(user_meals["timestamp"])
-    user_meals = user_meals.sort_values("timestamp", ascending=False)
     user_meals["date"] = user_meals["timestamp"].dt.date
     user_meals["time_str"] = user_meals["timestamp"].dt.strftime("%H:%M")
 
@@ -7,12 +7,13 @@ import pandas as pd
 st.set_page_config(page_title="Nutrition", page_icon="🥗", layout="wide")
 
 try:
-    from utils.queries import get_all_users, get_all_meals, get_all_ingredients
-    from utils.filters import render_filters, filter_by_user, filter_by_time, get_filter_description
+    from utils.queries import get_all_users, get_meals_frame, get_all_ingredients, get_avg_macros_by_meal_type
+    from utils.columns import PAGE_MEAL_COLUMNS
+    from utils.filters import render_filters, get_filter_description
 
     # Load data
     users_df = get_all_users()
-    all_meals_df = get_all_meals()
+    meals = get_meals_frame()
     all_ingredients_df = get_all_ingredients()
 
     # Unified filters
@@ -20,9 +21,9 @@ try:
         title="Nutrition Analysis", icon="🥗", users_df=users_df, key="nutrition", allow_global=True
     )
 
-    # Apply filters
-    meals_df = filter_by_user(all_meals_df, scope, user_id)
-    meals_df = filter_by_time(meals_df, time_cutoff)
+    # Apply filters (binary-search time window, per-user index - no copies)
+    scope_user_id = user_id if scope != "global" else None
+    meals_df = meals.scope(scope_user_id, time_cutoff, PAGE_MEAL_COLUMNS["nutrition"])
 
     # Filter ingredients
     if not meals_df.empty and not all_ingredients_df.empty:
@@ -90,23 +91,15 @@ try:
     # Macros by type
     st.markdown("### Avg Macros by Meal Type")
     if "meal_type" in meals_df.columns:
-        meals_df = meals_df.copy()
-        for col in ["total_calories", "total_protein_g", "total_carbs_g", "total_fat_g"]:
-            if col in meals_df.columns:
-                meals_df[col] = pd.to_numeric(meals_df[col], errors="coerce")
-
-        avg = meals_df.groupby("meal_type").agg({
-            "total_calories": "mean", "total_protein_g": "mean",
-            "total_carbs_g": "mean", "total_fat_g": "mean"
-        }).round(1).reset_index()
+        avg = get_avg_macros_by_meal_type(scope_user_id, time_cutoff)
 
         if not avg.empty:
             col1, col2 = st.columns([2, 1])
             with col1:
                 melted = avg.melt(id_vars=["meal_type"], var_name="macro", value_name="value")
                 melted["macro"] = melted["macro"].map({
-                    "total_calories": "Cal", "total_protein_g": "Pro",
-                    "total_carbs_g": "Carb", "total_fat_g": "Fat"})
+                    "avg_calories": "Cal", "avg_protein": "Pro",
+                    "avg_carbs": "Carb", "avg_fat": "Fat"})
                 fig = px.bar(melted, x="meal_type", y="value", color="macro", barmode="group",
                              color_discrete_map={"Cal": "#f59e0b", "Pro": "#3b82f6", "Carb": "#10b981", "Fat": "#ef4444"})
                 fig.update_layout(height=260, margin=dict(l=20, r=20, t=10, b=20), xaxis_title="", yaxis_title="")
@@ -9,13 +9,14 @@ from datetime import datetime, timedelta, timezone
 st.set_page_config(page_title="System Health", page_icon="🩺", layout="wide")
 
 try:
-    from utils.queries import get_all_meals, get_all_users
-    from utils.filters import init_filter_state, filter_by_time
+    from utils.queries import get_meals_frame, get_all_users, get_sync_status_distribution
+    from utils.columns import PAGE_MEAL_COLUMNS
+    from utils.filters import init_filter_state
 
     init_filter_state()
 
     # Load data
-    all_meals_df = get_all_meals()
+    meals = get_meals_frame()
     all_users_df = get_all_users()
 
     # Header with time only (always global)
@@ -46,7 +47,7 @@ try:
     # Calculate cutoff
     hours = TIME_RANGES.get(st.session_state.filter_time)
     time_cutoff = datetime.now(timezone.utc) - timedelta(hours=hours) if hours else None
-    meals_df = filter_by_time(all_meals_df, time_cutoff)
+    meals_df = meals.scope(since=time_cutoff, columns=PAGE_MEAL_COLUMNS["system_health"])
 
     st.caption(f"All users · {st.session_state.filter_time} · {len(meals_df)} meals")
     st.markdown("---")
@@ -54,7 +55,7 @@ try:
     # Overview
     col1, col2, col3, col4 = st.columns(4)
     col1.metric("Users", len(all_users_df))
-    col2.metric("Total Meals", len(all_meals_df))
+    col2.metric("Total Meals", len(meals))
     col3.metric("Period Meals", len(meals_df))
     active = meals_df["user_id"].nunique() if not meals_df.empty else 0
     col4.metric("Active Users", active)
@@ -86,8 +87,8 @@ try:
     # Sync status
     st.markdown("### Sync Status")
     if not meals_df.empty and "sync_status" in meals_df.columns:
-        sync = meals_df["sync_status"].value_counts().reset_index()
-        sync.columns = ["status", "count"]
+        sync = get_sync_status_distribution(since=time_cutoff)
+        sync.columns = ["status", "count", "percentage"]
 
         col1, col2 = st.columns([1, 1])
         with col1:
@@ -99,7 +100,7 @@ try:
 
         with col2:
             for _, row in sync.iterrows():
-                pct = round(row["count"] / len(meals_df) * 100, 1)
+                pct = row["percentage"]
                 if row["status"] == "synced":
                     st.success(f"✅ Synced: {row['count']} ({pct}%)")
                 elif row["status"] == "pending":
@@ -0,0 +1,158 @@
+"""
+Column specs and dtype schemas for dashboard queries.
+
+Each table has a schema (column -> dtype) covering every column the
+dashboard reads, and each page declares the meal columns it needs. Queries
+select only those columns instead of "*", which skips the wide text
+columns (user_prompt, notes, cartoon_image_url, micronutrients_json, ...)
+that most pages never look at.
+
+Fetched frames are typed once, when they are fetched:
+- timestamps become tz-aware UTC datetimes, so pages don't re-parse them
+- low-cardinality labels (meal_type, sync_status) become categoricals
+- macros become nullable floats (missing stays <NA>, not an error)
+"""
+
+from typing import Dict, Iterable, Tuple
+
+import pandas as pd
+
+
+# Dtypes used in schemas
+DATETIME = "datetime64[ns, UTC]"
+CATEGORY = "category"
+FLOAT = "Float64"
+INT = "Int64"
+BOOL = "boolean"
+TEXT = "object"
+
+
+# ============================================================================
+# TABLE SCHEMAS
+# ============================================================================
+
+MEAL_SCHEMA: Dict[str, str] = {
+    "id": TEXT,
+    "user_id": TEXT,
+    "name": TEXT,
+    "meal_type": CATEGORY,
+    "timestamp": DATETIME,
+    "photo_thumbnail_url": TEXT,
+    "user_prompt": TEXT,
+    "total_calories": FLOAT,
+    "total_protein_g": FLOAT,
+    "total_carbs_g": FLOAT,
+    "total_fat_g": FLOAT,
+    "sync_status": CATEGORY,
+    "created_at": DATETIME,
+    "updated_at": DATETIME,
+    "deleted_at": DATETIME,
+}
+
+INGREDIENT_SCHEMA: Dict[str, str] = {
+    "id": TEXT,
+    "meal_id": TEXT,
+    "name": TEXT,
+    "usda_fdc_id": INT,
+    "enrichment_attempted": BOOL,
+}
+
+PROFILE_SCHEMA: Dict[str, str] = {
+    "id": TEXT,
+    "email": TEXT,
+    "full_name": TEXT,
+    "created_at": DATETIME,
+}
+
+SUBSCRIPTION_SCHEMA: Dict[str, str] = {
+    "user_id": TEXT,
+    "subscription_type": CATEGORY,
+    "trial_end_date": DATETIME,
+}
+
+ONBOARDING_SCHEMA: Dict[str, str] = {
+    "user_id": TEXT,
+    "welcome_completed_at": DATETIME,
+    "meal_reminders_completed_at": DATETIME,
+    "profile_setup_completed_at": DATETIME,
+    "app_version_first_seen": CATEGORY,
+    "created_at": DATETIME,
+}
+
+REMINDER_SETTINGS_SCHEMA: Dict[str, str] = {
+    "user_id": TEXT,
+    "is_enabled": BOOL,
+    "lead_time_minutes": INT,
+    "auto_dismiss_minutes": INT,
+    "use_learning": BOOL,
+    "onboarding_completed": BOOL,
+    "created_at": DATETIME,
+    "updated_at": DATETIME,
+}
+
+MEAL_WINDOW_SCHEMA: Dict[str, str] = {
+    "id": TEXT,
+    "user_id": TEXT,
+    "name": CATEGORY,
+    "target_time": TEXT,
+    "learned_time": TEXT,
+    "is_enabled": BOOL,
+    "sort_order": INT,
+    "created_at": DATETIME,
+    "updated_at": DATETIME,
+}
+
+
+# ============================================================================
+# PAGE COLUMN SPECS (meals)
+# ============================================================================
+
+PAGE_MEAL_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "overview": ("id", "user_id", "meal_type", "timestamp", "photo_thumbnail_url", "total_calories"),
+    "activity": ("id", "user_id", "meal_type", "timestamp"),
+    "nutrition": ("id", "user_id", "meal_type", "timestamp"),
+    "system_health": ("id", "user_id", "name", "timestamp", "photo_thumbnail_url", "sync_status"),
+    "user_explorer": (
+        "id", "user_id", "name", "meal_type", "timestamp", "photo_thumbnail_url", "user_prompt",
+        "total_calories", "total_protein_g", "total_carbs_g", "total_fat_g",
+    ),
+}
+
+# Columns the meal cache keeps: every page on the all-meals frame, plus what
+# the cache itself needs to sync. user_prompt is left out - only the User
+# Explorer shows it, and that page fetches one user's meals directly.
+MEAL_CACHE_COLUMNS: Tuple[str, ...] = tuple(dict.fromkeys(
+    [column for page in ("overview", "activity", "nutrition", "system_health")
+     for column in PAGE_MEAL_COLUMNS[page]]
+    + ["updated_at", "deleted_at"]
+))
+
+INGREDIENT_COLUMNS: Tuple[str, ...] = tuple(INGREDIENT_SCHEMA)
+
+
+def select_list(columns: Iterable[str]) -> str:
+    """PostgREST select string for columns."""
+    return ",".join(columns)
+
+
+def apply_schema(df: pd.DataFrame, schema: Dict[str, str]) -> pd.DataFrame:
+    """
+    Cast the schema's columns of df in place (columns not in df are skipped).
+
+    Args:
+        df: Freshly fetched frame (strings, numbers and None from JSON/SQLite)
+        schema: Column -> dtype, using the constants above
+
+    Returns the same DataFrame, for chaining.
+    """
+    for column, dtype in schema.items():
+        if column not in df.columns or df[column].dtype == dtype:
+            continue
+        if dtype == DATETIME:
+            if not isinstance(df[column].dtype, pd.DatetimeTZDtype):
+                df[column] = pd.to_datetime(df[column], utc=True, format="ISO8601")
+        elif dtype in (FLOAT, INT):
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype(dtype)
+        elif dtype != TEXT:
+            df[column] = df[column].astype(dtype)
+    return df
@@ -237,6 +237,9 @@ def filter_by_time(
         return df
     if timestamp_column not in df.columns:
         return df
+    if isinstance(df[timestamp_column].dtype, pd.DatetimeTZDtype):
+        # Already parsed at fetch time: no copy, no re-parse
+        return df[df[timestamp_column] >= cutoff]
     df = df.copy()
     df[timestamp_column] = pd.to_datetime(df[timestamp_column])
     return df[df[timestamp_column] >= cutoff]
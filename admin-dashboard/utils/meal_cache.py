@@ -0,0 +1,253 @@
+"""
+Persistent local cache of the meals table.
+
+The first load pages the whole table into a SQLite file on disk. After that,
+each refresh only fetches meals whose updated_at is at or past the stored
+high-water mark, so a page load costs a small delta request instead of a
+full table download, however many meals there are.
+
+- Soft deletes (deleted_at set) arrive as ordinary updates and are kept as
+  tombstones: the row stays in the cache, but out of the live frame.
+- The app hard-deletes meals (SyncService.deleteMeal), which leaves no
+  updated_at trail. When the server's live count disagrees with the cache,
+  ids are reconciled: vanished meals are dropped, and any the high-water
+  mark skipped are fetched by id.
+
+Delete .cache/meals.db (or call MealCache.reset) to rebuild from scratch.
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Set
+
+import pandas as pd
+from .columns import MEAL_CACHE_COLUMNS, MEAL_SCHEMA, apply_schema, select_list
+from .paging import PAGE_SIZE, fetch_frame, iter_keyset_pages
+from .supabase_client import get_supabase_client
+
+
+# Cache file (override with MEAL_CACHE_PATH)
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent.parent / ".cache" / "meals.db"
+
+# Columns the cache can't work without
+SYNC_COLUMNS = ("id", "timestamp", "updated_at", "deleted_at")
+
+# Re-read this much before the high-water mark: updated_at is set by the
+# device, so a meal can land slightly "in the past" after we've moved on
+HIGH_WATER_OVERLAP = timedelta(minutes=5)
+
+
+def _parse_timestamp(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class MealCache:
+    """
+    meals rows mirrored into SQLite, plus the live (not soft-deleted) rows
+    as an in-memory DataFrame ordered by timestamp, newest first.
+
+    Only the given columns are fetched and stored; the frame is typed with
+    MEAL_SCHEMA. Changing the columns rebuilds the cache on the next refresh.
+
+    Thread-safe: Streamlit serves sessions from several threads, and they
+    share one cache.
+    """
+
+    def __init__(
+        self,
+        client,
+        path: Path = DEFAULT_CACHE_PATH,
+        page_size: int = PAGE_SIZE,
+        columns: Sequence[str] = MEAL_CACHE_COLUMNS,
+    ):
+        self.client = client
+        self.path = Path(path)
+        self.page_size = page_size
+        self.columns = tuple(dict.fromkeys([*SYNC_COLUMNS, *columns]))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT)")
+        if self._get_state("columns") != select_list(self.columns):
+            self._clear()
+        self.conn.commit()
+        self._lock = threading.Lock()
+        self._frame: Optional[pd.DataFrame] = None
+        self.last_refresh: Dict[str, int] = {}
+
+    # ------------------------------------------------------------------
+    # Local store
+    # ------------------------------------------------------------------
+
+    def _columns(self) -> List[str]:
+        return [row[1] for row in self.conn.execute("PRAGMA table_info(meals)")]
+
+    def _get_state(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value: str):
+        self.conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+
+    def _store(self, rows: List[dict]):
+        """Upsert rows, adding columns the server has grown since the table was created."""
+        columns = self._columns()
+        incoming = list(dict.fromkeys(key for row in rows for key in row))
+        if not columns:
+            others = ", ".join(f'"{c}"' for c in incoming if c != "id")
+            self.conn.execute(f'CREATE TABLE meals (id TEXT PRIMARY KEY{", " + others if others else ""})')
+            self.conn.execute('CREATE INDEX idx_meals_timestamp ON meals ("timestamp")')
+            columns = self._columns()
+        for column in incoming:
+            if column not in columns:
+                self.conn.execute(f'ALTER TABLE meals ADD COLUMN "{column}"')
+                columns.append(column)
+
+        placeholders = ", ".join("?" * len(columns))
+        quoted = ", ".join(f'"{c}"' for c in columns)
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO meals ({quoted}) VALUES ({placeholders})",
+            [tuple(row.get(c) for c in columns) for row in rows]
+        )
+
+    def _load_frame(self) -> pd.DataFrame:
+        if not self._columns():
+            return pd.DataFrame()
+        quoted = ", ".join(f'"{c}"' for c in self.columns)
+        frame = pd.read_sql_query(
+            f'SELECT {quoted} FROM meals WHERE deleted_at IS NULL ORDER BY "timestamp" DESC', self.conn
+        )
+        return apply_schema(frame, MEAL_SCHEMA)
+
+    def _clear(self):
+        self.conn.execute("DROP TABLE IF EXISTS meals")
+        self.conn.execute("DELETE FROM sync_state")
+        self._set_state("columns", select_list(self.columns))
+        self._frame = None
+
+    def reset(self):
+        """Forget everything; the next refresh downloads the whole table again."""
+        with self._lock:
+            self._clear()
+            self.conn.commit()
+
+    # ------------------------------------------------------------------
+    # Server
+    # ------------------------------------------------------------------
+
+    def _iter_changes(self, since: Optional[str]) -> Iterator[List[dict]]:
+        """
+        Pages of every meal with updated_at >= since (all meals if None),
+        keyset-paged on (updated_at, id) so no row is skipped or repeated.
+        """
+        filters = (lambda query: query.gte("updated_at", since)) if since else None
+        return iter_keyset_pages(
+            self.client, "meals", columns=select_list(self.columns), keys=("updated_at", "id"),
+            filters=filters, page_size=self.page_size
+        )
+
+    def _server_live_count(self) -> int:
+        result = self.client.table("meals")\
+            .select("id", count="exact")\
+            .is_("deleted_at", "null")\
+            .limit(1)\
+            .execute()
+        return result.count or 0
+
+    def _server_ids(self) -> Set[str]:
+        """All meal ids on the server (36 bytes a row)."""
+        ids = fetch_frame(self.client, "meals", columns="id", order=("id",), page_size=self.page_size)
+        return set(ids["id"]) if not ids.empty else set()
+
+    # ------------------------------------------------------------------
+    # Refresh
+    # ------------------------------------------------------------------
+
+    def refresh(self) -> pd.DataFrame:
+        """
+        Bring the cache up to date and return the live meals.
+
+        Returns a new DataFrame only when something changed; callers must not
+        modify it in place (get_all_meals hands out copies).
+        """
+        with self._lock:
+            high_water = self._get_state("high_water")
+            since = None
+            if high_water:
+                since = (_parse_timestamp(high_water) - HIGH_WATER_OVERLAP).isoformat()
+
+            # Each page is written straight to disk; rows are only kept in
+            # memory when there is a live frame to patch
+            changes: List[dict] = []
+            fetched = 0
+            for page in self._iter_changes(since):
+                self._store(page)
+                fetched += len(page)
+                if self._frame is not None:
+                    changes.extend(page)
+                # Pages come in updated_at order, so the last row is the newest
+                newest = page[-1]["updated_at"]
+                if not high_water or _parse_timestamp(newest) > _parse_timestamp(high_water):
+                    high_water = newest
+                    self._set_state("high_water", newest)
+            if fetched:
+                self.conn.commit()
+
+            if self._frame is None:
+                frame = self._load_frame()
+            elif changes:
+                frame = self._apply(self._frame, changes)
+            else:
+                frame = self._frame
+
+            # Hard deletes: only visible as a count mismatch
+            removed = 0
+            server_count = self._server_live_count()
+            if server_count != len(frame):
+                removed = self._reconcile()
+                frame = self._load_frame()
+
+            self._frame = frame
+            self.last_refresh = {"fetched": fetched, "removed": removed, "live": len(frame)}
+            return frame
+
+    def _apply(self, frame: pd.DataFrame, changes: List[dict]) -> pd.DataFrame:
+        """The live frame with changed meals replaced (or dropped, if now soft-deleted)."""
+        changed_ids = {row["id"] for row in changes}
+        live = [row for row in changes if row.get("deleted_at") is None]
+        kept = frame[~frame["id"].isin(changed_ids)] if not frame.empty else frame
+        if live:
+            added = apply_schema(pd.DataFrame(live, columns=list(self.columns)), MEAL_SCHEMA)
+            # Categoricals with different categories concat to object; re-typed below
+            kept = pd.concat([kept, added], ignore_index=True)
+        return apply_schema(kept, MEAL_SCHEMA).sort_values("timestamp", ascending=False, ignore_index=True)
+
+    def _reconcile(self) -> int:
+        """
+        Match the cached ids to the server's: drop meals that no longer exist,
+        and fetch any the high-water mark skipped. Returns how many were dropped.
+        """
+        server_ids = self._server_ids()
+        local_ids = {row[0] for row in self.conn.execute("SELECT id FROM meals")}
+        gone = local_ids - server_ids
+        self.conn.executemany("DELETE FROM meals WHERE id = ?", [(i,) for i in gone])
+
+        missed = sorted(server_ids - local_ids)
+        for start in range(0, len(missed), 100):
+            batch = missed[start:start + 100]
+            self._store(
+                self.client.table("meals").select(select_list(self.columns)).in_("id", batch).execute().data
+            )
+
+        self.conn.commit()
+        return len(gone)
+
+
+@lru_cache(maxsize=1)
+def get_meal_cache() -> MealCache:
+    """Process-wide meal cache, shared by every session."""
+    return MealCache(get_supabase_client(), Path(os.getenv("MEAL_CACHE_PATH", DEFAULT_CACHE_PATH)))
@@ -0,0 +1,147 @@
+"""
+Canonical in-memory meals structure for time and user scoping.
+
+Every page cuts the same meals frame by user and by time range. Doing that
+with boolean masks scans (and used to copy and re-parse) the whole frame on
+every rerun. MealsFrame does the work once per refresh instead:
+
+- timestamps are parsed once and the frame is sorted newest first, so
+  "since <cutoff>" is always a prefix, found by binary search (searchsorted)
+  and returned as a slice rather than a filtered copy
+- a per-user index (row positions grouped by user, with group offsets)
+  finds one user's meals without scanning anyone else's
+
+The frame and its slices are shared between sessions: treat them as
+read-only (copy before adding columns).
+"""
+
+from datetime import datetime
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Sort key for a missing timestamp: after every real one, never inside a window
+_MISSING = np.iinfo(np.int64).max
+
+
+def _to_ns(value: datetime) -> int:
+    """UTC nanoseconds since the epoch (naive datetimes are taken as UTC)."""
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize("UTC")
+    return timestamp.tz_convert("UTC").value
+
+
+class MealsFrame:
+    """
+    Meals sorted newest first, with binary-search time windows and a
+    per-user index.
+
+    Args:
+        meals: Meals with user_id and timestamp columns (timestamp may be
+            strings; it is parsed here if it isn't a datetime already)
+        timestamp_column: Column to sort and window on
+        user_column: Column to index users by
+    """
+
+    def __init__(
+        self,
+        meals: pd.DataFrame,
+        timestamp_column: str = "timestamp",
+        user_column: str = "user_id",
+    ):
+        self.timestamp_column = timestamp_column
+        self.user_column = user_column
+
+        if meals.empty or timestamp_column not in meals.columns:
+            self.frame = meals
+            self._keys = np.empty(0, dtype=np.int64)
+            self._user_rows = np.empty(0, dtype=np.int64)
+            self._user_keys = np.empty(0, dtype=np.int64)
+            self._user_offsets: Dict[str, Tuple[int, int]] = {}
+            return
+
+        timestamps = meals[timestamp_column]
+        if not isinstance(timestamps.dtype, pd.DatetimeTZDtype):
+            meals = meals.assign(**{
+                timestamp_column: pd.to_datetime(timestamps, utc=True, format="ISO8601")
+            })
+        if not meals[timestamp_column].is_monotonic_decreasing:
+            meals = meals.sort_values(timestamp_column, ascending=False, kind="stable")
+        self.frame = meals.reset_index(drop=True)
+
+        # Negated epoch nanoseconds: ascending while the frame is descending,
+        # so np.searchsorted works on it directly
+        nanoseconds = self.frame[timestamp_column].to_numpy(dtype="datetime64[ns]").view(np.int64)
+        missing = self.frame[timestamp_column].isna().to_numpy()
+        self._keys = np.where(missing, _MISSING, -nanoseconds)
+
+        # Per-user index: row positions grouped by user (newest first within
+        # each group, since the sort is stable) and each group's [start, end)
+        codes, users = pd.factorize(self.frame[user_column])
+        self._user_rows = np.argsort(codes, kind="stable")
+        self._user_keys = self._keys[self._user_rows]
+        # Meals without a user have code -1 and sort first; skip past them
+        counts = np.bincount(codes[codes >= 0], minlength=len(users))
+        ends = int((codes < 0).sum()) + np.cumsum(counts)
+        self._user_offsets = {
+            user: (int(end - count), int(end))
+            for user, count, end in zip(users, counts, ends)
+        }
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    @property
+    def users(self) -> Sequence[str]:
+        """Ids of users with at least one meal."""
+        return list(self._user_offsets)
+
+    def _count_since(self, keys: np.ndarray, since: Optional[datetime]) -> int:
+        """How many leading rows of keys are at or after since (all if None)."""
+        if since is None:
+            return len(keys)
+        return int(np.searchsorted(keys, -_to_ns(since), side="right"))
+
+    def since(self, since: Optional[datetime]) -> pd.DataFrame:
+        """
+        All meals at or after since (all meals if None), newest first.
+
+        Returns a slice of the canonical frame - no rows are copied.
+        """
+        return self.frame.iloc[:self._count_since(self._keys, since)]
+
+    def for_user(self, user_id: str, since: Optional[datetime] = None) -> pd.DataFrame:
+        """
+        One user's meals at or after since, newest first.
+
+        Only the matching rows are gathered; the rest of the frame is not
+        touched.
+        """
+        if user_id not in self._user_offsets:
+            return self.frame.iloc[:0]
+        start, end = self._user_offsets[user_id]
+        count = self._count_since(self._user_keys[start:end], since)
+        return self.frame.take(self._user_rows[start:start + count])
+
+    def scope(
+        self,
+        user_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+        columns: Optional[Sequence[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Meals for the dashboard filters: one user (or everyone if user_id is
+        None) from since onward.
+
+        Args:
+            user_id: User to scope to, or None for all users
+            since: Time cutoff, or None for all time
+            columns: Optional subset of columns to return
+        """
+        meals = self.since(since) if user_id is None else self.for_user(user_id, since)
+        if columns is not None:
+            meals = meals[[column for column in columns if column in meals.columns]]
+        return meals
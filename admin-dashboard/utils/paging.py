@@ -0,0 +1,183 @@
+"""
+Paged fetching for table-wide queries.
+
+PostgREST caps every response at its max-rows setting (1000 on Supabase),
+so a plain select("*") on a large table is silently truncated. These helpers
+walk the whole table instead:
+
+- fetch_frame: parallel offset pages over a stable order. The first request
+  also returns the exact row count, so the remaining pages can be requested
+  concurrently.
+- iter_keyset_pages: sequential keyset pages on a unique sort key. Slower,
+  but no row is skipped or repeated while the table is being written to.
+
+Each page becomes a DataFrame as soon as it arrives, and the pages are
+concatenated once at the end, so the full result never exists as one big
+list of dicts.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Optional, Sequence
+
+import pandas as pd
+
+
+# Rows per request. If the server's max-rows is lower, the page size shrinks
+# to whatever the first page actually returned.
+PAGE_SIZE = 1000
+
+# Page requests in flight at once
+CONCURRENCY = 4
+
+# Optional hook to add filters to every page request,
+# e.g. lambda query: query.is_("deleted_at", "null")
+Filters = Optional[Callable]
+
+
+def _select(client, table: str, columns: str, filters: Filters, order: Sequence[str], count=None):
+    """A select with filters and order applied. '-column' sorts descending."""
+    query = client.table(table).select(columns, count=count)
+    if filters:
+        query = filters(query)
+    for column in order:
+        query = query.order(column.lstrip("-"), desc=column.startswith("-"))
+    return query
+
+
+def _to_frame(rows: List[dict]) -> pd.DataFrame:
+    return pd.DataFrame.from_records(rows) if rows else pd.DataFrame()
+
+
+def _concat(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
+
+
+def fetch_frame(
+    client,
+    table: str,
+    columns: str = "*",
+    order: Sequence[str] = ("id",),
+    filters: Filters = None,
+    page_size: int = PAGE_SIZE,
+    concurrency: int = CONCURRENCY,
+) -> pd.DataFrame:
+    """
+    Fetch every matching row of a table as one DataFrame.
+
+    Args:
+        client: Supabase client
+        table: Table name
+        columns: PostgREST select list
+        order: Sort columns ('-' prefix for descending). Must end in a unique
+            column, or rows can move between pages.
+        filters: Optional function applied to each page's query
+        page_size: Rows per request
+        concurrency: Page requests in flight at once
+
+    Returns DataFrame of all rows in the requested order.
+    """
+    first = _select(client, table, columns, filters, order, count="exact")\
+        .range(0, page_size - 1)\
+        .execute()
+    total = first.count or 0
+    frames = [_to_frame(first.data)]
+    received = len(first.data)
+    if received >= total:
+        return frames[0]
+
+    # The server capped the page below what we asked for
+    if received < page_size:
+        page_size = received
+
+    def fetch_page(start: int) -> pd.DataFrame:
+        result = _select(client, table, columns, filters, order)\
+            .range(start, start + page_size - 1)\
+            .execute()
+        return _to_frame(result.data)
+
+    starts = range(received, total, page_size)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        frames.extend(executor.map(fetch_page, starts))
+
+    # Rows inserted after the count was taken: keep going until a short page
+    start = total
+    while len(frames[-1]) == page_size:
+        frames.append(fetch_page(start))
+        start += page_size
+
+    return _concat(frames)
+
+
+def iter_keyset_pages(
+    client,
+    table: str,
+    columns: str = "*",
+    keys: Sequence[str] = ("id",),
+    filters: Filters = None,
+    page_size: int = PAGE_SIZE,
+) -> Iterator[List[dict]]:
+    """
+    Yield pages of rows ordered by keys, each starting after the last row of
+    the previous page.
+
+    Args:
+        client: Supabase client
+        table: Table name
+        columns: PostgREST select list (must include the key columns)
+        keys: One or two ascending sort columns; the last must be unique
+        filters: Optional function applied to each page's query
+        page_size: Rows per request (shrinks to the server's max-rows if
+            that is lower)
+    """
+    if len(keys) not in (1, 2):
+        raise ValueError("keyset paging supports one or two key columns")
+
+    last = None
+    while True:
+        query = _select(client, table, columns, filters, keys)
+        if last is not None:
+            if len(keys) == 1:
+                query = query.gt(keys[0], last[keys[0]])
+            else:
+                major, minor = keys
+                query = query.or_(
+                    f'{major}.gt."{last[major]}",'
+                    f'and({major}.eq."{last[major]}",{minor}.gt."{last[minor]}")'
+                )
+        page = query.limit(page_size).execute().data
+        if not page:
+            return
+        yield page
+        if last is None and len(page) < page_size:
+            # A short first page is either the whole result or the server's
+            # max-rows cap: carry on at that size until a page comes back
+            # short or empty
+            page_size = len(page)
+        elif len(page) < page_size:
+            return
+        last = page[-1]
+
+
+def fetch_keyset_frame(
+    client,
+    table: str,
+    columns: str = "*",
+    keys: Sequence[str] = ("id",),
+    filters: Filters = None,
+    page_size: int = PAGE_SIZE,
+) -> pd.DataFrame:
+    """
+    Fetch every matching row with keyset paging, as one DataFrame.
+
+    Same arguments as iter_keyset_pages. Use this over fetch_frame when the
+    table may change during the fetch.
+    """
+    return _concat([
+        _to_frame(page)
+        for page in iter_keyset_pages(client, table, columns, keys, filters, page_size)
+    ])
@@ -4,15 +4,29 @@ Database queries for admin dashboard.
 All queries use the service role client to bypass RLS
 and access data across all users.
 
-Data is cached for 60 seconds to prevent excessive API calls.
+Table-wide queries are paged (see paging.py), so results are not
+truncated at PostgREST's max-rows limit. They select only the columns the
+pages use and return typed frames (see columns.py).
+
+Data is cached for 60 seconds to prevent excessive API calls. Meals are
+also kept in a local on-disk cache that is refreshed incrementally
+(see meal_cache.py).
 """
 
 import random
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Tuple
 import pandas as pd
 import streamlit as st
 from .supabase_client import get_supabase_client
+from .meal_cache import get_meal_cache
+from .meals_frame import MealsFrame
+from .paging import fetch_frame
+from .columns import (
+    INGREDIENT_COLUMNS, INGREDIENT_SCHEMA, MEAL_CACHE_COLUMNS, MEAL_SCHEMA, MEAL_WINDOW_SCHEMA,
+    ONBOARDING_SCHEMA, PAGE_MEAL_COLUMNS, PROFILE_SCHEMA, REMINDER_SETTINGS_SCHEMA,
+    SUBSCRIPTION_SCHEMA, apply_schema, select_list,
+)
 
 
 # Cache TTL in seconds (data refreshes after this time)
@@ -31,14 +45,14 @@ def get_all_users() -> pd.DataFrame:
     client = get_supabase_client()
 
     # Get profiles
-    profiles = client.table("profiles").select("*").execute()
+    profiles_df = fetch_frame(client, "profiles", columns=select_list(PROFILE_SCHEMA), order=("id",))
+    apply_schema(profiles_df, PROFILE_SCHEMA)
 
     # Get subscription status
-    subscriptions = client.table("subscription_status").select("*").execute()
-
-    # Convert to DataFrames
-    profiles_df = pd.DataFrame(profiles.data) if profiles.data else pd.DataFrame()
-    subs_df = pd.DataFrame(subscriptions.data) if subscriptions.data else pd.DataFrame()
+    subs_df = fetch_frame(
+        client, "subscription_status", columns=select_list(SUBSCRIPTION_SCHEMA), order=("user_id",)
+    )
+    apply_schema(subs_df, SUBSCRIPTION_SCHEMA)
 
     if profiles_df.empty:
         return pd.DataFrame()
@@ -52,47 +66,65 @@ def get_all_users() -> pd.DataFrame:
 
 
 @st.cache_data(ttl=CACHE_TTL)
-def get_all_meals() -> pd.DataFrame:
+def get_all_meals(columns: Tuple[str, ...] = MEAL_CACHE_COLUMNS) -> pd.DataFrame:
     """
     Fetch all meals across all users.
 
-    Returns DataFrame with all meal columns including:
-    - id, user_id, name, emoji, meal_type
-    - timestamp, photo_thumbnail_url
-    - total_calories, total_protein_g, total_carbs_g, total_fat_g
-    - sync_status, created_at
+    Served from the persistent local meal cache: after the first load,
+    each call only fetches meals changed since the previous one.
+
+    Args:
+        columns: Columns to return, e.g. PAGE_MEAL_COLUMNS["overview"]
+            (must be kept by the cache, see MEAL_CACHE_COLUMNS)
+
+    Returns DataFrame typed per MEAL_SCHEMA (timestamp is a UTC datetime,
+    meal_type/sync_status are categoricals), newest first.
     """
-    client = get_supabase_client()
+    meals_df = get_meal_cache().refresh()
+    if meals_df.empty:
+        return meals_df
+    return meals_df[list(columns)]
 
-    result = client.table("meals")\
-        .select("*")\
-        .is_("deleted_at", "null")\
-        .order("timestamp", desc=True)\
-        .execute()
 
-    return pd.DataFrame(result.data) if result.data else pd.DataFrame()
+@st.cache_resource(ttl=CACHE_TTL)
+def get_meals_frame() -> MealsFrame:
+    """
+    All meals as a MealsFrame: timestamps parsed and sorted once, with
+    binary-search time windows and a per-user index.
+
+    Cached as a resource rather than data, so every rerun and session shares
+    the same frame instead of unpickling a copy. Treat it as read-only.
+
+    Usage:
+        meals_df = get_meals_frame().scope(user_id, since, PAGE_MEAL_COLUMNS["overview"])
+    """
+    return MealsFrame(get_meal_cache().refresh())
 
 
 @st.cache_data(ttl=CACHE_TTL)
-def get_user_meals(user_id: str) -> pd.DataFrame:
+def get_user_meals(
+    user_id: str,
+    columns: Tuple[str, ...] = PAGE_MEAL_COLUMNS["user_explorer"],
+) -> pd.DataFrame:
     """
     Fetch all meals for a specific user.
 
     Args:
         user_id: UUID string of the user
+        columns: Columns to select
 
-    Returns DataFrame of user's meals, ordered by timestamp descending.
+    Returns DataFrame of user's meals (typed per MEAL_SCHEMA), ordered by
+    timestamp descending.
     """
     client = get_supabase_client()
 
-    result = client.table("meals")\
-        .select("*")\
-        .eq("user_id", user_id)\
-        .is_("deleted_at", "null")\
-        .order("timestamp", desc=True)\
-        .execute()
-
-    return pd.DataFrame(result.data) if result.data else pd.DataFrame()
+    meals_df = fetch_frame(
+        client, "meals",
+        columns=select_list(columns),
+        order=("-timestamp", "id"),
+        filters=lambda query: query.eq("user_id", user_id).is_("deleted_at", "null")
+    )
+    return apply_schema(meals_df, MEAL_SCHEMA)
 
 
 @st.cache_data(ttl=CACHE_TTL)
@@ -101,16 +133,15 @@ def get_all_ingredients() -> pd.DataFrame:
     Fetch all meal ingredients across all users.
 
     Returns DataFrame with columns:
-    - id, meal_id, name, quantity, unit
-    - usda_fdc_id, usda_description, enrichment_attempted
+    - id, meal_id, name
+    - usda_fdc_id, enrichment_attempted
     """
     client = get_supabase_client()
 
-    result = client.table("meal_ingredients")\
-        .select("*")\
-        .execute()
-
-    return pd.DataFrame(result.data) if result.data else pd.DataFrame()
+    ingredients_df = fetch_frame(
+        client, "meal_ingredients", columns=select_list(INGREDIENT_COLUMNS), order=("id",)
+    )
+    return apply_schema(ingredients_df, INGREDIENT_SCHEMA)
 
 
 @st.cache_data(ttl=CACHE_TTL)
@@ -181,57 +212,74 @@ def get_user_by_id(user_id: str) -> Optional[dict]:
     return None
 
 
-def get_activity_stats() -> dict:
+# ============================================================================
+# AGGREGATES (computed in Postgres, see 20261016_add_admin_dashboard_aggregates.sql)
+# ============================================================================
+
+@st.cache_data(ttl=CACHE_TTL)
+def _fetch_aggregate(function: str, user_id: Optional[str], since: Optional[datetime]) -> list:
+    """Cached RPC call for _call_aggregate (since already rounded)."""
+    client = get_supabase_client()
+
+    result = client.rpc(function, {
+        "p_user_id": user_id,
+        "p_since": since.isoformat() if since else None,
+    }).execute()
+
+    return result.data or []
+
+
+def _call_aggregate(function: str, user_id: Optional[str], since: Optional[datetime]) -> list:
     """
-    Calculate aggregate activity statistics.
+    Call one of the admin_* aggregate functions via RPC.
 
-    Returns dict with:
-    - total_users, total_meals, total_ingredients
-    - meals_last_7_days, meals_last_30_days
-    - active_users_7d, active_users_30d
-    - avg_meals_per_user
+    Results are cached for CACHE_TTL. since is rounded down to the minute
+    first, so a window may start up to a minute early.
+
+    Args:
+        function: SQL function name
+        user_id: Only count this user's meals (None = all users)
+        since: Only count meals logged at or after this time (None = all time)
+
+    Returns list of result rows.
     """
-    users_df = get_all_users()
-    meals_df = get_all_meals()
-    ingredients_df = get_all_ingredients()
+    # The page filters derive since from now(); rounded, reruns within the
+    # same minute hit the cache
+    if since is not None:
+        since = since.replace(second=0, microsecond=0)
+    return _fetch_aggregate(function, user_id, since)
 
-    now = datetime.now(timezone.utc)
-    seven_days_ago = now - timedelta(days=7)
-    thirty_days_ago = now - timedelta(days=30)
-
-    # Basic counts
-    stats = {
-        "total_users": len(users_df),
-        "total_meals": len(meals_df),
-        "total_ingredients": len(ingredients_df),
-    }
 
-    if meals_df.empty:
-        stats.update({
-            "meals_last_7_days": 0,
-            "meals_last_30_days": 0,
-            "active_users_7d": 0,
-            "active_users_30d": 0,
-            "avg_meals_per_user": 0,
-        })
-        return stats
+def _aggregate_frame(
+    function: str,
+    columns: list,
+    user_id: Optional[str],
+    since: Optional[datetime],
+) -> pd.DataFrame:
+    """Aggregate RPC result as a DataFrame with the given columns (empty if no meals)."""
+    rows = _call_aggregate(function, user_id, since)
+    return pd.DataFrame(rows, columns=columns)
 
-    # Convert timestamp to datetime
-    meals_df["timestamp"] = pd.to_datetime(meals_df["timestamp"])
 
-    # Recent meals
-    recent_7d = meals_df[meals_df["timestamp"] >= seven_days_ago]
-    recent_30d = meals_df[meals_df["timestamp"] >= thirty_days_ago]
+def get_activity_stats(user_id: Optional[str] = None, since: Optional[datetime] = None) -> dict:
+    """
+    Calculate aggregate activity statistics (admin_activity_stats RPC).
 
-    stats["meals_last_7_days"] = len(recent_7d)
-    stats["meals_last_30_days"] = len(recent_30d)
+    Args:
+        user_id: Only count this user's meals (None = all users)
+        since: Only count meals logged at or after this time (None = all time)
 
-    # Active users
-    stats["active_users_7d"] = recent_7d["user_id"].nunique() if not recent_7d.empty else 0
-    stats["active_users_30d"] = recent_30d["user_id"].nunique() if not recent_30d.empty else 0
+    Returns dict with:
+    - total_users, total_meals, total_ingredients
+    - meals_last_7_days, meals_last_30_days
+    - active_users_7d, active_users_30d
+    - avg_meals_per_user
+    """
+    rows = _call_aggregate("admin_activity_stats", user_id, since)
+    stats = {key: int(value or 0) for key, value in rows[0].items()} if rows else {}
 
     # Average meals per user
-    if stats["total_users"] > 0:
+    if stats.get("total_users", 0) > 0:
         stats["avg_meals_per_user"] = round(stats["total_meals"] / stats["total_users"], 1)
     else:
         stats["avg_meals_per_user"] = 0
@@ -239,71 +287,57 @@ def get_activity_stats() -> dict:
     return stats
 
 
-def get_meals_per_day(days: int = 30) -> pd.DataFrame:
+def get_meals_per_day(
+    days: Optional[int] = 30,
+    user_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+) -> pd.DataFrame:
     """
-    Get meal count per day for the last N days.
+    Get meal count per day for the last N days (admin_meals_per_day RPC, UTC days).
 
     Args:
-        days: Number of days to look back
+        days: Number of days to look back (None = all time)
+        user_id: Only count this user's meals (None = all users)
+        since: Explicit start of the window, used instead of days
 
-    Returns DataFrame with columns: date, count
+    Returns DataFrame with columns: date, count (ordered by date)
     """
-    meals_df = get_all_meals()
-
-    if meals_df.empty:
-        return pd.DataFrame(columns=["date", "count"])
-
-    meals_df["timestamp"] = pd.to_datetime(meals_df["timestamp"])
-    meals_df["date"] = meals_df["timestamp"].dt.date
-
-    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
-    recent = meals_df[meals_df["timestamp"] >= cutoff]
-
-    daily_counts = recent.groupby("date").size().reset_index(name="count")
+    if since is None and days is not None:
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+    daily_counts = _aggregate_frame("admin_meals_per_day", ["date", "count"], user_id, since)
     daily_counts["date"] = pd.to_datetime(daily_counts["date"])
 
-    return daily_counts.sort_values("date")
+    return daily_counts
 
 
-def get_meal_type_distribution() -> pd.DataFrame:
+def get_meal_type_distribution(user_id: Optional[str] = None, since: Optional[datetime] = None) -> pd.DataFrame:
     """
-    Get distribution of meal types (breakfast, lunch, dinner, snack).
+    Get distribution of meal types (admin_meal_type_distribution RPC).
+
+    Args:
+        user_id: Only count this user's meals (None = all users)
+        since: Only count meals logged at or after this time (None = all time)
 
     Returns DataFrame with columns: meal_type, count, percentage
     """
-    meals_df = get_all_meals()
-
-    if meals_df.empty:
-        return pd.DataFrame(columns=["meal_type", "count", "percentage"])
-
-    type_counts = meals_df["meal_type"].value_counts().reset_index()
-    type_counts.columns = ["meal_type", "count"]
-    type_counts["percentage"] = (type_counts["count"] / type_counts["count"].sum() * 100).round(1)
-
-    return type_counts
+    return _aggregate_frame("admin_meal_type_distribution", ["meal_type", "count", "percentage"], user_id, since)
 
 
-def get_hourly_activity() -> pd.DataFrame:
+def get_hourly_activity(user_id: Optional[str] = None, since: Optional[datetime] = None) -> pd.DataFrame:
     """
-    Get meal logging activity by hour of day and day of week.
+    Get meal logging activity by hour of day and day of week
+    (admin_hourly_activity RPC, UTC).
+
+    Args:
+        user_id: Only count this user's meals (None = all users)
+        since: Only count meals logged at or after this time (None = all time)
 
     Returns DataFrame suitable for heatmap with columns:
     - day_of_week (0=Monday, 6=Sunday)
     - hour (0-23)
     - count
     """
-    meals_df = get_all_meals()
-
-    if meals_df.empty:
-        return pd.DataFrame(columns=["day_of_week", "hour", "count"])
-
-    meals_df["timestamp"] = pd.to_datetime(meals_df["timestamp"])
-    meals_df["day_of_week"] = meals_df["timestamp"].dt.dayofweek
-    meals_df["hour"] = meals_df["timestamp"].dt.hour
-
-    hourly = meals_df.groupby(["day_of_week", "hour"]).size().reset_index(name="count")
-
-    return hourly
+    return _aggregate_frame("admin_hourly_activity", ["day_of_week", "hour", "count"], user_id, since)
 
 
 def get_top_ingredients(limit: int = 20) -> pd.DataFrame:
@@ -361,22 +395,17 @@ def get_enrichment_stats() -> dict:
     }
 
 
-def get_sync_status_distribution() -> pd.DataFrame:
+def get_sync_status_distribution(user_id: Optional[str] = None, since: Optional[datetime] = None) -> pd.DataFrame:
     """
-    Get distribution of meal sync statuses.
+    Get distribution of meal sync statuses (admin_sync_status_distribution RPC).
+
+    Args:
+        user_id: Only count this user's meals (None = all users)
+        since: Only count meals logged at or after this time (None = all time)
 
     Returns DataFrame with columns: sync_status, count, percentage
     """
-    meals_df = get_all_meals()
-
-    if meals_df.empty:
-        return pd.DataFrame(columns=["sync_status", "count", "percentage"])
-
-    status_counts = meals_df["sync_status"].value_counts().reset_index()
-    status_counts.columns = ["sync_status", "count"]
-    status_counts["percentage"] = (status_counts["count"] / status_counts["count"].sum() * 100).round(1)
-
-    return status_counts
+    return _aggregate_frame("admin_sync_status_distribution", ["sync_status", "count", "percentage"], user_id, since)
 
 
 def get_photo_stats() -> dict:
@@ -407,34 +436,23 @@ def get_photo_stats() -> dict:
     }
 
 
-def get_avg_macros_by_meal_type() -> pd.DataFrame:
+def get_avg_macros_by_meal_type(user_id: Optional[str] = None, since: Optional[datetime] = None) -> pd.DataFrame:
     """
-    Calculate average macros grouped by meal type.
+    Calculate average macros grouped by meal type (admin_avg_macros_by_meal_type RPC).
+
+    Args:
+        user_id: Only count this user's meals (None = all users)
+        since: Only count meals logged at or after this time (None = all time)
 
     Returns DataFrame with columns:
     - meal_type
     - avg_calories, avg_protein, avg_carbs, avg_fat
     """
-    meals_df = get_all_meals()
-
-    if meals_df.empty:
-        return pd.DataFrame(columns=["meal_type", "avg_calories", "avg_protein", "avg_carbs", "avg_fat"])
-
-    # Convert to numeric, handling None values
-    for col in ["total_calories", "total_protein_g", "total_carbs_g", "total_fat_g"]:
-        meals_df[col] = pd.to_numeric(meals_df[col], errors="coerce")
-
-    # Group by meal type and calculate averages
-    avg_macros = meals_df.groupby("meal_type").agg({
-        "total_calories": "mean",
-        "total_protein_g": "mean",
-        "total_carbs_g": "mean",
-        "total_fat_g": "mean",
-    }).round(1).reset_index()
-
-    avg_macros.columns = ["meal_type", "avg_calories", "avg_protein", "avg_carbs", "avg_fat"]
-
-    return avg_macros
+    return _aggregate_frame(
+        "admin_avg_macros_by_meal_type",
+        ["meal_type", "avg_calories", "avg_protein", "avg_carbs", "avg_fat"],
+        user_id, since
+    )
 
 
 def get_user_subscription(user_id: str) -> Optional[dict]:
@@ -559,9 +577,8 @@ def get_all_onboarding() -> pd.DataFrame:
     """
     client = get_supabase_client()
 
-    result = client.table("user_onboarding").select("*").execute()
-
-    return pd.DataFrame(result.data) if result.data else pd.DataFrame()
+    result_df = fetch_frame(client, "user_onboarding", columns=select_list(ONBOARDING_SCHEMA), order=("user_id",))
+    return apply_schema(result_df, ONBOARDING_SCHEMA)
 
 
 @st.cache_data(ttl=CACHE_TTL)
@@ -575,9 +592,8 @@ def get_meal_reminder_settings() -> pd.DataFrame:
     """
     client = get_supabase_client()
 
-    result = client.table("meal_reminder_settings").select("*").execute()
-
-    return pd.DataFrame(result.data) if result.data else pd.DataFrame()
+    result_df = fetch_frame(client, "meal_reminder_settings", columns=select_list(REMINDER_SETTINGS_SCHEMA), order=("user_id",))
+    return apply_schema(result_df, REMINDER_SETTINGS_SCHEMA)
 
 
 @st.cache_data(ttl=CACHE_TTL)
@@ -591,9 +607,8 @@ def get_meal_windows() -> pd.DataFrame:
     """
     client = get_supabase_client()
 
-    result = client.table("meal_windows").select("*").execute()
-
-    return pd.DataFrame(result.data) if result.data else pd.DataFrame()
+    result_df = fetch_frame(client, "meal_windows", columns=select_list(MEAL_WINDOW_SCHEMA), order=("id",))
+    return apply_schema(result_df, MEAL_WINDOW_SCHEMA)
 
 
 def get_onboarding_stats() -> dict:
@@ -78,6 +78,10 @@ def filter_dataframe_by_time(
 
     # Ensure timestamp column is datetime
     if timestamp_column in df.columns:
+        if isinstance(df[timestamp_column].dtype, pd.DatetimeTZDtype):
+            # Already parsed at fetch time: no copy, no re-parse
+            return df[df[timestamp_column] >= cutoff]
+
         df = df.copy()
         df[timestamp_column] = pd.to_datetime(df[timestamp_column])
 
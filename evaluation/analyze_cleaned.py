@@ -6,38 +6,7 @@ Analyze cleaned ingredient names (same cleaning as FuzzyMatchingService).
 import json
 from collections import Counter
 
-# Same cleaning logic as FuzzyMatchingService.swift
-COOKING_METHODS = [
-    "grilled", "baked", "fried", "steamed", "roasted", "boiled",
-    "sauteed", "sautéed", "pan-fried", "deep-fried", "stir-fried",
-    "broiled", "braised", "poached", "smoked", "cooked"
-]
-
-ADJECTIVES = [
-    "fresh", "frozen", "raw", "organic", "free-range",
-    "grass-fed", "wild-caught", "farm-raised", "extra", "premium",
-    "chopped", "diced", "sliced", "minced", "shredded", "grated",
-    "whole", "half", "quarter"
-]
-
-def clean_ingredient_name(name):
-    """Replicate FuzzyMatchingService cleaning logic."""
-    cleaned = name.lower()
-
-    # Remove cooking methods
-    for method in COOKING_METHODS:
-        cleaned = cleaned.replace(method, "")
-
-    # Remove adjectives
-    for adj in ADJECTIVES:
-        cleaned = cleaned.replace(adj, "")
-
-    # Clean up
-    cleaned = cleaned.replace(",", " ")
-    cleaned = " ".join(cleaned.split())  # Normalize whitespace
-
-    return cleaned.strip()
-
+from ingredient_normalizer import clean_ingredient_name
 
 def main():
     # Load results
@@ -78,7 +47,7 @@ def main():
 
     # Save for reference
     analysis = {
-        "cleaned_to_raw": {k: list(set(v)) for k, v in raw_to_cleaned.items()},
+        "cleaned_to_raw": {k: sorted(set(v)) for k, v in raw_to_cleaned.items()},
         "frequency": dict(cleaned_counter.most_common())
     }
 
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Generate the ingredient_shortcuts table into the USDA database.
+
+Replaces hand-editing commonFoodShortcuts with a data-driven table the app
+reads with one primary-key lookup (LocalUSDAService.getShortcut):
+
+    1. Name frequencies from results/cleaned_analysis.json and, optionally,
+       production meal_ingredients (names plus the fdc_id the app settled on)
+    2. Batch resolution against the USDA database, in order of trust:
+         app         - commonFoodShortcuts in FuzzyMatchingService.swift
+         verified    - results/verified_shortcuts.json
+         production  - fdc_id most meal_ingredients rows agree on
+         search      - FTS5 (or LIKE) candidate that contains every query
+                       word and starts with one of them, shortest first
+    3. One transaction that replaces ingredient_shortcuts, keyed by the
+       cleaned name (cleanIngredientName output), indexed by fdc_id
+
+For the bundle, let scripts/build_usda_db.py --shortcuts run this as its
+shortcuts stage: a table written straight into a finalized bundle is lost
+when the next build re-finalizes it from the build database.
+
+Usage:
+    python3 build_shortcut_table.py
+    python3 build_shortcut_table.py --db path/to/usda_nutrients.db --min-count 2 --dry-run
+    SUPABASE_URL=... SUPABASE_SERVICE_ROLE_KEY=... python3 build_shortcut_table.py --production
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from ingredient_normalizer import clean_ingredient_name
+from usda_search import DB_PATH, LocalUSDASearch, search_words
+
+SWIFT_SERVICE = "../Food1/Services/FuzzyMatchingService.swift"
+SOURCES = ["app", "verified", "production", "search"]
+
+# Production rows only count as votes when something actually chose the fdc_id
+PRODUCTION_METHODS = {"fuzzy_match", "llm_reranking", "manual"}
+PRODUCTION_MIN_VOTES = 3
+PRODUCTION_MIN_SHARE = 0.6
+PRODUCTION_PAGE_SIZE = 1000
+
+SEARCH_CANDIDATES = 20
+
+SHORTCUTS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS ingredient_shortcuts (
+        name TEXT PRIMARY KEY,
+        fdc_id INTEGER NOT NULL,
+        source TEXT NOT NULL,
+        frequency INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_ingredient_shortcuts_fdc ON ingredient_shortcuts(fdc_id);
+"""
+
+
+def load_analysis_frequencies(path):
+    """
+    cleaned name -> occurrences, from cleaned_analysis.json.
+
+    The raw variants are re-cleaned with the word-boundary port, so keys
+    produced by the old substring cleaning ("stberries") land on the name
+    the app actually looks up ("strawberries").
+    """
+    with open(path) as f:
+        analysis = json.load(f)
+
+    frequencies = Counter()
+    for old_name, count in analysis["frequency"].items():
+        variants = analysis["cleaned_to_raw"].get(old_name) or [old_name]
+        names = [clean_ingredient_name(raw) for raw in variants]
+        for name in names:
+            if name:
+                frequencies[name] += count / len(names)
+    return Counter({name: round(count) for name, count in frequencies.items()})
+
+
+def load_production_votes(page_size=PRODUCTION_PAGE_SIZE):
+    """
+    (frequencies, votes) from meal_ingredients, read page by page.
+
+    votes maps cleaned name -> Counter of the usda_fdc_id rows settled on.
+    Needs the supabase package and SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY.
+    """
+    try:
+        from supabase import create_client
+    except ImportError:
+        print("supabase package not installed (pip install supabase)")
+        sys.exit(1)
+
+    url = os.environ.get("SUPABASE_URL")
+    key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+    if not url or not key:
+        print("Set SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY to read meal_ingredients")
+        sys.exit(1)
+
+    client = create_client(url, key)
+    frequencies = Counter()
+    votes = defaultdict(Counter)
+    start = 0
+    while True:
+        rows = (
+            client.table("meal_ingredients")
+            .select("name, usda_fdc_id, enrichment_method")
+            .order("id")
+            .range(start, start + page_size - 1)
+            .execute()
+            .data
+        )
+        for row in rows:
+            name = clean_ingredient_name(row["name"] or "")
+            if not name:
+                continue
+            frequencies[name] += 1
+            if row["usda_fdc_id"] and row["enrichment_method"] in PRODUCTION_METHODS:
+                votes[name][row["usda_fdc_id"]] += 1
+        if len(rows) < page_size:
+            break
+        start += page_size
+
+    return frequencies, votes
+
+
+def load_app_shortcuts(path):
+    """commonFoodShortcuts entries ("name": fdcId) parsed from the Swift source."""
+    source = Path(path).read_text()
+    block = re.search(r"commonFoodShortcuts: \[String: Int\] = \[(.*?)\n\s*\]", source, re.DOTALL)
+    if not block:
+        return {}
+    return {name: int(fdc_id) for name, fdc_id in re.findall(r'"([^"]+)":\s*(\d+)', block.group(1))}
+
+
+def load_verified_shortcuts(path):
+    with open(path) as f:
+        return {name: entry["fdc_id"] for name, entry in json.load(f).items()}
+
+
+def production_choice(counter):
+    """The fdc_id most rows agree on, if enough rows and a clear majority do."""
+    if not counter:
+        return None
+    fdc_id, count = counter.most_common(1)[0]
+    if count >= PRODUCTION_MIN_VOTES and count / sum(counter.values()) >= PRODUCTION_MIN_SHARE:
+        return fdc_id
+    return None
+
+
+def word_forms(word):
+    """The word plus its naive singular/plural, so "tomatoes" matches "tomato"."""
+    forms = {word, word + "s"}
+    if word.endswith("es"):
+        forms.add(word[:-2])
+    if word.endswith("s"):
+        forms.add(word[:-1])
+    return forms
+
+
+def is_confident(words, description):
+    """
+    Every query word appears in the description, and one of them is its
+    first word - USDA leads with the food itself ("Cheese, cheddar"), so
+    "bacon" does not resolve to "Salad dressing, bacon and tomato".
+    """
+    lowered = description.lower()
+    words_in_order = re.findall(r"\w+", lowered)
+    tokens = set(words_in_order)
+    if not words_in_order or not all(word_forms(word) & tokens for word in words):
+        return False
+    return any(words_in_order[0] in word_forms(word) for word in words)
+
+
+def search_choice(searcher, name, strategy):
+    """
+    Shortest confident candidate for a name (see is_confident).
+
+    Names no top candidate confidently matches stay unresolved - the app's
+    search and rerank handle those better than a guess would.
+    """
+    words = search_words(name)
+    if not words:
+        return None
+
+    confident = [row for row in searcher.search(name, strategy, SEARCH_CANDIDATES) if is_confident(words, row[1])]
+    if not confident:
+        return None
+    # Prefer the plain food ("Spinach, raw") over prepared variants
+    return min(confident, key=lambda row: ("raw" not in row[1].lower(), len(row[1])))[0]
+
+
+def resolve(searcher, frequencies, curated, votes, min_count):
+    """
+    name -> (fdc_id, source, frequency) for every curated name and every
+    observed name seen at least min_count times.
+    """
+    existing = set()
+    ids = {fdc_id for entries in curated.values() for fdc_id in entries.values()}
+    ids |= {fdc_id for counter in votes.values() for fdc_id in counter}
+    if ids:
+        placeholders = ",".join("?" * len(ids))
+        existing = {row[0] for row in searcher.conn.execute(
+            f"SELECT fdc_id FROM usda_foods WHERE fdc_id IN ({placeholders})", list(ids)
+        )}
+
+    strategy = "fts" if "fts" in searcher.available else "like"
+    resolved = {}
+    missing = []
+
+    for source in ["app", "verified"]:
+        for name, fdc_id in curated.get(source, {}).items():
+            if name in resolved:
+                continue
+            if fdc_id in existing:
+                resolved[name] = (fdc_id, source, frequencies.get(name, 0))
+            else:
+                missing.append((name, fdc_id, source))
+
+    for name, count in frequencies.most_common():
+        if name in resolved or count < min_count:
+            continue
+        fdc_id = production_choice(votes.get(name))
+        if fdc_id is not None and fdc_id in existing:
+            resolved[name] = (fdc_id, "production", count)
+            continue
+        fdc_id = search_choice(searcher, name, strategy)
+        if fdc_id is not None:
+            resolved[name] = (fdc_id, "search", count)
+
+    return resolved, missing
+
+
+def write_shortcuts(db_path, resolved):
+    """Replace ingredient_shortcuts in one transaction."""
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.executescript(SHORTCUTS_SCHEMA)
+        conn.execute("DELETE FROM ingredient_shortcuts")
+        conn.executemany(
+            "INSERT INTO ingredient_shortcuts (name, fdc_id, source, frequency) VALUES (?, ?, ?, ?)",
+            [(name, fdc_id, source, frequency) for name, (fdc_id, source, frequency) in sorted(resolved.items())]
+        )
+    conn.execute("ANALYZE ingredient_shortcuts")
+    conn.close()
+
+
+def build_shortcuts(db_path, analysis_path, verified_path, swift_path, min_count, production=False):
+    """
+    Resolve every shortcut against db_path without writing anything.
+
+    Returns:
+        Report dict: frequencies, curated, votes, resolved, missing
+    """
+    frequencies = load_analysis_frequencies(analysis_path)
+    votes = {}
+    if production:
+        production_frequencies, votes = load_production_votes()
+        frequencies.update(production_frequencies)
+
+    curated = {}
+    if Path(swift_path).exists():
+        curated["app"] = load_app_shortcuts(swift_path)
+    if Path(verified_path).exists():
+        curated["verified"] = load_verified_shortcuts(verified_path)
+
+    searcher = LocalUSDASearch(db_path)
+    resolved, missing = resolve(searcher, frequencies, curated, votes, min_count)
+    searcher.close()
+    return {"frequencies": frequencies, "curated": curated, "votes": votes, "resolved": resolved, "missing": missing}
+
+
+def print_report(report, min_count, production=False):
+    frequencies, curated, votes = report["frequencies"], report["curated"], report["votes"]
+    resolved, missing = report["resolved"], report["missing"]
+
+    print("=" * 72)
+    print("INGREDIENT SHORTCUTS")
+    print("=" * 72)
+    print(f"Observed names:  {len(frequencies)}  (min count {min_count})")
+    print("Curated names:   " + ", ".join(f"{s} {len(curated.get(s, {}))}" for s in ["app", "verified"]))
+    if production:
+        print(f"Production:      {sum(1 for c in votes.values() if production_choice(c))} names with a consensus fdc_id")
+    print()
+
+    by_source = Counter(source for _, source, _ in resolved.values())
+    for source in SOURCES:
+        print(f"  {source:<12}{by_source.get(source, 0):>6}")
+    print(f"  {'total':<12}{len(resolved):>6}")
+
+    covered = sum(frequencies[name] for name in resolved if name in frequencies)
+    total = sum(frequencies.values())
+    if total:
+        print(f"\nOccurrences covered by a shortcut: {covered}/{total} ({covered / total:.1%})")
+
+    unresolved = [name for name, count in frequencies.most_common() if name not in resolved and count >= min_count]
+    if unresolved:
+        print(f"\nUnresolved ({len(unresolved)}), left to search + rerank:")
+        for name in unresolved[:20]:
+            print(f"  - {name} ({frequencies[name]})")
+
+    if missing:
+        print(f"\nCurated fdc_ids not in this database ({len(missing)}):")
+        for name, fdc_id, source in missing:
+            print(f"  - {name} -> {fdc_id} ({source})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the ingredient_shortcuts table")
+    parser.add_argument("--db", default=DB_PATH, help=f"USDA database to write into (default: {DB_PATH})")
+    parser.add_argument("--analysis", default="results/cleaned_analysis.json", help="Cleaned name frequencies")
+    parser.add_argument("--verified", default="results/verified_shortcuts.json", help="Verified cleaned name -> fdc_id")
+    parser.add_argument("--swift", default=SWIFT_SERVICE, help="FuzzyMatchingService.swift with commonFoodShortcuts")
+    parser.add_argument("--production", action="store_true", help="Add meal_ingredients names and fdc_ids from Supabase")
+    parser.add_argument("--min-count", type=int, default=1, help="Minimum occurrences to auto-resolve a name (default: 1)")
+    parser.add_argument("--dry-run", action="store_true", help="Resolve and report without writing the table")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists() or Path(args.db).stat().st_size == 0:
+        print(f"Database not found or empty: {args.db}")
+        sys.exit(1)
+
+    report = build_shortcuts(args.db, args.analysis, args.verified, args.swift, args.min_count, args.production)
+    print_report(report, args.min_count, args.production)
+
+    if args.dry_run:
+        print("\nDry run - table not written")
+        return
+
+    write_shortcuts(args.db, report["resolved"])
+    print(f"\nWrote {len(report['resolved'])} rows to ingredient_shortcuts in {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,8 @@ Create verified ingredient shortcuts based on evaluation results.
 import sqlite3
 import json
 
+from ingredient_normalizer import clean_ingredient_name
+
 def search_specific(cursor, query):
     """Search with exact description match preference."""
     cursor.execute("""
@@ -61,7 +63,9 @@ def main():
 
     shortcuts = {}
 
-    for cleaned_name, search_term in searches:
+    for name, search_term in searches:
+        # Key by what the app actually looks up ("bread whole wheat" -> "bread wheat")
+        cleaned_name = clean_ingredient_name(name)
         results = search_specific(cursor, search_term)
 
         if results:
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Replay every evaluation ingredient through the app's USDA search path.
+
+For each ingredient in results/evaluation_results.json, candidates are
+retrieved the way FuzzyMatchingService does (original name, then cleaned
+name) with each strategy - the app's LIKE query, FTS5 and trigram - and
+compared against the verified fdc_id for its cleaned name.
+
+Reports recall@1/5/50 (over ingredients with a verified label) and
+per-query latency side by side, and saves results/search_evaluation.json.
+
+Usage:
+    python3 evaluate_search.py
+    python3 evaluate_search.py --db path/to/usda_nutrients.db --labels results/verified_shortcuts.json
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from usda_search import CANDIDATE_LIMIT, DB_PATH, STRATEGIES, LocalUSDASearch, clean_ingredient_name
+
+RECALL_AT = [1, 5, 50]
+
+
+def load_ingredients(path):
+    """Every ingredient name the model produced, one entry per occurrence."""
+    with open(path) as f:
+        results = json.load(f)
+
+    names = []
+    for r in results:
+        if "result" in r.get("response", {}):
+            for pred in r["response"]["result"].get("predictions", []):
+                for ing in pred.get("ingredients", []):
+                    names.append(ing["name"])
+    return names
+
+
+def load_labels(path):
+    """cleaned name -> set of acceptable fdc_ids (verified_shortcuts.json format, or plain ids)."""
+    with open(path) as f:
+        raw = json.load(f)
+
+    labels = {}
+    for name, value in raw.items():
+        if isinstance(value, dict):
+            value = value["fdc_id"]
+        labels[name] = set(value) if isinstance(value, list) else {value}
+    return labels
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+def evaluate(searcher, ingredients, labels, strategy):
+    """Recall and latency for one strategy over every ingredient."""
+    hits = {k: 0 for k in RECALL_AT}
+    labeled = 0
+    latencies = []
+    misses = []
+
+    for name in ingredients:
+        start = time.perf_counter()
+        candidates = searcher.candidates(name, strategy, CANDIDATE_LIMIT)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        expected = labels.get(clean_ingredient_name(name))
+        if not expected:
+            continue
+
+        labeled += 1
+        ids = [row[0] for row in candidates]
+        rank = next((i + 1 for i, fdc_id in enumerate(ids) if fdc_id in expected), None)
+        for k in RECALL_AT:
+            if rank is not None and rank <= k:
+                hits[k] += 1
+        if rank is None:
+            misses.append(name)
+
+    return {
+        "strategy": strategy,
+        "queries": len(ingredients),
+        "labeled": labeled,
+        "recall": {f"@{k}": round(hits[k] / labeled, 3) if labeled else None for k in RECALL_AT},
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "mean": round(statistics.mean(latencies), 3) if latencies else 0.0,
+        },
+        "misses": sorted(set(misses)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall and latency of USDA search strategies")
+    parser.add_argument("--db", default=DB_PATH, help=f"USDA database (default: {DB_PATH})")
+    parser.add_argument("--results", default="results/evaluation_results.json", help="Evaluation results to replay")
+    parser.add_argument("--labels", default="results/verified_shortcuts.json", help="Verified cleaned name -> fdc_id")
+    parser.add_argument("--output", default="results/search_evaluation.json", help="Where to save the report")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists() or Path(args.db).stat().st_size == 0:
+        print(f"Database not found or empty: {args.db}")
+        sys.exit(1)
+
+    ingredients = load_ingredients(args.results)
+    labels = load_labels(args.labels)
+    searcher = LocalUSDASearch(args.db)
+
+    print("=" * 72)
+    print("USDA SEARCH EVALUATION")
+    print("=" * 72)
+    print(f"Ingredients: {len(ingredients)}  (labels for {len(labels)} cleaned names)")
+    skipped = [s for s in STRATEGIES if s not in searcher.available]
+    if skipped:
+        print(f"Skipping (index not in database): {', '.join(skipped)}")
+
+    reports = [evaluate(searcher, ingredients, labels, s) for s in searcher.available]
+    searcher.close()
+
+    print()
+    print(f"{'strategy':<10}{'labeled':>9}{'R@1':>8}{'R@5':>8}{'R@50':>8}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+    for r in reports:
+        recall = r["recall"]
+        latency = r["latency_ms"]
+        cells = [f"{recall[f'@{k}']:.3f}" if recall[f"@{k}"] is not None else "-" for k in RECALL_AT]
+        print(f"{r['strategy']:<10}{r['labeled']:>9}{cells[0]:>8}{cells[1]:>8}{cells[2]:>8}"
+              f"{latency['p50']:>10.3f}{latency['p95']:>10.3f}{latency['mean']:>10.3f}")
+
+    for r in reports:
+        if r["misses"]:
+            print(f"\n{r['strategy']} missed (not in top {CANDIDATE_LIMIT}):")
+            for name in r["misses"]:
+                print(f"  - {name}")
+
+    with open(args.output, "w") as f:
+        json.dump({"database": args.db, "strategies": reports}, f, indent=2)
+
+    print()
+    print(f"Saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,8 @@ Find USDA fdcIds for top ingredients by querying the database.
 import sqlite3
 import json
 
+from ingredient_normalizer import clean_ingredient_name
+
 # Top cleaned ingredient names to find matches for
 TOP_INGREDIENTS = [
     "rice white",
@@ -65,7 +67,8 @@ def main():
 
     matches = {}
 
-    for ingredient in TOP_INGREDIENTS:
+    # Same keys the app looks up (e.g. "bread whole wheat" -> "bread wheat")
+    for ingredient in dict.fromkeys(clean_ingredient_name(name) for name in TOP_INGREDIENTS):
         print(f"\n{'='*80}")
         print(f"Query: \"{ingredient}\"")
         print("-" * 80)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Python reference port of the app's USDA search path.
+
+Mirrors LocalUSDAService.search (stopwords, OR of LIKE conditions, ranked by
+matched-word count), with FuzzyMatchingService.cleanIngredientName from
+ingredient_normalizer.py, so search quality and speed can be measured against
+a .db file without an iPhone.
+
+FTS5 and trigram strategies use the food_search / food_search_trigram indexes
+built by scripts/populate_usda_db.py, with the same word filtering.
+
+The query builders, stopwords and bm25 weights are imported from scripts/
+(search_usda_db.py, benchmark_usda_db.py, populate_usda_db.py), so the
+evaluation always measures the same queries the database tools build.
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+from ingredient_normalizer import clean_ingredient_name
+
+# Shared with the database tools: the app's query shapes and FTS settings
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+import search_usda_db  # noqa: E402
+from search_usda_db import search_words  # noqa: E402,F401 (re-exported for build_shortcut_table)
+
+DB_PATH = "../Food1/Data/usda_nutrients.db"
+CANDIDATE_LIMIT = 50  # FuzzyMatchingService asks for 50 candidates
+
+STRATEGIES = ["like", "fts", "trigram"]
+
+
+class LocalUSDASearch:
+    """LocalUSDAService over a SQLite file, with FTS5/trigram alternatives."""
+
+    def __init__(self, db_path=DB_PATH):
+        self.conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        tables = {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self.available = ["like"]
+        fts_sql = self.conn.execute("SELECT sql FROM sqlite_master WHERE name = 'food_search'").fetchone()
+        # Only the fdc_id-keyed index is usable (older builds indexed implicit rowids)
+        if fts_sql and "content_rowid='fdc_id'" in fts_sql[0]:
+            self.available.append("fts")
+        if "food_search_trigram" in tables:
+            self.available.append("trigram")
+
+    def close(self):
+        self.conn.close()
+
+    def search(self, query, strategy="like", limit=10):
+        """
+        One search through the shared builders in scripts/search_usda_db.py.
+
+        "like" is the LocalUSDAService.search port; "fts" and "trigram" use
+        the same words against food_search / food_search_trigram.
+        """
+        return search_usda_db.search(self.conn, query, strategy, limit)
+
+    def get_food(self, fdc_id):
+        """Port of LocalUSDAService.getFood(byId:)."""
+        return self.conn.execute(
+            "SELECT fdc_id, description, common_name, category FROM usda_foods WHERE fdc_id = ?", (fdc_id,)
+        ).fetchone()
+
+    def candidates(self, ingredient_name, strategy="like", limit=CANDIDATE_LIMIT):
+        """
+        Candidate retrieval from FuzzyMatchingService.matchWithMethod.
+
+        Searches the lowercased original name first (keeps ", raw" for exact
+        matches), then the cleaned name if that found nothing.
+        """
+        normalized = ingredient_name.lower().strip()
+        results = self.search(normalized, strategy, limit)
+        if not results:
+            cleaned = clean_ingredient_name(ingredient_name)
+            if cleaned:
+                results = self.search(cleaned, strategy, limit)
+        return results
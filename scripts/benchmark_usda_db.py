@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+USDA Database Query Benchmark
+
+Replays the query shapes the app actually runs against a built
+usda_nutrients.db and reports latency percentiles per workload:
+
+    - search_Nw     LocalUSDAService.search: OR of LIKE conditions over
+                    description/common_name, ranked by matched-word count,
+                    for N = 1..6 words, limit 50
+    - micronutrients LocalUSDAService.getMicronutrients join
+    - food_by_id    LocalUSDAService.getFood(byId:)
+
+Search queries are sampled deterministically from the database's own
+descriptions (or read from --queries, one per line), so runs are comparable
+across builds. EXPLAIN QUERY PLAN is captured for every workload.
+
+Save a baseline once, then compare later builds against it; the run fails
+(exit 1) when any workload's p95 regresses by more than --tolerance.
+
+Usage:
+    python benchmark_usda_db.py --db Food1/Data/usda_nutrients.db
+    python benchmark_usda_db.py --db new.db --save-baseline benchmarks/usda_baseline.json
+    python benchmark_usda_db.py --db new.db --baseline benchmarks/usda_baseline.json
+"""
+
+import sqlite3
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# ==============================================================================
+# Configuration
+# ==============================================================================
+
+ITERATIONS = 200  # Timed executions per workload
+WARMUP = 20  # Untimed executions per workload (page cache, statement cache)
+SEARCH_LIMIT = 50
+MAX_SEARCH_WORDS = 6
+TOLERANCE = 0.25  # Allowed p95 slowdown vs baseline (25%)
+NOISE_FLOOR_MS = 0.1  # Regressions smaller than this are timer noise
+SEED = 1234
+
+# Same stopwords as LocalUSDAService.search
+STOPWORDS = {
+    "or", "and", "similar", "like", "a", "an", "the", "with", "without",
+    "all", "classes", "types", "varieties", "kinds", "any", "some"
+}
+
+# Same exclusions as LocalUSDAService.getMicronutrients
+MICRONUTRIENTS_SQL = """
+    SELECT n.name, n.unit, fn.amount
+    FROM food_nutrients fn
+    INNER JOIN nutrients n ON fn.nutrient_id = n.nutrient_id
+    WHERE fn.fdc_id = ?
+    AND n.name NOT IN ('Protein', 'Carbohydrate', 'Total Fat', 'Energy')
+"""
+
+FOOD_BY_ID_SQL = "SELECT fdc_id, description, common_name, category FROM usda_foods WHERE fdc_id = ?"
+
+
+# ==============================================================================
+# App Query Shapes
+# ==============================================================================
+
+def clean_search_query(query: str) -> str:
+    """Port of LocalUSDAService.cleanSearchQuery"""
+    cleaned = query.lower().replace(",", " ").strip()
+    while "  " in cleaned:
+        cleaned = cleaned.replace("  ", " ")
+    return cleaned
+
+
+def build_like_search(query: str, limit: int = SEARCH_LIMIT) -> Optional[Tuple[str, List]]:
+    """
+    Port of the SQL LocalUSDAService.search prepares
+
+    Returns (sql, params), or None when nothing is left after stopwords.
+    """
+    cleaned = clean_search_query(query)
+    words = [word for word in cleaned.split(" ") if word and word not in STOPWORDS]
+    if not words:
+        return None
+
+    where_clause = " OR ".join("(description LIKE ? OR common_name LIKE ?)" for _ in words)
+    score_clause = " + ".join(
+        "(CASE WHEN description LIKE ? OR common_name LIKE ? THEN 1 ELSE 0 END)" for _ in words
+    )
+    sql = f"""
+        SELECT fdc_id, description, common_name, category
+        FROM usda_foods
+        WHERE {where_clause}
+        ORDER BY ({score_clause}) DESC
+        LIMIT ?
+    """
+
+    patterns = [f"%{word}%" for word in words for _ in range(2)]
+    return sql, patterns + patterns + [limit]
+
+
+# ==============================================================================
+# Workloads
+# ==============================================================================
+
+@dataclass
+class Workload:
+    """One query shape with the parameter sets to replay"""
+    name: str
+    cases: List[Tuple[str, List]]  # (sql, params)
+
+
+@dataclass
+class WorkloadResult:
+    name: str
+    iterations: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    mean_rows: float
+    query_plan: List[str] = field(default_factory=list)
+
+
+def sample_vocabulary(conn: sqlite3.Connection) -> List[str]:
+    """Distinct description words, the same kind of terms ingredient names use"""
+    words = set()
+    for (description,) in conn.execute("SELECT description FROM usda_foods"):
+        for word in re.split(r"[\s,()/]+", description.lower()):
+            if len(word) >= 3 and word.isalpha() and word not in STOPWORDS:
+                words.add(word)
+    return sorted(words)
+
+
+def build_workloads(
+    conn: sqlite3.Connection,
+    queries: Optional[List[str]] = None,
+    cases_per_workload: int = 50,
+    seed: int = SEED
+) -> List[Workload]:
+    """Deterministic parameter sets for every app query shape"""
+    rng = random.Random(seed)
+    workloads = []
+
+    if queries:
+        # Group real queries by how many words survive the app's filtering
+        by_words: Dict[int, List[Tuple[str, List]]] = {}
+        for query in queries:
+            built = build_like_search(query)
+            if built:
+                word_count = min(len(built[1]) // 4, MAX_SEARCH_WORDS)
+                by_words.setdefault(word_count, []).append(built)
+        for word_count in sorted(by_words):
+            workloads.append(Workload(f"search_{word_count}w", by_words[word_count]))
+    else:
+        vocabulary = sample_vocabulary(conn)
+        for word_count in range(1, MAX_SEARCH_WORDS + 1):
+            cases = [
+                build_like_search(" ".join(rng.sample(vocabulary, word_count)))
+                for _ in range(cases_per_workload)
+            ]
+            workloads.append(Workload(f"search_{word_count}w", cases))
+
+    fdc_ids = [row[0] for row in conn.execute("SELECT fdc_id FROM usda_foods ORDER BY fdc_id")]
+    sampled_ids = [rng.choice(fdc_ids) for _ in range(cases_per_workload)] if fdc_ids else []
+    workloads.append(Workload("micronutrients", [(MICRONUTRIENTS_SQL, [i]) for i in sampled_ids]))
+    workloads.append(Workload("food_by_id", [(FOOD_BY_ID_SQL, [i]) for i in sampled_ids]))
+
+    return workloads
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def query_plan(conn: sqlite3.Connection, sql: str, params: List) -> List[str]:
+    """EXPLAIN QUERY PLAN as indented lines"""
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    depth = {0: 0}
+    lines = []
+    for node_id, parent_id, _, detail in rows:
+        depth[node_id] = depth.get(parent_id, 0) + 1
+        lines.append("  " * (depth[node_id] - 1) + detail)
+    return lines
+
+
+def run_workload(
+    conn: sqlite3.Connection,
+    workload: Workload,
+    iterations: int = ITERATIONS,
+    warmup: int = WARMUP,
+    clock: Callable[[], int] = time.perf_counter_ns
+) -> WorkloadResult:
+    """Time iterations executions, cycling through the workload's cases"""
+    cases = workload.cases
+    for i in range(warmup):
+        sql, params = cases[i % len(cases)]
+        conn.execute(sql, params).fetchall()
+
+    timings = []
+    rows = 0
+    for i in range(iterations):
+        sql, params = cases[i % len(cases)]
+        start = clock()
+        rows += len(conn.execute(sql, params).fetchall())
+        timings.append((clock() - start) / 1e6)
+
+    timings.sort()
+    return WorkloadResult(
+        name=workload.name,
+        iterations=iterations,
+        p50_ms=round(percentile(timings, 50), 4),
+        p95_ms=round(percentile(timings, 95), 4),
+        p99_ms=round(percentile(timings, 99), 4),
+        max_ms=round(timings[-1], 4),
+        mean_rows=round(rows / iterations, 1),
+        query_plan=query_plan(conn, *cases[0])
+    )
+
+
+# ==============================================================================
+# Baseline Comparison
+# ==============================================================================
+
+def compare_to_baseline(
+    results: List[WorkloadResult],
+    baseline: Dict,
+    tolerance: float = TOLERANCE
+) -> List[str]:
+    """Return one message per regressed workload (empty list = pass)"""
+    regressions = []
+    previous = {w["name"]: w for w in baseline.get("workloads", [])}
+
+    for result in results:
+        before = previous.get(result.name)
+        if before is None:
+            print(f"   ℹ️  {result.name}: not in baseline")
+            continue
+
+        limit = before["p95_ms"] * (1 + tolerance)
+        if result.p95_ms > limit and result.p95_ms - before["p95_ms"] > NOISE_FLOOR_MS:
+            regressions.append(
+                f"{result.name}: p95 {result.p95_ms:.3f}ms > {limit:.3f}ms "
+                f"(baseline {before['p95_ms']:.3f}ms +{tolerance:.0%})"
+            )
+        if before.get("query_plan") and before["query_plan"] != result.query_plan:
+            print(f"   ⚠️  {result.name}: query plan changed")
+            for line in result.query_plan:
+                print(f"        {line}")
+
+    return regressions
+
+
+def print_results(results: List[WorkloadResult], show_plans: bool = False):
+    print(f"{'Workload':<16} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'rows':>7}")
+    print("-" * 64)
+    for r in results:
+        print(f"{r.name:<16} {r.p50_ms:>9.3f} {r.p95_ms:>9.3f} {r.p99_ms:>9.3f} {r.max_ms:>9.3f} {r.mean_rows:>7.1f}")
+        if show_plans:
+            for line in r.query_plan:
+                print(f"    {line}")
+
+
+def benchmark(
+    db_path: str,
+    iterations: int = ITERATIONS,
+    queries: Optional[List[str]] = None,
+    seed: int = SEED
+) -> Dict:
+    """Run every workload against db_path and return the JSON-ready report"""
+    # Read-only, like the bundled database on device
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        workloads = build_workloads(conn, queries=queries, seed=seed)
+        results = [run_workload(conn, w, iterations=iterations) for w in workloads if w.cases]
+        food_count = conn.execute("SELECT COUNT(*) FROM usda_foods").fetchone()[0]
+    finally:
+        conn.close()
+
+    return {
+        "database": str(db_path),
+        "food_count": food_count,
+        "sqlite_version": sqlite3.sqlite_version,
+        "iterations": iterations,
+        "seed": seed,
+        "workloads": results,
+    }
+
+
+# ==============================================================================
+# CLI
+# ==============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark app query shapes against a USDA database")
+    parser.add_argument("--db", default="Food1/Data/usda_nutrients.db", help="Database to benchmark")
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=ITERATIONS,
+        help=f"Timed executions per workload (default: {ITERATIONS})"
+    )
+    parser.add_argument("--queries", help="Text file of search queries, one per line (default: sampled from the DB)")
+    parser.add_argument("--seed", type=int, default=SEED, help="Sampling seed for generated workloads")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against (exit 1 on regression)")
+    parser.add_argument("--save-baseline", help="Write this run's results as a baseline JSON")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=TOLERANCE,
+        help=f"Allowed p95 slowdown vs baseline as a fraction (default: {TOLERANCE})"
+    )
+    parser.add_argument("--plans", action="store_true", help="Print EXPLAIN QUERY PLAN for each workload")
+
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"❌ Database not found: {args.db}")
+        sys.exit(1)
+
+    queries = None
+    if args.queries:
+        queries = [line.strip() for line in Path(args.queries).read_text().splitlines() if line.strip()]
+
+    print(f"⏱️  Benchmarking {args.db} ({args.iterations} iterations per workload)")
+    print()
+    report = benchmark(args.db, iterations=args.iterations, queries=queries, seed=args.seed)
+    print_results(report["workloads"], show_plans=args.plans)
+
+    report["workloads"] = [asdict(r) for r in report["workloads"]]
+    if args.save_baseline:
+        Path(args.save_baseline).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save_baseline).write_text(json.dumps(report, indent=2))
+        print()
+        print(f"💾 Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        print()
+        print(f"📊 Comparing against {args.baseline}")
+        baseline = json.loads(Path(args.baseline).read_text())
+        results = [WorkloadResult(**w) for w in report["workloads"]]
+        regressions = compare_to_baseline(results, baseline, tolerance=args.tolerance)
+        if regressions:
+            for message in regressions:
+                print(f"   ❌ {message}")
+            sys.exit(1)
+        print("   ✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
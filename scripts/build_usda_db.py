@@ -0,0 +1,766 @@
+#!/usr/bin/env python3
+"""
+Incremental USDA Database Build
+
+Runs the full build (bulk archives or the API response cache) → build database
+→ finalized bundle, skipping every stage whose inputs have not changed since
+the last run. Inputs are content-hashed into a manifest next to the build
+database (usda_build.manifest.json):
+
+    nutrients  NUTRIENTS definitions + schema
+    foods      source bytes (archive zips, or the cache index of SHA-256
+               payload digests) + data types + tracked nutrient ids + schema,
+               plus the Branded Foods download, size budget, popularity
+               counts, --trigram and the room reserved for
+               ingredient_shortcuts when --branded is given (the branded
+               import builds the search indexes to fit them in the budget,
+               so the fts stage doesn't rebuild them in the same run)
+    fts        foods key + SEARCH_SYNONYMS / FOOD_SEARCH_TERMS + FTS DDL
+    shortcuts  foods and fts keys + the evaluation name frequencies, verified
+               shortcuts, commonFoodShortcuts source and min count when
+               --shortcuts is given (see evaluation/build_shortcut_table.py)
+    finalize   nutrients, foods, fts and shortcuts keys + bundle page size
+
+A stage runs when its key changed, or a stage it reads from ran. Re-running
+with identical inputs is a no-op that only hashes the sources; changing the
+search synonyms rebuilds just the FTS index and the bundle. A build database
+or bundle modified outside this script (its hash no longer matches the
+manifest) is rebuilt from scratch. With --branded, a bundle over
+--branded-max-size-mb fails the build.
+
+ingredient_shortcuts is written into the build database by the shortcuts
+stage, so finalize carries it into every bundle. Writing it into the bundle
+directly (build_shortcut_table.py --db <bundle>) changes the bundle's hash
+and the next build replaces it.
+
+Usage:
+    python build_usda_db.py --archive sr_legacy.zip --archive foundation.zip
+    python build_usda_db.py --cache .usda_cache --build usda_build.db --output Food1/Data/usda_nutrients.db
+    python build_usda_db.py --archive sr_legacy.zip --branded branded_food_json.zip --branded-max-size-mb 60
+    python build_usda_db.py --archive sr_legacy.zip --shortcuts        # also build ingredient_shortcuts
+    python build_usda_db.py --archive sr_legacy.zip --dry-run          # show what would run, and why
+    python build_usda_db.py --archive sr_legacy.zip --force fts        # rebuild fts and everything after it
+"""
+
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import argparse
+import sys
+import time
+import zipfile
+from contextlib import redirect_stdout
+from dataclasses import asdict
+from datetime import datetime
+from io import StringIO
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from finalize_usda_db import BUNDLE_PAGE_SIZE, VALID_PAGE_SIZES, finalize_database, measure_open_latency, print_report
+from import_branded_foods import DEFAULT_MAX_SIZE_MB, import_branded_foods
+from import_branded_foods import print_report as print_branded_report
+from import_usda_bulk import CHUNK_SIZE, DEFAULT_DATA_TYPES, import_archive
+from populate_usda_db import (
+    CACHE_DIR,
+    FOOD_SEARCH_SQL,
+    FOOD_SEARCH_TERMS,
+    FOOD_SEARCH_TRIGRAM_SQL,
+    NUTRIENT_IDS,
+    NUTRIENTS,
+    PORTION_MACROS,
+    SEARCH_SYNONYMS,
+    SEARCH_TRIGGERS,
+    OfflineCacheMiss,
+    _drop_search_table,
+    create_database_schema,
+    create_search_index,
+    generate_search_terms,
+    populate_database,
+    populate_nutrients,
+    rebuild_search_index,
+)
+
+# build_shortcut_table and the normalizer it uses live with the evaluation tools
+EVALUATION_DIR = Path(__file__).resolve().parent.parent / "evaluation"
+sys.path.insert(0, str(EVALUATION_DIR))
+from build_shortcut_table import (  # noqa: E402
+    SHORTCUTS_SCHEMA,
+    build_shortcuts,
+    load_analysis_frequencies,
+    load_app_shortcuts,
+    load_verified_shortcuts,
+    write_shortcuts,
+)
+from build_shortcut_table import print_report as print_shortcuts_report  # noqa: E402
+from ingredient_normalizer import SWIFT_SERVICE  # noqa: E402
+
+
+# ==============================================================================
+# Configuration
+# ==============================================================================
+
+# Bump to invalidate every manifest when the stage logic itself changes
+MANIFEST_VERSION = 1
+
+STAGES = ["nutrients", "foods", "fts", "shortcuts", "finalize"]
+
+# Stages each stage reads from: running one re-runs these dependents
+DEPENDS_ON = {
+    "nutrients": [],
+    "foods": [],
+    "fts": ["foods"],
+    "shortcuts": ["foods", "fts"],
+    "finalize": ["nutrients", "foods", "fts", "shortcuts"],
+}
+
+SHORTCUTS_ANALYSIS = EVALUATION_DIR / "results" / "cleaned_analysis.json"
+SHORTCUTS_VERIFIED = EVALUATION_DIR / "results" / "verified_shortcuts.json"
+
+# Room the branded import leaves for ingredient_shortcuts: its table, index and
+# statistics pages, plus a row and index entry per candidate name, rounded up
+# so small edits to the name lists don't change the foods key
+SHORTCUTS_BASE_BYTES = 16 * 1024
+SHORTCUT_ROW_BYTES = 96
+SHORTCUTS_RESERVE_STEP = 64 * 1024
+
+HASH_CHUNK = 1024 * 1024
+
+
+# ==============================================================================
+# Fingerprints
+# ==============================================================================
+
+def digest_json(value) -> str:
+    """SHA-256 of a JSON-serializable value in canonical form"""
+    encoded = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def digest_file(path: str) -> str:
+    """SHA-256 of a file, streamed"""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def digest_cache(cache_dir: str) -> str:
+    """
+    SHA-256 over a response cache's (key, payload digest) pairs
+
+    The index already names every payload by its SHA-256, so this covers the
+    cached content without reading a single object; fetch times and
+    validators are left out.
+    """
+    index_path = Path(cache_dir) / "index.db"
+    if not index_path.exists():
+        raise FileNotFoundError(f"No response cache index at {index_path}")
+    conn = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+    entries = conn.execute("SELECT key, digest FROM entries ORDER BY key").fetchall()
+    conn.close()
+    return digest_json(entries)
+
+
+def schema_fingerprint(trigram: bool) -> str:
+    """SHA-256 of the DDL create_database_schema produces (run on an in-memory database)"""
+    conn = sqlite3.connect(":memory:")
+    with redirect_stdout(StringIO()):
+        create_database_schema(conn, trigram=trigram)
+    ddl = conn.execute("SELECT type, name, sql FROM sqlite_master WHERE sql IS NOT NULL ORDER BY type, name").fetchall()
+    conn.close()
+    return digest_json(ddl)
+
+
+def source_inputs(
+    archives: Optional[List[str]],
+    cache_dir: Optional[str],
+    data_types: List[str],
+    branded: Optional[str] = None,
+    branded_max_size_mb: float = DEFAULT_MAX_SIZE_MB,
+    popularity: Optional[str] = None,
+    trigram: bool = False,
+    reserve_bytes: int = 0
+) -> Dict[str, object]:
+    """Fingerprint of whatever the foods stage reads"""
+    if archives:
+        source: Dict[str, object] = {
+            "kind": "archive",
+            # Later archives override earlier ones, so order is part of the input
+            "archives": [digest_file(path) for path in archives],
+            "data_types": sorted(data_types),
+        }
+    else:
+        source = {"kind": "cache", "cache": digest_cache(cache_dir)}
+    if branded:
+        source["branded"] = {
+            "file": digest_file(branded),
+            "max_size_mb": branded_max_size_mb,
+            "popularity": digest_file(popularity) if popularity else None,
+            # The budget is measured with the search indexes built, less the reserve
+            "trigram": trigram,
+            "reserve_bytes": reserve_bytes,
+        }
+    return source
+
+
+def shortcut_inputs(
+    analysis: str = str(SHORTCUTS_ANALYSIS),
+    verified: str = str(SHORTCUTS_VERIFIED),
+    swift: str = str(SWIFT_SERVICE),
+    min_count: int = 1
+) -> Dict[str, object]:
+    """Fingerprint of whatever the shortcuts stage reads (the curated files are optional)"""
+    return {
+        "paths": {"analysis": analysis, "verified": verified, "swift": swift},
+        "analysis": digest_file(analysis),
+        "verified": digest_file(verified) if Path(verified).exists() else None,
+        "swift": digest_file(swift) if Path(swift).exists() else None,
+        "min_count": min_count,
+    }
+
+
+def shortcut_reserve_bytes(shortcuts: Optional[Dict[str, object]]) -> int:
+    """Upper estimate of the ingredient_shortcuts table: one row per observed or curated name"""
+    if not shortcuts:
+        return 0
+    paths = shortcuts["paths"]
+    names = set(load_analysis_frequencies(paths["analysis"]))
+    if Path(paths["verified"]).exists():
+        names |= set(load_verified_shortcuts(paths["verified"]))
+    if Path(paths["swift"]).exists():
+        names |= set(load_app_shortcuts(paths["swift"]))
+    estimate = SHORTCUTS_BASE_BYTES + len(names) * SHORTCUT_ROW_BYTES
+    return math.ceil(estimate / SHORTCUTS_RESERVE_STEP) * SHORTCUTS_RESERVE_STEP
+
+
+def stage_inputs(
+    source: Dict[str, object],
+    schema: str,
+    trigram: bool,
+    page_size: int,
+    keys: Dict[str, str],
+    shortcuts: Optional[Dict[str, object]] = None
+) -> Dict[str, Dict[str, str]]:
+    """
+    Per-stage input digests; keys are filled in stage by stage so each
+    stage's key can include the keys of the stages it reads from
+    """
+    search_ddl = [FOOD_SEARCH_SQL, FOOD_SEARCH_TRIGRAM_SQL if trigram else None, SEARCH_TRIGGERS]
+    return {
+        "nutrients": {
+            "definitions": digest_json([asdict(n) for n in NUTRIENTS]),
+            "schema": schema,
+        },
+        "foods": {
+            "source": digest_json(source),
+            "nutrient_ids": digest_json(sorted(NUTRIENT_IDS)),
+            "portion_macros": digest_json(PORTION_MACROS),
+            "schema": schema,
+        },
+        "fts": {
+            "foods": keys.get("foods", ""),
+            "synonyms": digest_json([SEARCH_SYNONYMS, FOOD_SEARCH_TERMS]),
+            "search_ddl": digest_json(search_ddl),
+        },
+        "shortcuts": {
+            "foods": keys.get("foods", ""),
+            "fts": keys.get("fts", ""),
+            # Paths aren't content; only the digests and min count decide the table
+            "sources": digest_json({k: v for k, v in shortcuts.items() if k != "paths"}) if shortcuts else "none",
+            "schema": digest_json(SHORTCUTS_SCHEMA),
+        },
+        "finalize": {
+            "nutrients": keys.get("nutrients", ""),
+            "foods": keys.get("foods", ""),
+            "fts": keys.get("fts", ""),
+            "shortcuts": keys.get("shortcuts", ""),
+            "page_size": str(page_size),
+        },
+    }
+
+
+def stage_key(inputs: Dict[str, str]) -> str:
+    return digest_json({"version": MANIFEST_VERSION, "inputs": inputs})
+
+
+# ==============================================================================
+# Manifest
+# ==============================================================================
+
+def default_manifest_path(build_path: str) -> str:
+    return str(Path(build_path).with_suffix(".manifest.json"))
+
+
+def load_manifest(path: str) -> Dict:
+    if not Path(path).exists():
+        return {"version": MANIFEST_VERSION, "stages": {}}
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {"version": MANIFEST_VERSION, "stages": {}}
+    return manifest
+
+
+def save_manifest(path: str, manifest: Dict):
+    """Write via a temp file and rename, so an interrupted build never leaves half a manifest"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def changed_inputs(recorded: Optional[Dict], inputs: Dict[str, str]) -> List[str]:
+    """Names of the inputs that differ from the recorded run (all of them if none)"""
+    if not recorded:
+        return ["no previous build"]
+    previous = recorded.get("inputs", {})
+    return [name for name, digest in inputs.items() if previous.get(name) != digest]
+
+
+def plan_stages(
+    manifest: Dict,
+    build_path: str,
+    output_path: str,
+    source: Dict[str, object],
+    trigram: bool,
+    page_size: int,
+    shortcuts: Optional[Dict[str, object]] = None,
+    force: Optional[str] = None
+):
+    """
+    Decide which stages run
+
+    Returns:
+        (keys, inputs, reasons) - reasons maps each stage that must run to why
+    """
+    recorded = manifest.get("stages", {})
+
+    # A database touched outside this script invalidates everything recorded about it
+    build_sha = manifest.get("build_sha256")
+    invalidated = None
+    if not Path(build_path).exists():
+        invalidated = "no build database"
+    elif build_sha is not None and digest_file(build_path) != build_sha:
+        invalidated = "build database changed outside this build"
+    if invalidated:
+        recorded = {}
+
+    keys: Dict[str, str] = {}
+    inputs: Dict[str, Dict[str, str]] = {}
+    reasons: Dict[str, str] = {}
+    forced = STAGES[STAGES.index(force):] if force else []
+    schema = schema_fingerprint(trigram)
+
+    for stage in STAGES:
+        inputs[stage] = stage_inputs(source, schema, trigram, page_size, keys, shortcuts)[stage]
+        keys[stage] = stage_key(inputs[stage])
+        previous = recorded.get(stage)
+
+        if stage in forced:
+            reasons[stage] = "forced"
+        elif invalidated:
+            reasons[stage] = invalidated
+        elif not previous or previous["key"] != keys[stage]:
+            reasons[stage] = "changed: " + ", ".join(changed_inputs(previous, inputs[stage]))
+        elif upstream := [dep for dep in DEPENDS_ON[stage] if dep in reasons]:
+            reasons[stage] = "rebuilt upstream: " + ", ".join(upstream)
+
+    if "finalize" not in reasons:
+        output = manifest.get("output", {})
+        if not Path(output_path).exists() or output.get("path") != str(output_path):
+            reasons["finalize"] = "bundle missing"
+        elif digest_file(output_path) != output.get("sha256"):
+            reasons["finalize"] = "bundle changed outside this build"
+
+    return keys, inputs, reasons
+
+
+# ==============================================================================
+# Stages
+# ==============================================================================
+
+def clear_foods(conn: sqlite3.Connection):
+    """
+    Empty every table the foods stage fills
+
+    The FTS tables go first (dropped, not emptied) so deleting foods doesn't
+    fire a sync trigger per row; the fts stage recreates them.
+    """
+    for table in SEARCH_TRIGGERS:
+        _drop_search_table(conn, table)
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    with conn:
+        for table in ("food_portions", "food_nutrients", "usda_foods", "ingest_state", "food_versions"):
+            if table in existing:
+                conn.execute(f"DELETE FROM {table}")
+
+
+def run_nutrients(build_path: str, trigram: bool):
+    conn = sqlite3.connect(build_path)
+    create_database_schema(conn, trigram=trigram)
+    populate_nutrients(conn, refresh=True)
+    conn.close()
+
+
+def run_foods(
+    build_path: str,
+    archives: Optional[List[str]],
+    cache_dir: Optional[str],
+    data_types: List[str],
+    chunk_size: int,
+    trigram: bool,
+    branded: Optional[str] = None,
+    branded_max_size_mb: float = DEFAULT_MAX_SIZE_MB,
+    popularity: Optional[str] = None,
+    reserve_bytes: int = 0
+) -> bool:
+    """
+    Import every food source into the cleared build database
+
+    Returns:
+        Whether the search index was built here (the branded import builds
+        it to measure its budget, so the fts stage needn't build it again)
+    """
+    conn = sqlite3.connect(build_path)
+    clear_foods(conn)
+
+    if archives:
+        for archive_path in archives:
+            import_archive(conn, archive_path, data_types, chunk_size)
+        conn.close()
+    else:
+        # The API path reads everything from the cache; a miss means the cache
+        # doesn't cover the build and the stage fails rather than fetch
+        conn.close()
+        populate_database(
+            api_key=os.environ.get("USDA_API_KEY", ""),
+            output_path=build_path,
+            cache_dir=cache_dir,
+            offline=True,
+            trigram=trigram
+        )
+
+    # Branded products fill whatever the budget leaves after the generic foods
+    if not branded:
+        return False
+    stats = import_branded_foods(
+        branded, build_path, branded_max_size_mb, popularity, trigram=trigram, reserve_bytes=reserve_bytes
+    )
+    print_branded_report(stats, branded_max_size_mb)
+    return True
+
+
+def run_fts(build_path: str, trigram: bool):
+    """Regenerate every food's search_terms, then recreate and rebuild the FTS tables"""
+    conn = sqlite3.connect(build_path)
+    for table in SEARCH_TRIGGERS:
+        _drop_search_table(conn, table)
+
+    # No FTS triggers exist at this point, so the update is a plain table write
+    rows = conn.execute("SELECT fdc_id, description, category FROM usda_foods").fetchall()
+    with conn:
+        conn.executemany(
+            "UPDATE usda_foods SET search_terms = ? WHERE fdc_id = ?",
+            [(generate_search_terms(description, category), fdc_id) for fdc_id, description, category in rows]
+        )
+
+    create_search_index(conn, trigram=trigram)
+    rebuild_search_index(conn)
+    print(f"   ✅ {len(rows):,} foods indexed")
+    conn.close()
+
+
+def run_shortcuts(build_path: str, shortcuts: Optional[Dict[str, object]]):
+    """Resolve and write ingredient_shortcuts into the build database (drop it without --shortcuts)"""
+    if not shortcuts:
+        conn = sqlite3.connect(build_path)
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS ingredient_shortcuts")
+        conn.close()
+        print("   ⏭️  --shortcuts not given, no ingredient_shortcuts table")
+        return
+
+    paths = shortcuts["paths"]
+    report = build_shortcuts(build_path, paths["analysis"], paths["verified"], paths["swift"], shortcuts["min_count"])
+    print_shortcuts_report(report, shortcuts["min_count"])
+    write_shortcuts(build_path, report["resolved"])
+    print(f"\n   ✅ {len(report['resolved']):,} shortcuts written")
+
+
+def run_finalize(
+    build_path: str,
+    output_path: str,
+    page_size: int,
+    max_size_mb: Optional[float] = None
+) -> Dict[str, object]:
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    stats = finalize_database(build_path, output_path, page_size=page_size)
+    print_report(stats, measure_open_latency(output_path))
+    if stats["integrity"] != "ok" or stats["leftover_files"]:
+        raise RuntimeError(f"Finalized bundle failed checks (integrity: {stats['integrity']})")
+    if max_size_mb is not None and stats["bundle_size"] > max_size_mb * 1024 * 1024:
+        raise RuntimeError(
+            f"Finalized bundle is {stats['bundle_size'] / 1024 / 1024:.2f} MB, "
+            f"over the {max_size_mb:g} MB --branded-max-size-mb budget (--force foods refits the branded foods)"
+        )
+    return stats
+
+
+# ==============================================================================
+# Build
+# ==============================================================================
+
+def build(
+    build_path: str,
+    output_path: str,
+    manifest_path: str,
+    archives: Optional[List[str]] = None,
+    cache_dir: Optional[str] = None,
+    data_types: List[str] = DEFAULT_DATA_TYPES,
+    chunk_size: int = CHUNK_SIZE,
+    page_size: int = BUNDLE_PAGE_SIZE,
+    trigram: bool = False,
+    branded: Optional[str] = None,
+    branded_max_size_mb: float = DEFAULT_MAX_SIZE_MB,
+    popularity: Optional[str] = None,
+    shortcuts: Optional[Dict[str, object]] = None,
+    force: Optional[str] = None,
+    dry_run: bool = False
+) -> List[str]:
+    """
+    Bring the build database and bundle up to date with their inputs
+
+    Args:
+        build_path: Build database (kept between runs)
+        output_path: Finalized bundle database
+        manifest_path: Manifest of the last successful stages
+        archives: FoodData Central CSV zips (bulk source)
+        cache_dir: API response cache (offline source, used when no archives)
+        data_types: food.csv data_type values to import from archives
+        chunk_size: Rows per bulk insert transaction
+        page_size: Bundle page size
+        trigram: Also build the trigram substring index
+        branded: Branded Foods JSON download to add (see import_branded_foods.py)
+        branded_max_size_mb: Size budget for the bundle with branded foods (the build fails over it)
+        popularity: CSV of gtin,count ranking branded products
+        shortcuts: shortcut_inputs() to build ingredient_shortcuts from (None: no table)
+        force: Run this stage and everything after it regardless of the manifest
+        dry_run: Only report which stages would run
+
+    Returns:
+        The stages that ran (or would run)
+    """
+    start = time.time()
+    print("🔑 Hashing inputs...")
+    reserve_bytes = shortcut_reserve_bytes(shortcuts) if branded else 0
+    source = source_inputs(
+        archives, cache_dir, data_types, branded, branded_max_size_mb, popularity, trigram, reserve_bytes
+    )
+    manifest = load_manifest(manifest_path)
+    keys, inputs, reasons = plan_stages(
+        manifest, build_path, output_path, source, trigram, page_size, shortcuts, force
+    )
+
+    for stage in STAGES:
+        if stage in reasons:
+            print(f"   🔄 {stage:<10} {reasons[stage]}")
+        else:
+            print(f"   ✅ {stage:<10} unchanged ({keys[stage][:12]})")
+    print(f"   ({time.time() - start:.2f}s)")
+
+    if not reasons:
+        print("\n✅ Build is up to date - nothing to do")
+        return []
+    if dry_run:
+        print("\nDry run - nothing built")
+        return [stage for stage in STAGES if stage in reasons]
+
+    if not Path(build_path).exists():
+        manifest["stages"] = {}
+    manifest["source"] = {"kind": source["kind"], "paths": archives or [cache_dir]}
+
+    ran = []
+    indexed = False
+    for stage in STAGES:
+        if stage not in reasons:
+            continue
+
+        # Until this stage completes, neither it nor the build hash can be trusted
+        manifest["stages"].pop(stage, None)
+        manifest["build_sha256"] = None
+        save_manifest(manifest_path, manifest)
+
+        print()
+        print(f"▶️  {stage}")
+        stage_start = time.time()
+        if stage == "nutrients":
+            run_nutrients(build_path, trigram)
+        elif stage == "foods":
+            indexed = run_foods(
+                build_path, archives, cache_dir, data_types, chunk_size, trigram,
+                branded, branded_max_size_mb, popularity, reserve_bytes
+            )
+        elif stage == "fts":
+            if indexed:
+                print("   ⏭️  search index already built by the branded import")
+            else:
+                run_fts(build_path, trigram)
+        elif stage == "shortcuts":
+            run_shortcuts(build_path, shortcuts)
+        else:
+            run_finalize(build_path, output_path, page_size, branded_max_size_mb if branded else None)
+            manifest["output"] = {"path": str(output_path), "sha256": digest_file(output_path)}
+
+        manifest["stages"][stage] = {
+            "key": keys[stage],
+            "inputs": inputs[stage],
+            "built_at": datetime.now().isoformat(timespec="seconds"),
+            "seconds": round(time.time() - stage_start, 2),
+        }
+        save_manifest(manifest_path, manifest)
+        ran.append(stage)
+
+    # Fold the WAL in so the recorded hash is of the whole database
+    conn = sqlite3.connect(build_path)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    manifest["build_sha256"] = digest_file(build_path)
+    save_manifest(manifest_path, manifest)
+
+    print()
+    print("=" * 70)
+    print("✅ BUILD COMPLETE")
+    print("=" * 70)
+    print(f"Stages run:          {', '.join(ran)}")
+    print(f"Stages skipped:      {', '.join(s for s in STAGES if s not in ran) or '-'}")
+    print(f"Bundle:              {output_path}")
+    print(f"Manifest:            {manifest_path}")
+    print(f"Duration:            {time.time() - start:.1f}s")
+    print()
+    return ran
+
+
+# ==============================================================================
+# CLI
+# ==============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the USDA database and bundle, skipping stages whose inputs are unchanged"
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        "--archive",
+        action="append",
+        help="FoodData Central CSV zip archive (repeat for SR Legacy + Foundation)"
+    )
+    source.add_argument(
+        "--cache",
+        nargs="?",
+        const=CACHE_DIR,
+        help=f"Build offline from an API response cache (default dir: {CACHE_DIR})"
+    )
+    parser.add_argument(
+        "--build",
+        default="usda_build.db",
+        help="Build database, kept between runs (default: usda_build.db)"
+    )
+    parser.add_argument(
+        "--output",
+        default="Food1/Data/usda_nutrients.db",
+        help="Bundle database to write (default: Food1/Data/usda_nutrients.db)"
+    )
+    parser.add_argument("--manifest", help="Manifest path (default: <build>.manifest.json)")
+    parser.add_argument(
+        "--data-types",
+        default=",".join(DEFAULT_DATA_TYPES),
+        help=f"Comma-separated food.csv data_type values (default: {','.join(DEFAULT_DATA_TYPES)})"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=CHUNK_SIZE,
+        help=f"Rows per bulk insert transaction (default: {CHUNK_SIZE})"
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=BUNDLE_PAGE_SIZE,
+        choices=VALID_PAGE_SIZES,
+        help=f"Bundle page size in bytes (default: {BUNDLE_PAGE_SIZE})"
+    )
+    parser.add_argument(
+        "--trigram",
+        action="store_true",
+        help="Also build a trigram FTS5 index for substring search (SQLite 3.34+)"
+    )
+    parser.add_argument("--branded", help="Also add Branded Foods from this JSON bulk download (zip or .json)")
+    parser.add_argument(
+        "--branded-max-size-mb",
+        type=float,
+        default=DEFAULT_MAX_SIZE_MB,
+        help=f"Size budget for the bundle including branded foods and search indexes (default: {DEFAULT_MAX_SIZE_MB:g})"
+    )
+    parser.add_argument("--popularity", help="CSV with gtin,count columns to rank branded products by")
+    parser.add_argument(
+        "--shortcuts",
+        action="store_true",
+        help="Also build the ingredient_shortcuts table (see evaluation/build_shortcut_table.py)"
+    )
+    parser.add_argument(
+        "--shortcuts-analysis",
+        default=str(SHORTCUTS_ANALYSIS),
+        help="Cleaned name frequencies for --shortcuts (default: evaluation/results/cleaned_analysis.json)"
+    )
+    parser.add_argument(
+        "--shortcuts-verified",
+        default=str(SHORTCUTS_VERIFIED),
+        help="Verified cleaned name -> fdc_id for --shortcuts (default: evaluation/results/verified_shortcuts.json)"
+    )
+    parser.add_argument(
+        "--shortcuts-min-count",
+        type=int,
+        default=1,
+        help="Minimum occurrences to auto-resolve a name for --shortcuts (default: 1)"
+    )
+    parser.add_argument("--force", choices=STAGES, help="Re-run this stage and every stage after it")
+    parser.add_argument("--dry-run", action="store_true", help="Show which stages would run, and why")
+
+    args = parser.parse_args()
+
+    if Path(args.build).resolve() == Path(args.output).resolve():
+        parser.error("--output must differ from --build (the build database is kept for incremental rebuilds)")
+
+    try:
+        shortcuts = None
+        if args.shortcuts:
+            shortcuts = shortcut_inputs(
+                args.shortcuts_analysis, args.shortcuts_verified, min_count=args.shortcuts_min_count
+            )
+        build(
+            build_path=args.build,
+            output_path=args.output,
+            manifest_path=args.manifest or default_manifest_path(args.build),
+            archives=args.archive,
+            cache_dir=args.cache,
+            data_types=[t.strip() for t in args.data_types.split(",") if t.strip()],
+            chunk_size=args.chunk_size,
+            page_size=args.page_size,
+            trigram=args.trigram,
+            branded=args.branded,
+            branded_max_size_mb=args.branded_max_size_mb,
+            popularity=args.popularity,
+            shortcuts=shortcuts,
+            force=args.force,
+            dry_run=args.dry_run
+        )
+    except (FileNotFoundError, ValueError, zipfile.BadZipFile, OfflineCacheMiss, RuntimeError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Finalize USDA Database for the App Bundle
+
+Turns a build database (WAL mode, progress tables, freelist pages left by
+resumes and deltas) into the smallest, fastest-to-open file to ship:
+
+    1. VACUUM INTO a fresh file with the chosen page size
+    2. Strip build-only tables (ingest_state, food_versions)
+    3. Merge FTS5 segments, ANALYZE, PRAGMA optimize
+    4. journal_mode=DELETE and a final VACUUM, so there is no -wal/-shm state
+    5. Integrity check, then report size, cold-open and first-query latency
+
+The build database is left untouched, so delta rebuilds keep working on it.
+
+Usage:
+    python finalize_usda_db.py --db usda_build.db --output Food1/Data/usda_nutrients.db
+    python finalize_usda_db.py --db usda_build.db --output bundle.db --page-size 8192
+"""
+
+import sqlite3
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from benchmark_usda_db import FOOD_BY_ID_SQL, MICRONUTRIENTS_SQL, build_like_search
+
+
+# ==============================================================================
+# Configuration
+# ==============================================================================
+
+BUNDLE_PAGE_SIZE = 4096  # Matches iOS filesystem block size
+VALID_PAGE_SIZES = [512, 1024, 2048, 4096, 8192, 16384, 32768, 65536]
+
+# Build bookkeeping the app never reads
+BUILD_ONLY_TABLES = ["ingest_state", "food_versions"]
+
+OPEN_SAMPLES = 20  # Fresh connections timed for the latency report
+FIRST_QUERY = "chicken breast"
+
+
+# ==============================================================================
+# Finalize
+# ==============================================================================
+
+def finalize_database(db_path: str, output_path: str, page_size: int = BUNDLE_PAGE_SIZE) -> Dict[str, object]:
+    """
+    Write a compacted, read-optimized copy of db_path to output_path
+
+    Args:
+        db_path: Build database (any journal mode)
+        output_path: Bundle database to create (replaced if it exists)
+        page_size: Page size of the bundle
+
+    Returns:
+        Stats for the report (sizes, page layout, dropped tables)
+    """
+    output = Path(output_path)
+    for path in (output, Path(f"{output}-wal"), Path(f"{output}-shm"), Path(f"{output}-journal")):
+        if path.exists():
+            path.unlink()
+
+    # VACUUM INTO writes a defragmented copy, honouring a pending page_size
+    # (a WAL database can't change its own page size in place)
+    source = sqlite3.connect(db_path)
+    source.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    source.execute(f"PRAGMA page_size={page_size}")
+    source.execute("VACUUM INTO ?", (str(output),))
+    source.close()
+
+    conn = sqlite3.connect(str(output))
+    conn.execute("PRAGMA journal_mode=DELETE")
+
+    dropped = []
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    with conn:
+        for table in BUILD_ONLY_TABLES:
+            if table in existing:
+                conn.execute(f"DROP TABLE {table}")
+                dropped.append(table)
+
+        # One segment per FTS index keeps MATCH to a single b-tree walk
+        for table in ("food_search", "food_search_trigram"):
+            if table in existing:
+                conn.execute(f"INSERT INTO {table}({table}) VALUES('optimize')")
+
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA optimize")
+
+    # Reclaims the dropped tables; also applies page_size if VACUUM INTO didn't
+    conn.execute(f"PRAGMA page_size={page_size}")
+    conn.execute("VACUUM")
+
+    integrity = conn.execute("PRAGMA integrity_check").fetchone()[0]
+    stats = {
+        "page_size": conn.execute("PRAGMA page_size").fetchone()[0],
+        "page_count": conn.execute("PRAGMA page_count").fetchone()[0],
+        "freelist_count": conn.execute("PRAGMA freelist_count").fetchone()[0],
+        "journal_mode": conn.execute("PRAGMA journal_mode").fetchone()[0],
+        "integrity": integrity,
+        "dropped_tables": dropped,
+        "source_size": Path(db_path).stat().st_size,
+    }
+    conn.close()
+
+    stats["bundle_size"] = output.stat().st_size
+    stats["leftover_files"] = [
+        str(p) for p in (Path(f"{output}-wal"), Path(f"{output}-shm")) if p.exists()
+    ]
+    return stats
+
+
+def measure_open_latency(db_path: str, samples: int = OPEN_SAMPLES) -> Dict[str, float]:
+    """
+    Median ms to open the bundle read-only, and to run the app's first queries
+
+    Each sample uses a fresh connection, like an app launch. The OS page
+    cache stays warm between samples, so this isolates SQLite's own open
+    cost (schema parse, first b-tree reads) rather than disk I/O.
+    """
+    sql, params = build_like_search(FIRST_QUERY)
+    opens: List[float] = []
+    searches: List[float] = []
+    lookups: List[float] = []
+
+    for _ in range(samples):
+        start = time.perf_counter()
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        opened = time.perf_counter()
+
+        rows = conn.execute(sql, params).fetchall()
+        searched = time.perf_counter()
+
+        if rows:
+            conn.execute(FOOD_BY_ID_SQL, (rows[0][0],)).fetchone()
+            conn.execute(MICRONUTRIENTS_SQL, (rows[0][0],)).fetchall()
+        looked_up = time.perf_counter()
+        conn.close()
+
+        opens.append((opened - start) * 1000)
+        searches.append((searched - opened) * 1000)
+        lookups.append((looked_up - searched) * 1000)
+
+    return {
+        "open_ms": statistics.median(opens),
+        "first_search_ms": statistics.median(searches),
+        "first_lookup_ms": statistics.median(lookups),
+    }
+
+
+def print_report(stats: Dict[str, object], latency: Dict[str, float]):
+    print()
+    print("=" * 70)
+    print("📦 BUNDLE READY")
+    print("=" * 70)
+    print(f"Build database:      {stats['source_size'] / 1024 / 1024:.2f} MB")
+    print(f"Bundle:              {stats['bundle_size'] / 1024 / 1024:.2f} MB "
+          f"({stats['page_count']:,} × {stats['page_size']} B pages, {stats['freelist_count']} free)")
+    print(f"Journal mode:        {stats['journal_mode']}")
+    print(f"Dropped tables:      {', '.join(stats['dropped_tables']) or 'none'}")
+    print(f"Integrity:           {stats['integrity']}")
+    print(f"Cold open:           {latency['open_ms']:.2f} ms")
+    print(f"First search:        {latency['first_search_ms']:.2f} ms ('{FIRST_QUERY}', app LIKE query)")
+    print(f"First food lookup:   {latency['first_lookup_ms']:.2f} ms (getFood + getMicronutrients)")
+    if stats["leftover_files"]:
+        print(f"⚠️  Leftover files: {', '.join(stats['leftover_files'])}")
+    print()
+
+
+# ==============================================================================
+# CLI
+# ==============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Finalize a USDA build database for the iOS bundle")
+    parser.add_argument("--db", required=True, help="Build database to finalize")
+    parser.add_argument(
+        "--output",
+        default="Food1/Data/usda_nutrients.db",
+        help="Bundle database to write (default: Food1/Data/usda_nutrients.db)"
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=BUNDLE_PAGE_SIZE,
+        choices=VALID_PAGE_SIZES,
+        help=f"Bundle page size in bytes (default: {BUNDLE_PAGE_SIZE})"
+    )
+
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"❌ Database not found: {args.db}")
+        sys.exit(1)
+    if Path(args.db).resolve() == Path(args.output).resolve():
+        parser.error("--output must differ from --db (the build database is kept for delta rebuilds)")
+
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    print(f"🧹 Finalizing {args.db} → {args.output}")
+    stats = finalize_database(args.db, args.output, page_size=args.page_size)
+    latency = measure_open_latency(args.output)
+    print_report(stats, latency)
+
+    if stats["integrity"] != "ok" or stats["leftover_files"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
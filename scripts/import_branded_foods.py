@@ -0,0 +1,662 @@
+#!/usr/bin/env python3
+"""
+USDA Branded Foods Importer
+
+Adds packaged products from the FoodData Central Branded Foods bulk download
+(FoodData_Central_branded_food_json_*.zip, ~400k foods, several GB of JSON)
+to a database built by import_usda_bulk.py or populate_usda_db.py, for meals
+the vision model flags with has_packaging.
+
+    1. Stream   the BrandedFoods array element by element straight from the
+                zip - the document is never held in memory
+    2. Stage    into a temporary SQLite file keyed by GTIN/UPC, so repeated
+                submissions of one product collapse to the newest
+    3. Rank     by popularity: counts from --popularity if given, else how
+                often the product was resubmitted and how many products its
+                brand owner lists
+    4. Load     in rank order, a chunk per transaction, until the database
+                reaches the size budget (the chunk that would exceed it is
+                rolled back), with the FTS tables and their sync triggers
+                dropped so products aren't indexed row by row
+    5. Index    rebuild food_search (brand_name included) and, with
+                --trigram, food_search_trigram once, then drop the
+                lowest-ranked products until the database, indexes
+                included, fits the budget again
+
+Ingestion rate and peak RSS are reported for each phase.
+
+Archive: https://fdc.nal.usda.gov/download-datasets.html (Branded, JSON)
+
+Usage:
+    python import_branded_foods.py --input FoodData_Central_branded_food_json_2024-10-31.zip --db usda_build.db
+    python import_branded_foods.py --input branded.zip --db usda_build.db --max-size-mb 60 --trigram
+    python import_branded_foods.py --input branded.zip --db usda_build.db --popularity scans.csv --ingredients
+"""
+
+import csv
+import io
+import json
+import math
+import os
+import resource
+import sqlite3
+import argparse
+import sys
+import tempfile
+import time
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, TextIO
+
+from populate_usda_db import (
+    FOOD_PORTIONS_INSERT,
+    NUTRIENT_IDS,
+    PORTION_MACROS,
+    SEARCH_TRIGGERS,
+    _drop_search_table,
+    _search_tables,
+    create_database_schema,
+    create_search_index,
+    generate_search_terms,
+    populate_nutrients,
+    rebuild_search_index,
+)
+
+
+# ==============================================================================
+# Configuration
+# ==============================================================================
+
+ARRAY_KEY = "BrandedFoods"
+READ_CHUNK = 1024 * 1024  # Characters read from the JSON stream at a time
+
+DEFAULT_MAX_SIZE_MB = 80.0  # Whole database, SR Legacy included
+LOAD_CHUNK = 2000  # Foods per load transaction (and budget check)
+MIN_LOAD_CHUNK = 50  # Smallest chunk tried when closing in on the budget
+STAGE_CHUNK = 5000  # Foods per staging transaction
+
+# servingSizeUnit values whose serving converts 1:1 to the per-100 basis
+SERVING_UNITS = {"g": "g", "grm": "g", "ml": "ml", "mlt": "ml"}
+
+BRANDED_FOODS_INSERT = """
+    INSERT INTO usda_foods (fdc_id, description, common_name, category, search_terms, brand_name, ingredients)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(fdc_id) DO UPDATE SET
+        description = excluded.description,
+        common_name = excluded.common_name,
+        category = excluded.category,
+        search_terms = excluded.search_terms,
+        brand_name = excluded.brand_name,
+        ingredients = excluded.ingredients
+"""
+
+STAGING_COLUMNS = [
+    "fdc_id", "description", "brand_owner", "brand_name", "category", "ingredients",
+    "modified", "serving_size", "serving_unit", "household_serving", "nutrients",
+]
+
+# One row per product; a resubmission replaces it only when newer, but always counts
+STAGING_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS branded_staging (
+        gtin TEXT PRIMARY KEY,
+        fdc_id INTEGER NOT NULL,
+        description TEXT NOT NULL,
+        brand_owner TEXT,
+        brand_name TEXT,
+        category TEXT,
+        ingredients TEXT,
+        modified TEXT,
+        serving_size REAL,
+        serving_unit TEXT,
+        household_serving TEXT,
+        nutrients TEXT NOT NULL,
+        revisions INTEGER NOT NULL DEFAULT 1
+    ) WITHOUT ROWID
+"""
+
+_NEWER = "(excluded.modified, excluded.fdc_id) > (branded_staging.modified, branded_staging.fdc_id)"
+STAGING_UPSERT = f"""
+    INSERT INTO branded_staging (gtin, {", ".join(STAGING_COLUMNS)})
+    VALUES (?, {", ".join("?" * len(STAGING_COLUMNS))})
+    ON CONFLICT(gtin) DO UPDATE SET
+        revisions = branded_staging.revisions + 1,
+        {", ".join(f"{c} = iif({_NEWER}, excluded.{c}, branded_staging.{c})" for c in STAGING_COLUMNS)}
+"""
+
+
+# ==============================================================================
+# Measurement
+# ==============================================================================
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (ru_maxrss is KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def database_bytes(conn: sqlite3.Connection) -> int:
+    """Bytes in use, counting uncommitted pages of the open transaction but not the freelist"""
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return (page_count - free) * page_size
+
+
+def vacuumed_bytes(conn: sqlite3.Connection) -> int:
+    """Bytes in use once the database is compacted (runs VACUUM)"""
+    conn.execute("VACUUM")
+    return database_bytes(conn)
+
+
+# ==============================================================================
+# Streaming
+# ==============================================================================
+
+@contextmanager
+def open_branded_json(path: str) -> Iterator[TextIO]:
+    """Text stream of the Branded Foods JSON, from the bulk zip or an extracted file"""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            member = next((n for n in archive.namelist() if n.endswith(".json")), None)
+            if member is None:
+                raise FileNotFoundError(f"No .json file in {path}")
+            with archive.open(member) as raw:
+                yield io.TextIOWrapper(raw, encoding="utf-8-sig")
+    else:
+        with open(path, encoding="utf-8-sig") as f:
+            yield f
+
+
+def iter_json_array(stream: TextIO, key: str = ARRAY_KEY, read_chunk: int = READ_CHUNK) -> Iterator[Dict]:
+    """
+    Yield the elements of the top-level array under key, one at a time
+
+    Reads fixed-size chunks and raw_decodes one element at a time, so memory
+    holds one chunk plus the element being parsed however large the file is.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+
+    def fill() -> bool:
+        nonlocal buffer
+        chunk = stream.read(read_chunk)
+        buffer += chunk
+        return bool(chunk)
+
+    # Find the opening bracket of the array
+    marker = f'"{key}"'
+    while True:
+        start = buffer.find(marker)
+        if start >= 0:
+            bracket = buffer.find("[", start + len(marker))
+            if bracket >= 0:
+                buffer = buffer[bracket + 1:]
+                break
+        if not fill():
+            raise ValueError(f'No "{key}" array in the input')
+
+    pos = 0
+    while True:
+        # Skip separators between elements
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer) or not fill():
+                break
+        if pos >= len(buffer):
+            raise ValueError(f'Unterminated "{key}" array')
+        if buffer[pos] == "]":
+            return
+
+        try:
+            element, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Element continues past the buffer: drop what's consumed, read more
+            buffer = buffer[pos:]
+            pos = 0
+            if not fill():
+                raise
+            continue
+
+        yield element
+        pos = end
+        if pos > read_chunk:
+            buffer = buffer[pos:]
+            pos = 0
+
+
+# ==============================================================================
+# Parsing
+# ==============================================================================
+
+def normalize_gtin(value: Optional[str]) -> Optional[str]:
+    """
+    GTIN/UPC as 14 digits, so UPC-A, EAN-13 and GTIN-14 spellings of one
+    product compare equal ("041220576463" == "0041220576463")
+    """
+    digits = "".join(c for c in (value or "") if c.isdigit()).lstrip("0")
+    return digits.zfill(14) if digits else None
+
+
+def extract_branded_nutrients(food: Dict) -> Dict[int, float]:
+    """Tracked nutrients per 100 g (or 100 ml), from foodNutrients"""
+    values = {}
+    for entry in food.get("foodNutrients", []):
+        nutrient = entry.get("nutrient") or {}
+        nutrient_id = nutrient.get("id") or entry.get("nutrientId")
+        amount = entry.get("amount", entry.get("value"))
+        if nutrient_id in NUTRIENT_IDS and amount is not None:
+            values[nutrient_id] = float(amount)
+    return values
+
+
+def staging_row(food: Dict, keep_ingredients: bool) -> Optional[tuple]:
+    """One branded_staging row, or None for foods without a description or nutrients"""
+    description = (food.get("description") or "").strip()
+    nutrients = extract_branded_nutrients(food)
+    if not description or not nutrients:
+        return None
+
+    fdc_id = int(food["fdcId"])
+    brand_owner = (food.get("brandOwner") or "").strip() or None
+    serving_size = food.get("servingSize")
+    return (
+        # Products without a GTIN can't be matched up; they stay separate
+        normalize_gtin(food.get("gtinUpc")) or f"fdc:{fdc_id}",
+        fdc_id,
+        description,
+        brand_owner,
+        (food.get("brandName") or "").strip() or brand_owner,
+        food.get("brandedFoodCategory"),
+        food.get("ingredients") if keep_ingredients else None,
+        food.get("modifiedDate") or food.get("publicationDate") or "",
+        float(serving_size) if serving_size else None,
+        (food.get("servingSizeUnit") or "").lower() or None,
+        food.get("householdServingFullText"),
+        json.dumps(nutrients, separators=(",", ":")),
+    )
+
+
+def load_popularity(path: str) -> Dict[str, float]:
+    """
+    GTIN -> count from a CSV with gtin and count columns (barcode scans,
+    logged products...), keyed like normalize_gtin
+    """
+    popularity = {}
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            gtin = normalize_gtin(row.get("gtin"))
+            if gtin and row.get("count"):
+                popularity[gtin] = popularity.get(gtin, 0.0) + float(row["count"])
+    return popularity
+
+
+# ==============================================================================
+# Stages
+# ==============================================================================
+
+def stage_branded_foods(
+    staging: sqlite3.Connection,
+    input_path: str,
+    keep_ingredients: bool = False
+) -> Dict[str, int]:
+    """Stream every branded food into branded_staging, deduplicated by GTIN"""
+    staging.execute(STAGING_SCHEMA)
+    seen = skipped = 0
+    rows: List[tuple] = []
+
+    with open_branded_json(input_path) as stream:
+        for food in iter_json_array(stream):
+            seen += 1
+            row = staging_row(food, keep_ingredients)
+            if row is None:
+                skipped += 1
+                continue
+            rows.append(row)
+            if len(rows) >= STAGE_CHUNK:
+                with staging:
+                    staging.executemany(STAGING_UPSERT, rows)
+                rows.clear()
+            if seen % 100_000 == 0:
+                print(f"   … {seen:,} foods read")
+
+    with staging:
+        staging.executemany(STAGING_UPSERT, rows)
+
+    products = staging.execute("SELECT COUNT(*) FROM branded_staging").fetchone()[0]
+    return {"read": seen, "skipped": skipped, "products": products, "duplicates": seen - skipped - products}
+
+
+def rank_products(staging: sqlite3.Connection, popularity: Optional[Dict[str, float]] = None) -> int:
+    """
+    Write the load order into ranked (rank 1 = most popular), in SQL so the
+    products never have to fit in memory
+
+    Real counts (popularity) come first; the rest are ordered by how often
+    the product was resubmitted (products still on shelves get relabelled),
+    then by how many products the brand owner lists, then newest first.
+    """
+    staging.create_function("log2", 1, math.log2, deterministic=True)
+    with staging:
+        staging.executescript("""
+            DROP TABLE IF EXISTS popularity;
+            DROP TABLE IF EXISTS ranked;
+            CREATE TABLE popularity (gtin TEXT PRIMARY KEY, count REAL NOT NULL) WITHOUT ROWID;
+            CREATE TABLE ranked (rank INTEGER PRIMARY KEY, gtin TEXT NOT NULL);
+        """)
+        staging.executemany("INSERT INTO popularity (gtin, count) VALUES (?, ?)", (popularity or {}).items())
+        staging.execute("""
+            INSERT INTO ranked (gtin)
+            SELECT s.gtin
+            FROM branded_staging s
+            LEFT JOIN popularity p ON p.gtin = s.gtin
+            LEFT JOIN (
+                SELECT brand_owner, COUNT(*) AS products FROM branded_staging GROUP BY brand_owner
+            ) b ON b.brand_owner = s.brand_owner
+            ORDER BY coalesce(p.count, 0) DESC,
+                     s.revisions + log2(1 + coalesce(b.products, 0)) DESC,
+                     s.modified DESC,
+                     s.fdc_id DESC
+        """)
+    return staging.execute("SELECT COUNT(*) FROM ranked").fetchone()[0]
+
+
+def portion_row(fdc_id: int, serving_size: Optional[float], serving_unit: Optional[str],
+                household: Optional[str], nutrients: Dict[int, float]) -> Optional[tuple]:
+    """The labelled serving as a food_portions row (portion_id assigned by SQLite)"""
+    unit = SERVING_UNITS.get(serving_unit or "")
+    if not serving_size or not unit:
+        return None
+    measure = f"{serving_size:g} {unit}"
+    description = f"{household.strip()} ({measure})" if household and household.strip() else measure
+    return (
+        None, fdc_id, 1, 1.0, None, None, description, serving_size,
+        *(round(nutrients[nid] * serving_size / 100.0, 3) if nid in nutrients else None
+          for _, nid in PORTION_MACROS)
+    )
+
+
+def _load_rows(conn: sqlite3.Connection, products: List[tuple]):
+    foods, values, portions = [], [], []
+    for fdc_id, description, brand_name, category, ingredients, size, unit, household, nutrients_json in products:
+        nutrients = {int(k): v for k, v in json.loads(nutrients_json).items()}
+        foods.append((
+            fdc_id, description, description, category,
+            generate_search_terms(description, category), brand_name, ingredients
+        ))
+        values.extend((fdc_id, nid, amount) for nid, amount in nutrients.items())
+        portion = portion_row(fdc_id, size, unit, household, nutrients)
+        if portion:
+            portions.append(portion)
+
+    conn.executemany(BRANDED_FOODS_INSERT, foods)
+    conn.executemany("INSERT OR REPLACE INTO food_nutrients (fdc_id, nutrient_id, amount) VALUES (?, ?, ?)", values)
+    conn.executemany(FOOD_PORTIONS_INSERT, portions)
+
+
+def load_within_budget(
+    conn: sqlite3.Connection,
+    staging: sqlite3.Connection,
+    total: int,
+    max_bytes: int,
+    chunk_size: int = LOAD_CHUNK
+) -> int:
+    """
+    Load ranked products in order until the database would exceed max_bytes
+
+    Each chunk is one transaction measured before commit; one that overshoots
+    is rolled back and retried at half the size, down to MIN_LOAD_CHUNK.
+
+    Returns:
+        Number of products loaded
+    """
+    select = """
+        SELECT s.fdc_id, s.description, s.brand_name, s.category, s.ingredients,
+               s.serving_size, s.serving_unit, s.household_serving, s.nutrients
+        FROM ranked r
+        JOIN branded_staging s ON s.gtin = r.gtin
+        WHERE r.rank BETWEEN ? AND ?
+    """
+    loaded = 0
+    size = chunk_size
+    while loaded < total and size >= MIN_LOAD_CHUNK:
+        products = staging.execute(select, (loaded + 1, loaded + size)).fetchall()
+
+        conn.execute("BEGIN")
+        _load_rows(conn, products)
+        if database_bytes(conn) > max_bytes:
+            conn.rollback()
+            size //= 2
+            continue
+        conn.commit()
+        loaded += len(products)
+        if loaded % 50_000 < len(products):
+            print(f"   … {loaded:,} products loaded ({database_bytes(conn) / 1024 / 1024:.1f} MB)")
+
+    return loaded
+
+
+def trim_to_budget(
+    conn: sqlite3.Connection,
+    staging: sqlite3.Connection,
+    loaded: int,
+    base_bytes: int,
+    max_bytes: int
+) -> int:
+    """
+    Drop the lowest-ranked loaded products until the database, search indexes
+    included, fits in max_bytes again
+
+    The load measures the tables alone, so the index built after it can push
+    a full load over the budget. Sizes are measured vacuumed, as the file will
+    be (deletes leave pages partly empty, not free); each pass removes as
+    many products as the overshoot covers at the average cost per product.
+
+    Returns:
+        Number of products left
+    """
+    select = """
+        SELECT s.fdc_id
+        FROM ranked r
+        JOIN branded_staging s ON s.gtin = r.gtin
+        WHERE r.rank BETWEEN ? AND ?
+    """
+    size = vacuumed_bytes(conn)
+    while loaded and size > max_bytes:
+        per_product = max((size - base_bytes) / loaded, 1)
+        count = min(loaded, max(math.ceil((size - max_bytes) / per_product), 1))
+        fdc_ids = staging.execute(select, (loaded - count + 1, loaded)).fetchall()
+
+        # The sync triggers exist again, so deleting the foods also unindexes them
+        conn.execute("BEGIN")
+        for table in ("food_portions", "food_nutrients", "usda_foods"):
+            conn.executemany(f"DELETE FROM {table} WHERE fdc_id = ?", fdc_ids)
+        conn.commit()
+        for table in _search_tables(conn):
+            conn.execute(f"INSERT INTO {table}({table}) VALUES('optimize')")
+        loaded -= count
+        size = vacuumed_bytes(conn)
+
+    return loaded
+
+
+# ==============================================================================
+# Import
+# ==============================================================================
+
+def import_branded_foods(
+    input_path: str,
+    db_path: str,
+    max_size_mb: float = DEFAULT_MAX_SIZE_MB,
+    popularity_path: Optional[str] = None,
+    keep_ingredients: bool = False,
+    chunk_size: int = LOAD_CHUNK,
+    trigram: bool = False,
+    reserve_bytes: int = 0
+) -> Dict[str, object]:
+    """
+    Add the most popular branded foods that fit in the size budget to db_path
+
+    Args:
+        input_path: Branded Foods JSON bulk download (zip or extracted .json)
+        db_path: USDA database to extend (created if missing)
+        max_size_mb: Budget for the whole database file, search indexes included
+        popularity_path: CSV of gtin,count used to rank products first
+        keep_ingredients: Store ingredient statements (large; the app doesn't read them)
+        chunk_size: Products per load transaction
+        trigram: Also build the trigram substring index (and count it in the budget)
+        reserve_bytes: Room to leave in the budget for tables added after the import
+
+    Returns:
+        Counts, rates and peak RSS for the report
+
+    Raises:
+        RuntimeError: If the database is over budget even without branded foods
+    """
+    stats: Dict[str, object] = {}
+    max_bytes = int(max_size_mb * 1024 * 1024) - reserve_bytes
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    create_database_schema(conn, trigram=trigram)
+    populate_nutrients(conn)
+
+    # Drop the FTS tables (and their sync triggers) for the load, so each
+    # product isn't also indexed row by row; they're rebuilt once below
+    for table in SEARCH_TRIGGERS:
+        _drop_search_table(conn, table)
+    stats["base_size"] = database_bytes(conn)
+
+    # Staging lives next to the database, outside it, and is deleted afterwards
+    staging_fd, staging_path = tempfile.mkstemp(suffix=".branded.db", dir=str(Path(db_path).resolve().parent))
+    os.close(staging_fd)
+    staging = sqlite3.connect(staging_path)
+    staging.execute("PRAGMA journal_mode=OFF")
+    staging.execute("PRAGMA synchronous=OFF")
+
+    try:
+        print(f"📦 Streaming {input_path}")
+        start = time.time()
+        stats.update(stage_branded_foods(staging, input_path, keep_ingredients))
+        stats["stage_seconds"] = time.time() - start
+        stats["stage_rss_mb"] = peak_rss_mb()
+        print(f"   ✅ {stats['read']:,} foods read → {stats['products']:,} products "
+              f"({stats['duplicates']:,} GTIN duplicates, {stats['skipped']:,} without nutrients)")
+
+        print("📊 Ranking by popularity...")
+        popularity = load_popularity(popularity_path) if popularity_path else None
+        ranked = rank_products(staging, popularity)
+        if popularity:
+            stats["with_popularity"] = staging.execute(
+                "SELECT COUNT(*) FROM branded_staging WHERE gtin IN (SELECT gtin FROM popularity)"
+            ).fetchone()[0]
+
+        print(f"💾 Loading within {max_size_mb:g} MB...")
+        start = time.time()
+        loaded = load_within_budget(conn, staging, ranked, max_bytes, chunk_size)
+        stats["load_seconds"] = time.time() - start
+        stats["load_rss_mb"] = peak_rss_mb()
+
+        print("🔍 Building FTS5 search index...")
+        start = time.time()
+        create_search_index(conn, trigram=trigram)
+        rebuild_search_index(conn)
+        stats["index_seconds"] = time.time() - start
+        # Statistics are part of the file too, so they're in place before measuring
+        conn.execute("ANALYZE")
+        stats["loaded"] = trim_to_budget(conn, staging, loaded, stats["base_size"], max_bytes)
+        stats["trimmed"] = loaded - stats["loaded"]
+    finally:
+        staging.close()
+        os.remove(staging_path)
+
+    conn.execute("ANALYZE")
+    conn.execute("VACUUM")
+    stats["final_size"] = Path(db_path).stat().st_size
+    conn.close()
+    if stats["final_size"] > max_bytes:
+        raise RuntimeError(
+            f"{db_path} is {stats['final_size'] / 1024 / 1024:.1f} MB with {stats['loaded']:,} branded foods, "
+            f"over the {max_bytes / 1024 / 1024:.2f} MB the budget leaves for the database"
+        )
+    return stats
+
+
+def print_report(stats: Dict[str, object], max_size_mb: float):
+    stage_rate = stats["read"] / max(stats["stage_seconds"], 1e-9)
+    load_rate = stats["loaded"] / max(stats["load_seconds"], 1e-9)
+    print()
+    print("=" * 70)
+    print("✅ BRANDED FOODS IMPORT COMPLETE")
+    print("=" * 70)
+    print(f"Foods read:          {stats['read']:,}")
+    print(f"Unique products:     {stats['products']:,} (by GTIN/UPC)")
+    if "with_popularity" in stats:
+        print(f"With popularity:     {stats['with_popularity']:,}")
+    print(f"Products loaded:     {stats['loaded']:,} ({stats['loaded'] / max(stats['products'], 1):.1%})")
+    if stats["trimmed"]:
+        print(f"Dropped for indexes: {stats['trimmed']:,} (lowest ranked)")
+    print(f"Database size:       {stats['base_size'] / 1024 / 1024:.1f} MB → "
+          f"{stats['final_size'] / 1024 / 1024:.1f} MB with search indexes (budget {max_size_mb:g} MB)")
+    print(f"Stream + stage:      {stats['stage_seconds']:.1f}s ({stage_rate:,.0f} foods/s), "
+          f"peak RSS {stats['stage_rss_mb']:.0f} MB")
+    print(f"Load:                {stats['load_seconds']:.1f}s ({load_rate:,.0f} foods/s), "
+          f"peak RSS {stats['load_rss_mb']:.0f} MB")
+    print(f"Search index:        {stats['index_seconds']:.1f}s")
+    print()
+
+
+# ==============================================================================
+# CLI
+# ==============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Add FoodData Central Branded Foods to the USDA database within a size budget"
+    )
+    parser.add_argument("--input", required=True, help="Branded Foods JSON bulk download (zip or .json)")
+    parser.add_argument("--db", required=True, help="USDA database to extend (e.g. the build database)")
+    parser.add_argument(
+        "--max-size-mb",
+        type=float,
+        default=DEFAULT_MAX_SIZE_MB,
+        help=f"Size budget for the whole database in MB, search indexes included (default: {DEFAULT_MAX_SIZE_MB:g})"
+    )
+    parser.add_argument("--popularity", help="CSV with gtin,count columns to rank products by")
+    parser.add_argument(
+        "--ingredients",
+        action="store_true",
+        help="Also store ingredient statements (large; the app doesn't read them)"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=LOAD_CHUNK,
+        help=f"Products per load transaction (default: {LOAD_CHUNK})"
+    )
+    parser.add_argument(
+        "--trigram",
+        action="store_true",
+        help="Also build a trigram FTS5 index for substring search (SQLite 3.34+)"
+    )
+
+    args = parser.parse_args()
+
+    try:
+        stats = import_branded_foods(
+            input_path=args.input,
+            db_path=args.db,
+            max_size_mb=args.max_size_mb,
+            popularity_path=args.popularity,
+            keep_ingredients=args.ingredients,
+            chunk_size=args.chunk_size,
+            trigram=args.trigram
+        )
+    except (FileNotFoundError, ValueError, zipfile.BadZipFile, RuntimeError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print_report(stats, args.max_size_mb)
+
+
+if __name__ == "__main__":
+    main()
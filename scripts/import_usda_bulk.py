@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+USDA Bulk Download Importer
+
+Builds the same SQLite database as populate_usda_db.py, but from the official
+FoodData Central bulk download archives instead of the API. No network access
+or API key needed - download the CSV zips once and copy them to the build host.
+
+Archives: https://fdc.nal.usda.gov/download-datasets.html
+    - SR Legacy  (FoodData_Central_sr_legacy_food_csv_*.zip)
+    - Foundation (FoodData_Central_foundation_food_csv_*.zip)
+
+Each archive is streamed straight from the zip (food_category.csv, food.csv,
+food_nutrient.csv, food_portion.csv). Only nutrients in NUTRIENTS are kept, and
+rows are written in fixed-size chunks, so memory stays bounded even for the
+full download.
+
+Usage:
+    python import_usda_bulk.py --archive FoodData_Central_sr_legacy_food_csv_2018-04.zip
+    python import_usda_bulk.py --archive sr_legacy.zip --archive foundation.zip --output path/to/db.sqlite
+"""
+
+import csv
+import io
+import sqlite3
+import argparse
+import sys
+import time
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterator, List, Set, Tuple
+
+from populate_usda_db import (
+    FOOD_PORTIONS_INSERT,
+    NUTRIENT_IDS,
+    PORTION_MACROS,
+    SEARCH_TRIGGERS,
+    USDA_FOODS_UPSERT,
+    _drop_search_table,
+    create_database_schema,
+    create_search_index,
+    generate_search_terms,
+    populate_nutrients,
+    portion_label,
+    rebuild_search_index,
+    validate_database,
+)
+
+
+# ==============================================================================
+# Configuration
+# ==============================================================================
+
+# food.csv data_type values worth shipping (matches the API path's SR Legacy focus)
+DEFAULT_DATA_TYPES = ["sr_legacy_food", "foundation_food"]
+
+# Rows per executemany/commit while bulk loading
+CHUNK_SIZE = 5000
+
+
+# ==============================================================================
+# Archive Reading
+# ==============================================================================
+
+def open_csv(archive: zipfile.ZipFile, filename: str) -> Iterator[Dict[str, str]]:
+    """
+    Stream rows of a CSV member as dicts, wherever it sits inside the zip
+
+    Bulk archives nest their files in a dated folder
+    (e.g. FoodData_Central_sr_legacy_food_csv_2018-04/food.csv).
+    """
+    member = next(
+        (name for name in archive.namelist() if name.rsplit("/", 1)[-1] == filename),
+        None
+    )
+    if member is None:
+        raise FileNotFoundError(f"{filename} not found in {archive.filename}")
+
+    with archive.open(member) as raw:
+        # utf-8-sig strips the BOM some FDC exports start with
+        yield from csv.DictReader(io.TextIOWrapper(raw, encoding="utf-8-sig", newline=""))
+
+
+def load_categories(archive: zipfile.ZipFile) -> Dict[str, str]:
+    """Map food_category id -> description (a few dozen rows)"""
+    try:
+        return {row["id"]: row["description"] for row in open_csv(archive, "food_category.csv")}
+    except FileNotFoundError:
+        return {}
+
+
+def load_measure_units(archive: zipfile.ZipFile) -> Dict[str, str]:
+    """Map measure_unit id -> name ("cup", "tbsp", "undetermined", ...)"""
+    try:
+        return {row["id"]: row["name"] for row in open_csv(archive, "measure_unit.csv")}
+    except FileNotFoundError:
+        return {}
+
+
+def _flush(conn: sqlite3.Connection, sql: str, rows: List[tuple]):
+    """Write one chunk in a single transaction"""
+    if rows:
+        conn.executemany(sql, rows)
+        conn.commit()
+        rows.clear()
+
+
+# ==============================================================================
+# Import Stages
+# ==============================================================================
+
+def import_foods(
+    conn: sqlite3.Connection,
+    archive: zipfile.ZipFile,
+    data_types: Set[str],
+    chunk_size: int = CHUNK_SIZE
+) -> Set[int]:
+    """Stream food.csv into usda_foods, returning the fdc_ids kept"""
+    categories = load_categories(archive)
+    kept: Set[int] = set()
+    rows: List[tuple] = []
+
+    for row in open_csv(archive, "food.csv"):
+        if row.get("data_type") not in data_types:
+            continue
+
+        fdc_id = int(row["fdc_id"])
+        description = row["description"]
+        category = categories.get(row.get("food_category_id", ""))
+        kept.add(fdc_id)
+
+        # Same column layout as the API path: description doubles as common name
+        rows.append((
+            fdc_id,
+            description,
+            description,
+            category,
+            generate_search_terms(description, category)
+        ))
+        if len(rows) >= chunk_size:
+            _flush(conn, USDA_FOODS_UPSERT, rows)
+
+    _flush(conn, USDA_FOODS_UPSERT, rows)
+    return kept
+
+
+def import_food_nutrients(
+    conn: sqlite3.Connection,
+    archive: zipfile.ZipFile,
+    fdc_ids: Set[int],
+    chunk_size: int = CHUNK_SIZE
+) -> int:
+    """Stream food_nutrient.csv, keeping tracked nutrients of kept foods"""
+    count = 0
+    rows: List[tuple] = []
+    sql = """
+        INSERT OR REPLACE INTO food_nutrients
+        (fdc_id, nutrient_id, amount)
+        VALUES (?, ?, ?)
+    """
+
+    for row in open_csv(archive, "food_nutrient.csv"):
+        nutrient_id = int(row["nutrient_id"])
+        if nutrient_id not in NUTRIENT_IDS or not row.get("amount"):
+            continue
+
+        fdc_id = int(row["fdc_id"])
+        if fdc_id not in fdc_ids:
+            continue
+
+        rows.append((fdc_id, nutrient_id, float(row["amount"])))
+        count += 1
+        if len(rows) >= chunk_size:
+            _flush(conn, sql, rows)
+
+    _flush(conn, sql, rows)
+    return count
+
+
+def import_food_portions(
+    conn: sqlite3.Connection,
+    archive: zipfile.ZipFile,
+    fdc_ids: Set[int],
+    chunk_size: int = CHUNK_SIZE
+) -> int:
+    """
+    Stream food_portion.csv into food_portions, with macros per portion
+
+    Runs after import_food_nutrients, so per-100 g macros are read back
+    from food_nutrients in the same mapping the API path uses.
+    """
+    units = load_measure_units(archive)
+    macro_ids = [nutrient_id for _, nutrient_id in PORTION_MACROS]
+    placeholders = ",".join("?" * len(macro_ids))
+    macros: Dict[int, Dict[int, float]] = {}
+    for fdc_id, nutrient_id, amount in conn.execute(
+        f"SELECT fdc_id, nutrient_id, amount FROM food_nutrients WHERE nutrient_id IN ({placeholders})",
+        macro_ids
+    ):
+        macros.setdefault(fdc_id, {})[nutrient_id] = amount
+
+    try:
+        portion_rows = open_csv(archive, "food_portion.csv")
+        count = 0
+        rows: List[tuple] = []
+        for row in portion_rows:
+            fdc_id = int(row["fdc_id"])
+            if fdc_id not in fdc_ids or not row.get("gram_weight"):
+                continue
+
+            grams = float(row["gram_weight"])
+            amount = float(row["amount"]) if row.get("amount") else 1.0
+            unit = units.get(row.get("measure_unit_id", ""))
+            if unit == "undetermined":
+                unit = None
+            modifier = row.get("modifier") or None
+            description = row.get("portion_description") or portion_label(amount, unit, modifier)
+            values = macros.get(fdc_id, {})
+            rows.append((
+                int(row["id"]), fdc_id, int(row["seq_num"]) if row.get("seq_num") else None, amount,
+                unit, modifier, description, grams,
+                *(round(values[nid] * grams / 100.0, 3) if nid in values else None for nid in macro_ids)
+            ))
+            count += 1
+            if len(rows) >= chunk_size:
+                _flush(conn, FOOD_PORTIONS_INSERT, rows)
+
+        _flush(conn, FOOD_PORTIONS_INSERT, rows)
+    except FileNotFoundError:
+        return 0
+    return count
+
+
+def import_archive(
+    conn: sqlite3.Connection,
+    archive_path: str,
+    data_types: List[str] = DEFAULT_DATA_TYPES,
+    chunk_size: int = CHUNK_SIZE
+) -> Tuple[int, int, int]:
+    """Import one archive's foods, nutrient values and portions, returning their counts"""
+    print(f"📦 {archive_path}")
+    with zipfile.ZipFile(archive_path) as archive:
+        fdc_ids = import_foods(conn, archive, set(data_types), chunk_size)
+        print(f"   ✅ {len(fdc_ids):,} foods")
+
+        values = import_food_nutrients(conn, archive, fdc_ids, chunk_size)
+        print(f"   ✅ {values:,} nutrient values")
+
+        portions = import_food_portions(conn, archive, fdc_ids, chunk_size)
+        print(f"   ✅ {portions:,} portions")
+
+    return len(fdc_ids), values, portions
+
+
+def import_archives(
+    archive_paths: List[str],
+    output_path: str,
+    data_types: List[str] = DEFAULT_DATA_TYPES,
+    chunk_size: int = CHUNK_SIZE,
+    trigram: bool = False
+):
+    """
+    Build the USDA database from one or more bulk download archives
+
+    Args:
+        archive_paths: Paths to FoodData Central CSV zip archives
+        output_path: Path to output SQLite database
+        data_types: food.csv data_type values to import
+        chunk_size: Rows per bulk insert transaction
+        trigram: Also build the trigram substring index
+    """
+    start = time.time()
+
+    conn = sqlite3.connect(output_path)
+    create_database_schema(conn, trigram=trigram)
+    populate_nutrients(conn)
+
+    # Drop the FTS tables (and their sync triggers) for the bulk load, so each
+    # inserted food isn't also indexed row by row; they're rebuilt once below
+    for table in SEARCH_TRIGGERS:
+        _drop_search_table(conn, table)
+    conn.commit()
+
+    total_foods = 0
+    total_values = 0
+    for archive_path in archive_paths:
+        foods, values, _ = import_archive(conn, archive_path, data_types, chunk_size)
+        total_foods += foods
+        total_values += values
+
+    print("🔍 Building FTS5 search index...")
+    create_search_index(conn, trigram=trigram)
+    rebuild_search_index(conn)
+
+    print("⚙️  Optimizing database...")
+    conn.execute("ANALYZE")
+    conn.execute("VACUUM")
+    conn.close()
+
+    print()
+    print("=" * 70)
+    print("✅ BULK IMPORT COMPLETE")
+    print("=" * 70)
+    print(f"Foods imported:      {total_foods:,}")
+    print(f"Nutrient values:     {total_values:,}")
+    print(f"Database size:       {Path(output_path).stat().st_size / 1024 / 1024:.1f} MB")
+    print(f"Duration:            {time.time() - start:.1f}s")
+    print()
+
+    validate_database(output_path)
+
+
+# ==============================================================================
+# CLI
+# ==============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build USDA nutrition database from FoodData Central bulk CSV archives"
+    )
+    parser.add_argument(
+        "--archive",
+        action="append",
+        required=True,
+        help="FoodData Central CSV zip archive (repeat for SR Legacy + Foundation)"
+    )
+    parser.add_argument(
+        "--output",
+        default="Food1/Data/usda_nutrients.db",
+        help="Output SQLite database path (default: Food1/Data/usda_nutrients.db)"
+    )
+    parser.add_argument(
+        "--data-types",
+        default=",".join(DEFAULT_DATA_TYPES),
+        help=f"Comma-separated food.csv data_type values (default: {','.join(DEFAULT_DATA_TYPES)})"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=CHUNK_SIZE,
+        help=f"Rows per bulk insert transaction (default: {CHUNK_SIZE})"
+    )
+
+    parser.add_argument(
+        "--trigram",
+        action="store_true",
+        help="Also build a trigram FTS5 index for substring search (SQLite 3.34+)"
+    )
+
+    args = parser.parse_args()
+
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    try:
+        import_archives(
+            archive_paths=args.archive,
+            output_path=str(output_path),
+            data_types=[t.strip() for t in args.data_types.split(",") if t.strip()],
+            chunk_size=args.chunk_size,
+            trigram=args.trigram
+        )
+    except (FileNotFoundError, zipfile.BadZipFile) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+Character N-gram Matcher for Batch Ingredient → USDA Matching
+
+Builds a TF-IDF matrix of character n-grams over usda_foods.description and
+common_name once, then scores a whole batch of ingredient names with one
+sparse matrix multiply (names × n-grams · n-grams × foods) and keeps the
+top-k foods per name. Character n-grams tolerate plurals, word order and
+spelling variants ("tomatos", "cheese cheddar") that the app's LIKE search
+and an LLM rerank call per ingredient are otherwise needed for.
+
+The index is saved next to the database (.ngrams.npz, no pickles) and
+reused while the database content it was built from is unchanged.
+
+scipy.sparse does the multiply when installed; otherwise the same product is
+computed with numpy over an inverted index (n-gram → foods postings).
+
+Usage:
+    python ngram_matcher.py --db Food1/Data/usda_nutrients.db "chicken breast" "greek yogurt"
+    python ngram_matcher.py --db Food1/Data/usda_nutrients.db --build
+    python ngram_matcher.py --db Food1/Data/usda_nutrients.db --benchmark
+"""
+
+import sqlite3
+import argparse
+import hashlib
+import json
+import math
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# scipy is optional: the numpy postings path computes the same scores
+try:
+    import scipy.sparse as sparse
+except ImportError:
+    sparse = None
+
+from benchmark_usda_db import SEARCH_LIMIT, build_like_search, percentile
+
+# Shared with the evaluation tools: cleanIngredientName port and Unicode folding
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "evaluation"))
+from ingredient_normalizer import clean_ingredient_name, fold  # noqa: E402
+
+
+# ==============================================================================
+# Configuration
+# ==============================================================================
+
+NGRAM_SIZES = (3,)  # Character n-gram lengths, within word boundaries
+TOP_K = 10
+BLOCK_BYTES = 64 * 1024 * 1024  # Memory per scoring batch: sizes the names × foods block
+POSTING_BYTES = 40  # numpy fallback: working memory per expanded (name, food) posting
+INDEX_VERSION = 2  # 2: text is Unicode-folded before n-gramming
+
+DEFAULT_RESULTS = "evaluation/results/evaluation_results.json"
+DEFAULT_LABELS = "evaluation/results/verified_shortcuts.json"
+THROUGHPUT_NAMES = 5000  # Batch size for the throughput run
+RECALL_AT = [1, 5, 10]
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+# ==============================================================================
+# Text → N-grams
+# ==============================================================================
+
+def char_ngrams(text: str, sizes: Sequence[int] = NGRAM_SIZES) -> List[str]:
+    """
+    Character n-grams of each word, padded with spaces at the word edges
+
+    "Eggs, raw" with sizes (3,) → " eg", "egg", "ggs", "gs ", " ra", "raw", "aw "
+    Words shorter than an n-gram still yield one gram (the padded word).
+    Text is folded first, so "Jalapeño" and "jalapeno" share every gram.
+    """
+    grams = []
+    for word in WORD_PATTERN.findall(fold(text)):
+        padded = f" {word} "
+        for n in sizes:
+            if len(padded) <= n:
+                grams.append(padded)
+            else:
+                grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return grams
+
+
+def food_text(description: str, common_name: Optional[str]) -> str:
+    return f"{description} {common_name}" if common_name else description
+
+
+def source_fingerprint(conn: sqlite3.Connection) -> str:
+    """Hash of the indexed columns, to tell whether a saved index is stale"""
+    digest = hashlib.sha1()
+    for fdc_id, description, common_name in conn.execute(
+        "SELECT fdc_id, description, common_name FROM usda_foods ORDER BY fdc_id"
+    ):
+        digest.update(f"{fdc_id}\t{description}\t{common_name or ''}\n".encode())
+    return digest.hexdigest()
+
+
+# ==============================================================================
+# Index
+# ==============================================================================
+
+class NgramIndex:
+    """
+    TF-IDF character n-gram vectors for every USDA food
+
+    Rows are L2-normalized (sublinear tf × smoothed idf), so the product of a
+    name vector and a food vector is their cosine similarity.
+    """
+
+    def __init__(
+        self,
+        fdc_ids: np.ndarray,
+        vocabulary: List[str],
+        idf: np.ndarray,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        data: np.ndarray,
+        sizes: Sequence[int],
+        fingerprint: str
+    ):
+        self.fdc_ids = fdc_ids
+        self.vocabulary = vocabulary
+        self.columns = {gram: i for i, gram in enumerate(vocabulary)}
+        self.idf = idf
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.sizes = tuple(sizes)
+        self.fingerprint = fingerprint
+        self._prepare_backend()
+
+    @property
+    def food_count(self) -> int:
+        return len(self.fdc_ids)
+
+    @property
+    def batch_size(self) -> int:
+        """Names per scoring batch, so the dense names × foods block fits BLOCK_BYTES"""
+        return max(1, BLOCK_BYTES // (max(1, self.food_count) * np.dtype(np.float64).itemsize))
+
+    def _prepare_backend(self):
+        """Transpose once into the layout the multiply reads (n-gram → foods)"""
+        shape = (self.food_count, len(self.vocabulary))
+        if sparse is not None:
+            self._foods_t = sparse.csr_matrix((self.data, self.indices, self.indptr), shape=shape).T.tocsr()
+            return
+
+        # Postings: for each n-gram column, the foods containing it and their weights
+        rows = np.repeat(np.arange(self.food_count), np.diff(self.indptr))
+        order = np.argsort(self.indices, kind="stable")
+        self._post_foods = rows[order]
+        self._post_weights = self.data[order]
+        counts = np.bincount(self.indices, minlength=len(self.vocabulary))
+        self._post_indptr = np.concatenate(([0], np.cumsum(counts)))
+
+    @classmethod
+    def build(cls, conn: sqlite3.Connection, sizes: Sequence[int] = NGRAM_SIZES) -> "NgramIndex":
+        """Vectorize usda_foods.description + common_name"""
+        rows = conn.execute(
+            "SELECT fdc_id, description, common_name FROM usda_foods ORDER BY fdc_id"
+        ).fetchall()
+
+        columns: Dict[str, int] = {}
+        doc_counts: List[Counter] = []
+        for _, description, common_name in rows:
+            counts = Counter(char_ngrams(food_text(description, common_name), sizes))
+            for gram in counts:
+                if gram not in columns:
+                    columns[gram] = len(columns)
+            doc_counts.append(counts)
+
+        document_frequency = np.zeros(len(columns), dtype=np.float64)
+        for counts in doc_counts:
+            for gram in counts:
+                document_frequency[columns[gram]] += 1
+        idf = (np.log((1 + len(rows)) / (1 + document_frequency)) + 1).astype(np.float32)
+
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+        for counts in doc_counts:
+            cols = [columns[gram] for gram in counts]
+            weights = np.array([1 + math.log(c) for c in counts.values()], dtype=np.float32) * idf[cols]
+            norm = float(np.linalg.norm(weights)) or 1.0
+            order = np.argsort(cols)
+            indices.extend(np.asarray(cols)[order].tolist())
+            data.extend((weights[order] / norm).tolist())
+            indptr.append(len(indices))
+
+        vocabulary = [None] * len(columns)
+        for gram, col in columns.items():
+            vocabulary[col] = gram
+
+        return cls(
+            fdc_ids=np.array([r[0] for r in rows], dtype=np.int64),
+            vocabulary=vocabulary,
+            idf=idf,
+            indptr=np.array(indptr, dtype=np.int64),
+            indices=np.array(indices, dtype=np.int32),
+            data=np.array(data, dtype=np.float32),
+            sizes=sizes,
+            fingerprint=source_fingerprint(conn)
+        )
+
+    def save(self, path: str):
+        """Write the index as a plain .npz (loads without pickle)"""
+        meta = {"version": INDEX_VERSION, "sizes": list(self.sizes), "fingerprint": self.fingerprint}
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                fdc_ids=self.fdc_ids,
+                vocabulary=np.array(self.vocabulary, dtype=str),
+                idf=self.idf,
+                indptr=self.indptr,
+                indices=self.indices,
+                data=self.data,
+                meta=np.array(json.dumps(meta))
+            )
+
+    @classmethod
+    def load(cls, path: str) -> Optional["NgramIndex"]:
+        """Read a saved index; None if it was written by an incompatible version"""
+        with np.load(path, allow_pickle=False) as saved:
+            meta = json.loads(str(saved["meta"]))
+            if meta.get("version") != INDEX_VERSION:
+                return None
+            return cls(
+                fdc_ids=saved["fdc_ids"],
+                vocabulary=saved["vocabulary"].tolist(),
+                idf=saved["idf"],
+                indptr=saved["indptr"],
+                indices=saved["indices"],
+                data=saved["data"],
+                sizes=meta["sizes"],
+                fingerprint=meta["fingerprint"]
+            )
+
+    # --------------------------------------------------------------------------
+    # Matching
+    # --------------------------------------------------------------------------
+
+    def vectorize(self, names: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """CSR arrays (indptr, indices, data) of L2-normalized name vectors"""
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+        for name in names:
+            counts = Counter(
+                self.columns[gram] for gram in char_ngrams(name, self.sizes) if gram in self.columns
+            )
+            if counts:
+                cols = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+                tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+                weights = (1 + np.log(tf)) * self.idf[cols]
+                indices.extend(cols.tolist())
+                data.extend((weights / np.linalg.norm(weights)).tolist())
+            indptr.append(len(indices))
+        return (
+            np.array(indptr, dtype=np.int64),
+            np.array(indices, dtype=np.int32),
+            np.array(data, dtype=np.float32)
+        )
+
+    def scores(self, names: Sequence[str]) -> np.ndarray:
+        """Dense (len(names) × foods) cosine similarities - one sparse multiply"""
+        indptr, indices, data = self.vectorize(names)
+        batch = len(names)
+
+        if sparse is not None:
+            queries = sparse.csr_matrix((data, indices, indptr), shape=(batch, len(self.vocabulary)))
+            return (queries @ self._foods_t).toarray()
+
+        # Expand every (name, n-gram) entry into that n-gram's postings, then
+        # sum the products per (name, food) cell with one bincount. Common
+        # n-grams have long postings, so the expansion can dwarf the dense
+        # block: names are expanded a run at a time, within BLOCK_BYTES.
+        block = np.zeros((batch, self.food_count))
+        starts = self._post_indptr[indices]
+        lengths = self._post_indptr[indices + 1] - starts
+        # Postings expanded before each name (and in total)
+        name_postings = np.concatenate(([0], np.cumsum(lengths)))[indptr]
+        budget = max(1, BLOCK_BYTES // POSTING_BYTES)
+
+        first = 0
+        while first < batch:
+            last = int(np.searchsorted(name_postings, name_postings[first] + budget, side="right")) - 1
+            last = min(batch, max(last, first + 1))
+            entries = slice(indptr[first], indptr[last])
+            run_lengths = lengths[entries]
+            total = int(run_lengths.sum())
+            offsets = np.arange(total) - np.repeat(np.cumsum(run_lengths) - run_lengths, run_lengths)
+            postings = np.repeat(starts[entries], run_lengths) + offsets
+
+            rows = np.repeat(np.arange(last - first), np.diff(indptr[first:last + 1]))
+            cells = np.repeat(rows, run_lengths) * self.food_count + self._post_foods[postings]
+            products = np.repeat(data[entries], run_lengths) * self._post_weights[postings]
+            block[first:last] = np.bincount(
+                cells, weights=products, minlength=(last - first) * self.food_count
+            ).reshape(last - first, self.food_count)
+            first = last
+        return block
+
+    def match(
+        self,
+        names: Sequence[str],
+        k: int = TOP_K,
+        batch_size: Optional[int] = None
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Top-k (fdc_id, score) per name, best first
+
+        Names are scored batch_size at a time (default: sized from the food
+        count, see batch_size); foods scoring 0 (no shared n-gram) are never
+        returned.
+        """
+        k = min(k, self.food_count)
+        batch_size = batch_size or self.batch_size
+        results: List[List[Tuple[int, float]]] = []
+        for start in range(0, len(names), batch_size):
+            block = self.scores(names[start:start + batch_size])
+            top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(block, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            for row_ids, row_scores in zip(top, top_scores):
+                results.append([
+                    (int(self.fdc_ids[i]), round(float(s), 4))
+                    for i, s in zip(row_ids, row_scores) if s > 0
+                ])
+        return results
+
+
+def default_index_path(db_path: str) -> str:
+    return str(Path(db_path).with_suffix(".ngrams.npz"))
+
+
+def load_or_build(
+    conn: sqlite3.Connection,
+    index_path: str,
+    sizes: Sequence[int] = NGRAM_SIZES,
+    rebuild: bool = False
+) -> Tuple[NgramIndex, bool]:
+    """
+    The saved index if it matches the database, else a fresh (saved) one
+
+    Returns:
+        (index, built) - built is True when the index was rebuilt
+    """
+    if not rebuild and Path(index_path).exists():
+        index = NgramIndex.load(index_path)
+        if index and index.fingerprint == source_fingerprint(conn) and index.sizes == tuple(sizes):
+            return index, False
+
+    index = NgramIndex.build(conn, sizes)
+    index.save(index_path)
+    return index, True
+
+
+# ==============================================================================
+# Benchmark
+# ==============================================================================
+
+def load_evaluation_ingredients(path: str) -> List[str]:
+    """Every ingredient name in evaluation_results.json, one per occurrence"""
+    with open(path) as f:
+        results = json.load(f)
+    return [
+        ing["name"]
+        for r in results if "result" in r.get("response", {})
+        for pred in r["response"]["result"].get("predictions", [])
+        for ing in pred.get("ingredients", [])
+    ]
+
+
+def load_labels(path: str) -> Dict[str, int]:
+    with open(path) as f:
+        return {name: entry["fdc_id"] for name, entry in json.load(f).items()}
+
+
+def recall(ranked: List[List[int]], expected: List[Optional[int]]) -> Dict[str, Optional[float]]:
+    labeled = [(ids, want) for ids, want in zip(ranked, expected) if want is not None]
+    if not labeled:
+        return {f"@{k}": None for k in RECALL_AT}
+    return {
+        f"@{k}": round(sum(1 for ids, want in labeled if want in ids[:k]) / len(labeled), 3)
+        for k in RECALL_AT
+    }
+
+
+def benchmark(conn: sqlite3.Connection, index: NgramIndex, results_path: str, labels_path: str):
+    """
+    The app's per-ingredient LIKE query vs one batched n-gram multiply, on the
+    evaluation ingredient set: total time, per-name cost and recall@k
+    """
+    names = load_evaluation_ingredients(results_path)
+    cleaned = [clean_ingredient_name(name) for name in names]
+    labels = load_labels(labels_path) if Path(labels_path).exists() else {}
+    expected = [labels.get(name) for name in cleaned]
+
+    # SQL path: one LIKE query per ingredient (original name, then cleaned), as the app does
+    like_ranked = []
+    like_times = []
+    start = time.perf_counter()
+    for name, clean in zip(names, cleaned):
+        query_start = time.perf_counter()
+        rows = []
+        for query in (name.lower().strip(), clean):
+            built = build_like_search(query, SEARCH_LIMIT)
+            rows = conn.execute(*built).fetchall() if built else []
+            if rows:
+                break
+        like_times.append((time.perf_counter() - query_start) * 1000)
+        like_ranked.append([row[0] for row in rows])
+    like_total = (time.perf_counter() - start) * 1000
+
+    # N-gram path: every ingredient in one batch
+    start = time.perf_counter()
+    matches = index.match(cleaned, k=max(RECALL_AT))
+    ngram_total = (time.perf_counter() - start) * 1000
+    ngram_ranked = [[fdc_id for fdc_id, _ in m] for m in matches]
+
+    # Throughput at production batch sizes (names repeated to THROUGHPUT_NAMES)
+    many = (cleaned * (THROUGHPUT_NAMES // max(len(cleaned), 1) + 1))[:THROUGHPUT_NAMES]
+    start = time.perf_counter()
+    index.match(many, k=TOP_K)
+    many_total = (time.perf_counter() - start) * 1000
+
+    like_times.sort()
+    like_recall = recall(like_ranked, expected)
+    ngram_recall = recall(ngram_ranked, expected)
+    labeled = sum(1 for want in expected if want is not None)
+
+    print()
+    print("=" * 70)
+    print("📊 N-GRAM MATCHER vs SQL LIKE")
+    print("=" * 70)
+    print(f"Ingredients: {len(names)} ({labeled} with a verified fdc_id), foods indexed: {index.food_count:,}")
+    print(f"Backend: {'scipy.sparse' if sparse is not None else 'numpy postings'}")
+    print()
+    print(f"{'path':<24}{'total ms':>10}{'ms/name':>10}" + "".join(f"{'R' + k:>8}" for k in ngram_recall))
+    print(f"{'LIKE (per ingredient)':<24}{like_total:>10.1f}{like_total / len(names):>10.3f}"
+          + "".join(f"{v if v is not None else '-':>8}" for v in like_recall.values()))
+    print(f"{'n-gram (one batch)':<24}{ngram_total:>10.1f}{ngram_total / len(names):>10.3f}"
+          + "".join(f"{v if v is not None else '-':>8}" for v in ngram_recall.values()))
+    print()
+    print(f"LIKE p50/p95 per ingredient: {percentile(like_times, 50):.3f} / {percentile(like_times, 95):.3f} ms")
+    print(f"n-gram throughput: {THROUGHPUT_NAMES:,} names in {many_total:.0f} ms "
+          f"({THROUGHPUT_NAMES / (many_total / 1000):,.0f} names/s)")
+    if ngram_total:
+        print(f"⚡ Batch n-gram matching is {like_total / ngram_total:.1f}× faster than per-ingredient LIKE")
+
+
+# ==============================================================================
+# CLI
+# ==============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch ingredient → USDA matching with character n-gram TF-IDF")
+    parser.add_argument("names", nargs="*", help="Ingredient names to match")
+    parser.add_argument("--db", default="Food1/Data/usda_nutrients.db", help="USDA database")
+    parser.add_argument("--index", help="Saved index (default: <db>.ngrams.npz)")
+    parser.add_argument("--ngrams", default=",".join(str(n) for n in NGRAM_SIZES),
+                        help=f"Comma-separated n-gram sizes (default: {','.join(str(n) for n in NGRAM_SIZES)})")
+    parser.add_argument("--top-k", type=int, default=5, help="Candidates per name (default: 5)")
+    parser.add_argument("--build", action="store_true", help="Rebuild the index even if the saved one is current")
+    parser.add_argument("--benchmark", action="store_true", help="Compare with the app's LIKE path on the evaluation set")
+    parser.add_argument("--results", default=DEFAULT_RESULTS, help=f"Evaluation results (default: {DEFAULT_RESULTS})")
+    parser.add_argument("--labels", default=DEFAULT_LABELS, help=f"Verified shortcuts (default: {DEFAULT_LABELS})")
+
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"❌ Database not found: {args.db}")
+        sys.exit(1)
+
+    sizes = tuple(int(n) for n in args.ngrams.split(","))
+    index_path = args.index or default_index_path(args.db)
+    conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+
+    start = time.perf_counter()
+    index, built = load_or_build(conn, index_path, sizes, rebuild=args.build)
+    elapsed = (time.perf_counter() - start) * 1000
+    size_mb = Path(index_path).stat().st_size / 1024 / 1024
+    print(f"{'🔨 Built' if built else '📂 Loaded'} index in {elapsed:.0f}ms: {index.food_count:,} foods × "
+          f"{len(index.vocabulary):,} n-grams, {len(index.data):,} weights ({size_mb:.2f} MB, {index_path})")
+
+    if args.benchmark:
+        benchmark(conn, index, args.results, args.labels)
+    elif args.names:
+        descriptions = dict(conn.execute("SELECT fdc_id, description FROM usda_foods"))
+        for name, candidates in zip(args.names, index.match(args.names, k=args.top_k)):
+            print(f"\n🔎 {name}")
+            for fdc_id, score in candidates:
+                print(f"  {score:.3f}  [{fdc_id}] {descriptions[fdc_id]}")
+    elif not args.build:
+        parser.error("give ingredient names, --build or --benchmark")
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+"""
+Packed Nutrient Vectors for the USDA Database
+
+Alternative storage layout for food_nutrients. Instead of one row per
+(fdc_id, nutrient_id) - a composite primary key plus a redundant
+idx_food_nutrients_fdc index - each food gets one row:
+
+    food_nutrient_vectors(fdc_id INTEGER PRIMARY KEY, present INTEGER, amounts BLOB)
+
+    present   bitmap over the fixed slot order in nutrient_slots
+              (bit i set = the food has a value for slot i)
+    amounts   little-endian float32 values for the present slots, in slot order
+
+Reading a food's nutrients is then a single primary-key lookup plus a
+struct.unpack, with no join; names and units come from the small nutrients
+table, loaded once.
+
+Amounts are stored as float32 (~7 significant digits), well beyond the
+precision of USDA's published values.
+
+Usage:
+    python pack_usda_nutrients.py --db Food1/Data/usda_nutrients.db --output usda_packed.db
+    python pack_usda_nutrients.py --db Food1/Data/usda_nutrients.db --output usda_packed.db --keep-rows
+    python pack_usda_nutrients.py --db usda_packed.db --verify-against Food1/Data/usda_nutrients.db
+    python pack_usda_nutrients.py --self-test
+"""
+
+import sqlite3
+import argparse
+import math
+import struct
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from benchmark_usda_db import MICRONUTRIENTS_SQL, percentile
+
+
+# ==============================================================================
+# Configuration
+# ==============================================================================
+
+MAX_SLOTS = 63  # present bitmap must fit a signed 64-bit SQLite INTEGER
+FLOAT32_REL_TOLERANCE = 1e-6  # round-trip tolerance for float32 storage
+FLOAT32_MAX = 3.4028234663852886e38
+FLOAT32_MIN_NORMAL = 1.1754943508222875e-38
+FLOAT32_MIN_SUBNORMAL = 1.401298464324817e-45
+
+# Same exclusions as LocalUSDAService.getMicronutrients
+MACRO_NAMES = ("Protein", "Carbohydrate", "Total Fat", "Energy")
+
+
+# ==============================================================================
+# Packing
+# ==============================================================================
+
+def pack_nutrients(values: Dict[int, float], slots: List[int]) -> Tuple[int, bytes]:
+    """
+    Encode nutrient_id -> amount as (present bitmap, float32 blob)
+
+    Nutrients that are not in slots are ignored.
+    """
+    present = 0
+    amounts = []
+    for slot, nutrient_id in enumerate(slots):
+        amount = values.get(nutrient_id)
+        if amount is not None:
+            present |= 1 << slot
+            amounts.append(amount)
+    return present, struct.pack(f"<{len(amounts)}f", *amounts)
+
+
+def unpack_nutrients(present: int, blob: bytes, slots: List[int]) -> Dict[int, float]:
+    """Decode (present bitmap, float32 blob) back to nutrient_id -> amount"""
+    amounts = struct.unpack(f"<{len(blob) // 4}f", blob)
+    nutrient_ids = [nutrient_id for slot, nutrient_id in enumerate(slots) if present >> slot & 1]
+    return dict(zip(nutrient_ids, amounts))
+
+
+def create_vector_tables(conn: sqlite3.Connection, slots: List[int]):
+    """Create the slot order and per-food vector tables"""
+    if len(slots) > MAX_SLOTS:
+        raise ValueError(f"{len(slots)} nutrients do not fit a {MAX_SLOTS}-bit present bitmap")
+
+    conn.executescript("""
+        DROP TABLE IF EXISTS nutrient_slots;
+        DROP TABLE IF EXISTS food_nutrient_vectors;
+
+        CREATE TABLE nutrient_slots (
+            slot INTEGER PRIMARY KEY,
+            nutrient_id INTEGER NOT NULL UNIQUE
+        );
+
+        CREATE TABLE food_nutrient_vectors (
+            fdc_id INTEGER PRIMARY KEY,
+            present INTEGER NOT NULL,
+            amounts BLOB NOT NULL
+        );
+    """)
+    conn.executemany("INSERT INTO nutrient_slots (slot, nutrient_id) VALUES (?, ?)", enumerate(slots))
+
+
+def write_vectors(conn: sqlite3.Connection, keep_rows: bool = False) -> int:
+    """
+    Pack food_nutrients into food_nutrient_vectors, returning the food count
+
+    Unless keep_rows is set, food_nutrients and its index are dropped.
+    """
+    slots = [row[0] for row in conn.execute("SELECT nutrient_id FROM nutrients ORDER BY nutrient_id")]
+
+    with conn:
+        create_vector_tables(conn, slots)
+
+        rows = []
+        current_id: Optional[int] = None
+        values: Dict[int, float] = {}
+        # Ordered by the primary key, so this is one sequential pass
+        cursor = conn.execute("SELECT fdc_id, nutrient_id, amount FROM food_nutrients ORDER BY fdc_id, nutrient_id")
+        for fdc_id, nutrient_id, amount in cursor:
+            if fdc_id != current_id:
+                if current_id is not None:
+                    rows.append((current_id, *pack_nutrients(values, slots)))
+                current_id, values = fdc_id, {}
+            if amount is not None:
+                values[nutrient_id] = amount
+        if current_id is not None:
+            rows.append((current_id, *pack_nutrients(values, slots)))
+
+        conn.executemany(
+            "INSERT INTO food_nutrient_vectors (fdc_id, present, amounts) VALUES (?, ?, ?)", rows
+        )
+
+        if not keep_rows:
+            conn.execute("DROP INDEX IF EXISTS idx_food_nutrients_fdc")
+            conn.execute("DROP TABLE food_nutrients")
+
+    return len(rows)
+
+
+# ==============================================================================
+# Reading
+# ==============================================================================
+
+class NutrientVectorReader:
+    """
+    Reads packed nutrient vectors; the Python counterpart of what the app would do
+
+    Slot order and nutrient metadata are loaded once, so each lookup is a
+    single primary-key read.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.slots = [row[0] for row in conn.execute("SELECT nutrient_id FROM nutrient_slots ORDER BY slot")]
+        self.nutrients = {
+            nutrient_id: (name, unit)
+            for nutrient_id, name, unit in conn.execute("SELECT nutrient_id, name, unit FROM nutrients")
+        }
+        self._macro_ids = {nid for nid, (name, _) in self.nutrients.items() if name in MACRO_NAMES}
+
+    def get(self, fdc_id: int) -> Dict[int, float]:
+        """nutrient_id -> amount per 100 g (empty if the food is unknown)"""
+        row = self.conn.execute(
+            "SELECT present, amounts FROM food_nutrient_vectors WHERE fdc_id = ?", (fdc_id,)
+        ).fetchone()
+        return unpack_nutrients(row[0], row[1], self.slots) if row else {}
+
+    def micronutrients(self, fdc_id: int) -> List[Tuple[str, str, float]]:
+        """(name, unit, amount) rows, like LocalUSDAService.getMicronutrients' query"""
+        return [
+            (*self.nutrients[nutrient_id], amount)
+            for nutrient_id, amount in self.get(fdc_id).items()
+            if nutrient_id not in self._macro_ids
+        ]
+
+
+def read_rows(conn: sqlite3.Connection, fdc_id: int) -> Dict[int, float]:
+    """nutrient_id -> amount from the row layout"""
+    return dict(conn.execute(
+        "SELECT nutrient_id, amount FROM food_nutrients WHERE fdc_id = ? AND amount IS NOT NULL", (fdc_id,)
+    ).fetchall())
+
+
+# ==============================================================================
+# Verification & Comparison
+# ==============================================================================
+
+def verify_round_trip(row_conn: sqlite3.Connection, packed_conn: sqlite3.Connection) -> List[str]:
+    """Compare every food's packed vector with its rows; returns mismatch descriptions"""
+    reader = NutrientVectorReader(packed_conn)
+    mismatches = []
+    row_ids = [r[0] for r in row_conn.execute("SELECT DISTINCT fdc_id FROM food_nutrients")]
+    packed_ids = {r[0] for r in packed_conn.execute("SELECT fdc_id FROM food_nutrient_vectors")}
+
+    for fdc_id in sorted(set(row_ids) - packed_ids):
+        mismatches.append(f"{fdc_id}: missing from food_nutrient_vectors")
+
+    for fdc_id in row_ids:
+        if fdc_id not in packed_ids:
+            continue
+        expected = {nid: v for nid, v in read_rows(row_conn, fdc_id).items() if nid in reader.nutrients}
+        actual = reader.get(fdc_id)
+        if expected.keys() != actual.keys():
+            mismatches.append(f"{fdc_id}: nutrients {sorted(expected.keys() ^ actual.keys())} differ")
+            continue
+        for nutrient_id, value in expected.items():
+            if not math.isclose(value, actual[nutrient_id], rel_tol=FLOAT32_REL_TOLERANCE, abs_tol=1e-30):
+                mismatches.append(f"{fdc_id}/{nutrient_id}: {value} != {actual[nutrient_id]}")
+
+    return mismatches
+
+
+def time_lookups(lookup, fdc_ids: List[int], rounds: int = 5) -> Tuple[float, float]:
+    """(p50, p95) milliseconds per lookup over every id, rounds times"""
+    timings = []
+    for _ in range(rounds):
+        for fdc_id in fdc_ids:
+            start = time.perf_counter_ns()
+            lookup(fdc_id)
+            timings.append((time.perf_counter_ns() - start) / 1e6)
+    timings.sort()
+    return percentile(timings, 50), percentile(timings, 95)
+
+
+def vacuumed_size_mb(path: str) -> float:
+    """Size of path once vacuumed (VACUUM INTO a temporary copy; path is untouched)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        copy = Path(tmp) / "vacuumed.db"
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        conn.execute("VACUUM INTO ?", (str(copy),))
+        conn.close()
+        return copy.stat().st_size / 1024 / 1024
+
+
+def compare_layouts(row_path: str, packed_path: str):
+    """Print file size and micronutrient lookup latency for both layouts"""
+    row_conn = sqlite3.connect(f"file:{row_path}?mode=ro", uri=True)
+    packed_conn = sqlite3.connect(f"file:{packed_path}?mode=ro", uri=True)
+    reader = NutrientVectorReader(packed_conn)
+    fdc_ids = [r[0] for r in packed_conn.execute("SELECT fdc_id FROM food_nutrient_vectors")]
+
+    row_p50, row_p95 = time_lookups(lambda i: row_conn.execute(MICRONUTRIENTS_SQL, (i,)).fetchall(), fdc_ids)
+    packed_p50, packed_p95 = time_lookups(reader.micronutrients, fdc_ids)
+
+    # Both vacuumed: the packed copy always is, the source may carry free pages
+    row_size = vacuumed_size_mb(row_path)
+    packed_size = vacuumed_size_mb(packed_path)
+
+    print()
+    print("=" * 70)
+    print("📊 ROW LAYOUT vs PACKED VECTORS")
+    print("=" * 70)
+    print(f"{'':<22} {'rows':>12} {'packed':>12}")
+    print(f"{'Vacuumed size (MB)':<22} {row_size:>12.2f} {packed_size:>12.2f}")
+    print(f"{'Micronutrients p50 ms':<22} {row_p50:>12.4f} {packed_p50:>12.4f}")
+    print(f"{'Micronutrients p95 ms':<22} {row_p95:>12.4f} {packed_p95:>12.4f}")
+    print(f"Foods compared:        {len(fdc_ids):,}")
+
+    row_conn.close()
+    packed_conn.close()
+
+
+# ==============================================================================
+# Self-Test
+# ==============================================================================
+
+SELF_TEST_SCHEMA = """
+    CREATE TABLE nutrients (
+        nutrient_id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        unit TEXT NOT NULL
+    );
+    CREATE TABLE food_nutrients (
+        fdc_id INTEGER NOT NULL,
+        nutrient_id INTEGER NOT NULL,
+        amount REAL,
+        PRIMARY KEY (fdc_id, nutrient_id)
+    );
+    CREATE INDEX idx_food_nutrients_fdc ON food_nutrients(fdc_id);
+"""
+
+
+def _synthetic_database(nutrient_ids: List[int], foods: Dict[int, Dict[int, Optional[float]]]) -> sqlite3.Connection:
+    """In-memory row-layout database with the given nutrients and food values"""
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(SELF_TEST_SCHEMA)
+    conn.executemany(
+        "INSERT INTO nutrients (nutrient_id, name, unit) VALUES (?, ?, 'g')",
+        [(nid, f"Nutrient {nid}") for nid in nutrient_ids]
+    )
+    conn.executemany(
+        "INSERT INTO food_nutrients (fdc_id, nutrient_id, amount) VALUES (?, ?, ?)",
+        [(fdc_id, nid, amount) for fdc_id, values in foods.items() for nid, amount in values.items()]
+    )
+    conn.commit()
+    return conn
+
+
+def _pack_copy(row_conn: sqlite3.Connection) -> sqlite3.Connection:
+    """Packed copy of an in-memory row-layout database"""
+    packed_conn = sqlite3.connect(":memory:")
+    row_conn.backup(packed_conn)
+    write_vectors(packed_conn)
+    return packed_conn
+
+
+def self_test() -> List[str]:
+    """
+    Round-trip the edge cases on synthetic in-memory databases
+
+    Returns failure descriptions (empty when everything passes).
+    """
+    failures = []
+
+    def check(name: str, ok: bool, detail: str = ""):
+        print(f"   {'✅' if ok else '❌'} {name}")
+        if not ok:
+            failures.append(f"{name}: {detail}" if detail else name)
+
+    # Slot 62 is the bitmap's top bit: the INTEGER column must keep it
+    all_ids = [1000 + 3 * slot for slot in range(MAX_SLOTS)]
+    float32_limits = [
+        FLOAT32_MAX, -FLOAT32_MAX, FLOAT32_MIN_NORMAL, FLOAT32_MIN_SUBNORMAL, 0.0, 1e-7, 123456.7
+    ]
+    foods = {
+        # Only an untracked nutrient and a NULL amount: no tracked values
+        1: {9999: 5.0, all_ids[0]: None},
+        # Every slot present
+        2: {nid: slot + 0.5 for slot, nid in enumerate(all_ids)},
+        # Values at float32 limits, in every slot position they hit
+        3: dict(zip(all_ids, float32_limits)),
+        # Only the last slot
+        4: {all_ids[-1]: 42.0},
+    }
+    row_conn = _synthetic_database(all_ids, foods)
+    packed_conn = _pack_copy(row_conn)
+    reader = NutrientVectorReader(packed_conn)
+
+    present, blob = packed_conn.execute(
+        "SELECT present, amounts FROM food_nutrient_vectors WHERE fdc_id = 1"
+    ).fetchone()
+    check("food with no tracked nutrients packs empty", (present, blob) == (0, b""), f"{present}, {blob!r}")
+    check("food with no tracked nutrients reads empty", reader.get(1) == {}, str(reader.get(1)))
+
+    present = packed_conn.execute("SELECT present FROM food_nutrient_vectors WHERE fdc_id = 2").fetchone()[0]
+    check("every slot present sets all bits", present == (1 << MAX_SLOTS) - 1, hex(present))
+    check("every slot present reads back", reader.get(2) == foods[2])
+    check("last slot alone reads back", reader.get(4) == foods[4], str(reader.get(4)))
+
+    actual = reader.get(3)
+    check(
+        "float32 limits round-trip",
+        actual.keys() == foods[3].keys() and all(
+            math.isclose(value, actual[nid], rel_tol=FLOAT32_REL_TOLERANCE, abs_tol=1e-30)
+            for nid, value in foods[3].items()
+        ),
+        str(actual)
+    )
+    check("negative values keep their sign", actual[all_ids[1]] == -FLOAT32_MAX, str(actual[all_ids[1]]))
+
+    try:
+        pack_nutrients({all_ids[0]: FLOAT32_MAX * 2}, all_ids)
+        check("values beyond float32 are rejected", False, "packed without error")
+    except OverflowError:
+        check("values beyond float32 are rejected", True)
+
+    try:
+        create_vector_tables(sqlite3.connect(":memory:"), list(range(MAX_SLOTS + 1)))
+        check(f"more than {MAX_SLOTS} slots is rejected", False, "tables created")
+    except ValueError:
+        check(f"more than {MAX_SLOTS} slots is rejected", True)
+
+    mismatches = verify_round_trip(row_conn, packed_conn)
+    check("verify_round_trip passes", not mismatches, "; ".join(mismatches[:5]))
+
+    # A nutrient added to NUTRIENTS after packing, with an id that sorts
+    # between existing slots: stored vectors must keep decoding with the
+    # packed slot order, and the new nutrient is simply absent until repacked
+    added_id = all_ids[0] + 1
+    for conn in (row_conn, packed_conn):
+        with conn:
+            conn.execute("INSERT INTO nutrients (nutrient_id, name, unit) VALUES (?, 'Added', 'mg')", (added_id,))
+    reader = NutrientVectorReader(packed_conn)
+    check("added nutrient: existing vectors still decode", reader.get(2) == foods[2])
+    check("added nutrient: absent from old vectors", added_id not in reader.get(2))
+    check("added nutrient: micronutrients lookup works", len(reader.micronutrients(2)) == MAX_SLOTS)
+
+    # Repacking with a value for it needs a 64th slot, which must be refused
+    # rather than overflow the bitmap
+    with row_conn:
+        row_conn.execute("INSERT INTO food_nutrients VALUES (4, ?, 7.0)", (added_id,))
+    try:
+        _pack_copy(row_conn)
+        check("added nutrient: repacking past MAX_SLOTS is rejected", False, "packed 64 slots")
+    except ValueError:
+        check("added nutrient: repacking past MAX_SLOTS is rejected", True)
+
+    # With room to spare, a repack picks it up in id order
+    small_ids = all_ids[:3]
+    small_conn = _synthetic_database(small_ids, {5: {small_ids[0]: 1.0, small_ids[2]: 3.0}})
+    with small_conn:
+        small_conn.execute("INSERT INTO nutrients (nutrient_id, name, unit) VALUES (?, 'Added', 'mg')", (added_id,))
+        small_conn.execute("INSERT INTO food_nutrients VALUES (5, ?, 2.0)", (added_id,))
+    repacked = _pack_copy(small_conn)
+    slots = [row[0] for row in repacked.execute("SELECT nutrient_id FROM nutrient_slots ORDER BY slot")]
+    check("added nutrient: repack adds its slot", slots == sorted(small_ids + [added_id]), str(slots))
+    check(
+        "added nutrient: repack round-trips",
+        NutrientVectorReader(repacked).get(5) == {small_ids[0]: 1.0, added_id: 2.0, small_ids[2]: 3.0}
+    )
+
+    return failures
+
+
+# ==============================================================================
+# CLI
+# ==============================================================================
+
+def build_packed(db_path: str, output_path: str, keep_rows: bool = False):
+    """Copy db_path to output_path with packed nutrient vectors"""
+    output = Path(output_path)
+    if output.exists():
+        output.unlink()
+
+    source = sqlite3.connect(db_path)
+    source.execute("VACUUM INTO ?", (str(output),))
+    source.close()
+
+    conn = sqlite3.connect(str(output))
+    conn.execute("PRAGMA journal_mode=DELETE")
+    foods = write_vectors(conn, keep_rows=keep_rows)
+    conn.execute("VACUUM")
+    conn.close()
+    print(f"✅ Packed {foods:,} foods into {output_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or verify packed per-food nutrient vectors")
+    parser.add_argument("--db", default="Food1/Data/usda_nutrients.db", help="Source database (row layout)")
+    parser.add_argument("--output", help="Packed database to write")
+    parser.add_argument("--keep-rows", action="store_true", help="Keep food_nutrients next to the vectors")
+    parser.add_argument(
+        "--verify-against",
+        help="Row-layout database to check --db's packed vectors against (exit 1 on mismatch)"
+    )
+    parser.add_argument(
+        "--self-test",
+        action="store_true",
+        help="Round-trip edge cases on synthetic in-memory databases (exit 1 on failure)"
+    )
+
+    args = parser.parse_args()
+
+    if args.self_test:
+        print("🧪 Packed vector self-test...")
+        failures = self_test()
+        if failures:
+            print(f"❌ {len(failures)} checks failed")
+            sys.exit(1)
+        print("✅ All round-trip checks passed")
+        return
+
+    if not Path(args.db).exists():
+        print(f"❌ Database not found: {args.db}")
+        sys.exit(1)
+
+    if args.output:
+        build_packed(args.db, args.output, keep_rows=args.keep_rows)
+        row_path, packed_path = args.db, args.output
+    elif args.verify_against:
+        row_path, packed_path = args.verify_against, args.db
+    else:
+        parser.error("give --output to build, or --verify-against to check an existing packed database")
+
+    print("🔍 Verifying round trip...")
+    row_conn = sqlite3.connect(f"file:{row_path}?mode=ro", uri=True)
+    packed_conn = sqlite3.connect(f"file:{packed_path}?mode=ro", uri=True)
+    mismatches = verify_round_trip(row_conn, packed_conn)
+    row_conn.close()
+    packed_conn.close()
+
+    if mismatches:
+        for message in mismatches[:20]:
+            print(f"   ❌ {message}")
+        print(f"❌ {len(mismatches)} mismatches")
+        sys.exit(1)
+    print("✅ Every food round-trips within float32 precision")
+
+    compare_layouts(row_path, packed_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,26 +8,38 @@ Supports resumable operation, rate limiting, and comprehensive validation.
 Usage:
     python populate_usda_db.py --api-key YOUR_KEY --output path/to/db.sqlite
     python populate_usda_db.py --api-key YOUR_KEY --resume  # Resume from last run
+    python populate_usda_db.py --api-key KEY --api-base http://localhost:8080/fdc/v1  # Mock server
+    python populate_usda_db.py --offline  # Rebuild from the response cache only
+    python populate_usda_db.py --api-key YOUR_KEY --delta --diff-report delta.json  # Incremental update
 """
 
+from __future__ import annotations
+
 import sqlite3
+import gzip
+import hashlib
 import json
+import os
 import time
 import argparse
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Optional, Set
-from dataclasses import dataclass, asdict
+from typing import List, Dict, Optional, Set, Iterable, Iterator, Tuple
+from dataclasses import dataclass, field, asdict
 from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
 
+# requests is only needed for API mode; offline tools (import_usda_bulk.py)
+# import the schema and nutrient definitions from this module without it
 try:
     import requests
     from requests.adapters import HTTPAdapter
     from requests.packages.urllib3.util.retry import Retry
 except ImportError:
-    print("Error: 'requests' library not installed")
-    print("Install with: pip install requests")
-    sys.exit(1)
+    requests = None
 
 
 # ==============================================================================
@@ -37,14 +49,20 @@ except ImportError:
 # USDA FoodData Central API
 USDA_API_BASE = "https://api.nal.usda.gov/fdc/v1"
 RATE_LIMIT_PER_HOUR = 900  # Conservative (actual limit is 1000)
+RATE_LIMIT_BURST = 50  # Token bucket capacity
+RATE_LIMIT_RETRIES = 3  # Attempts after a 429 before giving up on a request
 BATCH_SIZE = 20  # Foods per API request
-
-# Progress tracking
-PROGRESS_FILE = "population_progress.json"
+MAX_WORKERS = 8  # Concurrent detail requests (bounded by the rate limiter)
 
 # Database settings
 DB_PAGE_SIZE = 4096  # Optimal for iOS
 DB_CACHE_SIZE = 10000  # 10MB cache
+WRITE_BATCH_FOODS = 200  # Foods per write transaction
+WAL_CHECKPOINT_EVERY = 10  # Write transactions between WAL checkpoints
+
+# Response cache (rebuild from disk after NUTRIENTS/parser changes, zero network)
+CACHE_DIR = ".usda_cache"
+CACHE_TTL_DAYS = 90  # SR Legacy is frozen; revalidate rarely
 
 
 # ==============================================================================
@@ -377,68 +395,207 @@ FOOD_SEARCH_TERMS = {
 # ==============================================================================
 # Progress Tracking
 # ==============================================================================
+#
+# Resume state lives in the output database (ingest_state), one row per fdc_id.
+# Markers are committed in the same transaction as the food data (see
+# FoodWriter), so a crash never loses finished work or redoes it.
+
+# Records an attempt; attempts counts every fetch/write tried for the food
+INGEST_STATE_UPSERT = """
+    INSERT INTO ingest_state (fdc_id, status, attempts, last_error, updated_at)
+    VALUES (?, ?, 1, ?, ?)
+    ON CONFLICT(fdc_id) DO UPDATE SET
+        status = excluded.status,
+        attempts = ingest_state.attempts + 1,
+        last_error = excluded.last_error,
+        updated_at = excluded.updated_at
+"""
 
-@dataclass
-class Progress:
-    """Track population progress for resumability"""
-    total_foods_target: int
-    completed_food_ids: List[int]
-    failed_food_ids: List[int]
-    last_api_call: Optional[str]  # ISO timestamp
-    status: str  # in_progress, completed, failed
-    nutrients_populated: int
-    start_time: str
-    end_time: Optional[str] = None
-
-    def save(self, filepath: str = PROGRESS_FILE):
-        """Save progress to JSON file"""
-        with open(filepath, 'w') as f:
-            json.dump(asdict(self), f, indent=2)
-
-    @classmethod
-    def load(cls, filepath: str = PROGRESS_FILE) -> Optional['Progress']:
-        """Load progress from JSON file"""
-        try:
-            with open(filepath, 'r') as f:
-                data = json.load(f)
-                return cls(**data)
-        except FileNotFoundError:
-            return None
 
-    def can_make_api_call(self) -> bool:
-        """Check if we can make another API call (rate limiting)"""
-        # Simple approach: allow calls after 1 hour from last call
-        # This is conservative but safe for the 1000/hour limit
-        if not self.last_api_call:
-            return True
+def create_ingest_state_table(conn: sqlite3.Connection):
+    """Create the per-food resume journal"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ingest_state (
+            fdc_id INTEGER PRIMARY KEY,
+            status TEXT NOT NULL,  -- completed, failed
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            updated_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ingest_state_status ON ingest_state(status)")
+    conn.commit()
 
-        last_call = datetime.fromisoformat(self.last_api_call)
-        elapsed = datetime.now() - last_call
 
-        # Wait 0.1 seconds between calls (max 36000/hour, well under 1000 limit)
-        # This prevents hitting rate limits during bursts
-        return elapsed.total_seconds() >= 0.1
+def load_ids_with_status(conn: sqlite3.Connection, status: str) -> Set[int]:
+    """fdc_ids whose latest attempt ended with the given status"""
+    rows = conn.execute("SELECT fdc_id FROM ingest_state WHERE status = ?", (status,))
+    return {fdc_id for (fdc_id,) in rows}
 
-    def wait_for_rate_limit(self):
-        """Wait until we can make another API call"""
-        if self.can_make_api_call():
-            return
 
-        # Wait 0.1 seconds to respect rate limits
-        time.sleep(0.1)
+def load_completed_ids(conn: sqlite3.Connection) -> Set[int]:
+    """fdc_ids whose data is already committed to the database"""
+    return load_ids_with_status(conn, "completed")
+
+
+def load_failed_ids(conn: sqlite3.Connection) -> Set[int]:
+    """fdc_ids whose latest attempt failed"""
+    return load_ids_with_status(conn, "failed")
+
+
+def summarize_ingest_state(conn: sqlite3.Connection) -> Dict[str, int]:
+    """Count of foods per ingest status"""
+    rows = conn.execute("SELECT status, COUNT(*) FROM ingest_state GROUP BY status")
+    return dict(rows.fetchall())
+
+
+# ==============================================================================
+# Rate Limiting
+# ==============================================================================
+
+class RateLimiter:
+    """
+    Thread-safe token bucket shared by every API call (pagination and details)
+
+    Tokens refill at max_calls per period, up to burst. Responses feed back
+    into the bucket: X-RateLimit-Remaining caps the available tokens, so we
+    never plan on more calls than the server will still accept, and a
+    Retry-After (429/503) blocks every worker until it has passed.
+
+    Keeping burst small keeps any rolling hour within max_calls + burst,
+    under USDA's 1000/hour even before the server headers kick in.
+    """
+
+    def __init__(
+        self,
+        max_calls: int = RATE_LIMIT_PER_HOUR,
+        period: float = 3600.0,
+        burst: int = RATE_LIMIT_BURST
+    ):
+        self.max_calls = max_calls
+        self.period = period
+        self.burst = max(1, min(burst, max_calls))
+        self.rate = max_calls / period  # tokens per second
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+        # Throttle metrics
+        self.calls = 0
+        self.throttled_calls = 0
+        self.throttle_seconds = 0.0
+        self.rate_limited_responses = 0
+        self.server_remaining: Optional[int] = None
+        self.min_server_remaining: Optional[int] = None
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Block until a token is available (and no Retry-After is pending), then take it"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+
+                if now >= self._blocked_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    self.calls += 1
+                    if waited:
+                        self.throttled_calls += 1
+                        self.throttle_seconds += waited
+                    return
+
+                wait_seconds = max(self._blocked_until - now, (1 - self._tokens) / self.rate)
+
+            time.sleep(wait_seconds)
+            waited += wait_seconds
+
+    def observe(self, response) -> Optional[float]:
+        """
+        Adapt to the server's view of our quota
+
+        Returns the Retry-After delay in seconds when the response carried
+        one (or was a 429 without it), so the caller knows to retry.
+        """
+        remaining = _parse_int(response.headers.get("X-RateLimit-Remaining"))
+        retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+        if response.status_code == 429 and retry_after is None:
+            # No hint from the server - wait long enough to earn a few tokens back
+            retry_after = min(self.period, 5 / self.rate)
+
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            if remaining is not None:
+                self.server_remaining = remaining
+                if self.min_server_remaining is None or remaining < self.min_server_remaining:
+                    self.min_server_remaining = remaining
+                self._tokens = min(self._tokens, float(remaining))
+
+            if response.status_code == 429:
+                self.rate_limited_responses += 1
+                self._tokens = 0.0
+
+            if retry_after is not None:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+
+        return retry_after
+
+    def stats(self) -> Dict[str, object]:
+        """Throttle metrics for the run summary"""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "throttled_calls": self.throttled_calls,
+                "throttle_seconds": round(self.throttle_seconds, 1),
+                "rate_limited_responses": self.rate_limited_responses,
+                "server_remaining": self.server_remaining,
+                "min_server_remaining": self.min_server_remaining,
+            }
+
+
+def _parse_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After is either delay-seconds or an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
 
 
 # ==============================================================================
 # Database Operations
 # ==============================================================================
 
-def create_database_schema(conn: sqlite3.Connection):
-    """Create SQLite schema with FTS5 search"""
+def create_database_schema(conn: sqlite3.Connection, trigram: bool = False):
+    """Create SQLite schema with FTS5 search (trigram adds a substring index)"""
     cursor = conn.cursor()
 
+    # page_size only takes effect before the first table is created, and
+    # never once the file is in WAL mode - so it has to come first.
+    # Existing files keep their page size; finalize_usda_db.py sets it for the bundle.
+    cursor.execute(f"PRAGMA page_size={DB_PAGE_SIZE}")
+
     # Enable WAL mode for better write performance
     cursor.execute("PRAGMA journal_mode=WAL")
-    cursor.execute(f"PRAGMA page_size={DB_PAGE_SIZE}")
     cursor.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE}")
 
     # Foods table
@@ -478,36 +635,39 @@ def create_database_schema(conn: sqlite3.Connection):
         )
     """)
 
-    # FTS5 search table
-    cursor.execute("""
-        CREATE VIRTUAL TABLE IF NOT EXISTS food_search
-        USING fts5(
-            description,
-            common_name,
-            search_terms,
-            content='usda_foods',
-            tokenize='porter'
-        )
-    """)
-
     # Indices
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_food_category ON usda_foods(category)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_nutrient_category ON nutrients(category)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_food_nutrients_fdc ON food_nutrients(fdc_id)")
 
     conn.commit()
+
+    # Household measures ("1 cup, chopped" = 91 g) with precomputed macros
+    create_food_portions_table(conn)
+
+    # FTS5 search table (+ triggers keeping it in sync with usda_foods)
+    create_search_index(conn, trigram=trigram)
     print("✅ Database schema created")
 
 
-def populate_nutrients(conn: sqlite3.Connection):
-    """Populate nutrients table with all 52 nutrients"""
+def populate_nutrients(conn: sqlite3.Connection, refresh: bool = False):
+    """
+    Populate nutrients table with all 52 nutrients
+
+    refresh rewrites an already populated table from NUTRIENTS, dropping
+    nutrients no longer defined (for when the definitions change).
+    """
     cursor = conn.cursor()
 
-    # Check if already populated
-    cursor.execute("SELECT COUNT(*) FROM nutrients")
-    if cursor.fetchone()[0] >= len(NUTRIENTS):
-        print(f"ℹ️  Nutrients already populated ({len(NUTRIENTS)} nutrients)")
-        return
+    if refresh:
+        placeholders = ",".join("?" * len(NUTRIENT_IDS))
+        cursor.execute(f"DELETE FROM nutrients WHERE nutrient_id NOT IN ({placeholders})", sorted(NUTRIENT_IDS))
+    else:
+        # Check if already populated
+        cursor.execute("SELECT COUNT(*) FROM nutrients")
+        if cursor.fetchone()[0] >= len(NUTRIENTS):
+            print(f"ℹ️  Nutrients already populated ({len(NUTRIENTS)} nutrients)")
+            return
 
     # Insert all nutrients
     for nutrient in NUTRIENTS:
@@ -528,34 +688,677 @@ def populate_nutrients(conn: sqlite3.Connection):
     print(f"✅ Populated {len(NUTRIENTS)} nutrients")
 
 
+def extract_nutrient_values(food_detail: Dict) -> Dict[int, float]:
+    """Pull tracked nutrient amounts (per 100 g) out of a food detail payload"""
+    nutrient_values = {}
+    for nutrient in food_detail.get("foodNutrients", []):
+        nutrient_id = nutrient.get("nutrient", {}).get("id")
+        amount = nutrient.get("amount")
+
+        if nutrient_id in NUTRIENT_IDS and amount is not None:
+            nutrient_values[nutrient_id] = amount
+
+    return nutrient_values
+
+
+# Macros precomputed per portion: (column, nutrient_id)
+PORTION_MACROS = [
+    ("energy_kcal", 1008),
+    ("protein_g", 1003),
+    ("carbohydrate_g", 1005),
+    ("fat_g", 1004),
+]
+
+FOOD_PORTIONS_INSERT = """
+    INSERT OR REPLACE INTO food_portions
+    (portion_id, fdc_id, sequence, amount, unit, modifier, description, gram_weight,
+     energy_kcal, protein_g, carbohydrate_g, fat_g)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def create_food_portions_table(conn: sqlite3.Connection):
+    """
+    food_portions plus a view with every tracked nutrient per portion
+
+    Macros are stored per portion for the common "1 cup rice" lookup; the
+    food_portion_nutrients view scales the rest from food_nutrients on demand.
+    """
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS food_portions (
+            portion_id INTEGER PRIMARY KEY,
+            fdc_id INTEGER NOT NULL,
+            sequence INTEGER,
+            amount REAL NOT NULL,
+            unit TEXT,
+            modifier TEXT,
+            description TEXT NOT NULL,
+            gram_weight REAL NOT NULL,
+            energy_kcal REAL,
+            protein_g REAL,
+            carbohydrate_g REAL,
+            fat_g REAL,
+            FOREIGN KEY (fdc_id) REFERENCES usda_foods(fdc_id)
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_food_portions_fdc ON food_portions(fdc_id, sequence);
+
+        CREATE VIEW IF NOT EXISTS food_portion_nutrients AS
+            SELECT p.portion_id, p.fdc_id, fn.nutrient_id,
+                   fn.amount * p.gram_weight / 100.0 AS amount
+            FROM food_portions p
+            JOIN food_nutrients fn ON fn.fdc_id = p.fdc_id;
+    """)
+    conn.commit()
+
+
+def portion_label(amount: float, unit: Optional[str], modifier: Optional[str]) -> str:
+    """Readable measure, e.g. "1 cup, chopped" or "2 tbsp" """
+    return " ".join(part for part in (f"{amount:g}", unit, modifier) if part)
+
+
+def extract_portions(fdc_id: int, food_detail: Dict, nutrient_values: Dict[int, float]) -> List[tuple]:
+    """
+    Household measures from foodPortions as food_portions rows
+
+    SR Legacy portions carry their unit in the modifier ("cup, chopped")
+    with measureUnit "undetermined"; Foundation foods use a real unit and
+    often a portionDescription.
+    """
+    rows = []
+    for portion in food_detail.get("foodPortions", []):
+        grams = portion.get("gramWeight")
+        if not grams:
+            continue
+
+        amount = portion.get("amount") or portion.get("value") or 1.0
+        unit = (portion.get("measureUnit") or {}).get("name")
+        if unit == "undetermined":
+            unit = None
+        modifier = portion.get("modifier") or None
+        description = portion.get("portionDescription") or portion_label(amount, unit, modifier)
+
+        scale = grams / 100.0
+        macros = [
+            round(nutrient_values[nutrient_id] * scale, 3) if nutrient_id in nutrient_values else None
+            for _, nutrient_id in PORTION_MACROS
+        ]
+        rows.append((
+            portion.get("id"), fdc_id, portion.get("sequenceNumber"), amount,
+            unit, modifier, description, grams, *macros
+        ))
+    return rows
+
+
+def create_food_versions_table(conn: sqlite3.Connection):
+    """Upstream publication date and content hash per food, for delta rebuilds"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS food_versions (
+            fdc_id INTEGER PRIMARY KEY,
+            publication_date TEXT,
+            content_hash TEXT NOT NULL
+        )
+    """)
+    conn.commit()
+
+
+def food_content_hash(
+    description: str,
+    category: Optional[str],
+    nutrient_values: Dict[int, float],
+    portions: Optional[List[tuple]] = None
+) -> str:
+    """Hash of exactly what we store for a food, so mapping changes count too"""
+    content = [description, category, sorted(nutrient_values.items())]
+    if portions:
+        # Only when present, so hashes of portion-less foods stay stable
+        content.append([portion[2:8] for portion in portions])
+    content = json.dumps(content, separators=(",", ":"))
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def normalize_publication_date(value: Optional[str]) -> Optional[str]:
+    """ISO date from detail ("4/1/2019") or search ("2019-04-01") formats"""
+    if not value:
+        return None
+    for fmt in ("%m/%d/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return value
+
+
+class FoodWriter:
+    """
+    Buffers parsed foods and writes them in grouped transactions
+
+    Each flush inserts up to foods_per_transaction foods with executemany and
+    records them in ingest_state inside the same transaction, so a crash never
+    leaves a food half-written or written-but-not-marked. Fetch failures are
+    journaled through the same path.
+
+    Automatic WAL checkpoints are disabled while loading; the WAL is
+    checkpointed every checkpoint_every transactions and truncated on close.
+
+    Foods are upserted rather than INSERT OR REPLACEd: REPLACE deletes the
+    old row without firing delete triggers, which would leave stale entries
+    in the external-content food_search index.
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        foods_per_transaction: int = WRITE_BATCH_FOODS,
+        checkpoint_every: int = WAL_CHECKPOINT_EVERY
+    ):
+        self.conn = conn
+        self.foods_per_transaction = max(1, foods_per_transaction)
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.written = 0
+        self._foods: List[tuple] = []
+        self._nutrients: List[tuple] = []
+        self._portions: List[tuple] = []
+        self._versions: List[tuple] = []
+        self._markers: List[tuple] = []  # (fdc_id, status, error)
+        self._transactions = 0
+
+        create_ingest_state_table(conn)
+        create_food_versions_table(conn)
+        conn.execute("PRAGMA wal_autocheckpoint=0")
+
+    def add(
+        self,
+        fdc_id: int,
+        description: str,
+        common_name: Optional[str],
+        category: Optional[str],
+        nutrient_values: Dict[int, float],
+        publication_date: Optional[str] = None,
+        portions: Optional[List[tuple]] = None
+    ):
+        """Queue one food (and its extract_portions rows), flushing when the transaction is full"""
+        self._foods.append((
+            fdc_id, description, common_name, category,
+            generate_search_terms(description, category)
+        ))
+        self._nutrients.extend(
+            (fdc_id, nutrient_id, amount) for nutrient_id, amount in nutrient_values.items()
+        )
+        self._portions.extend(portions or [])
+        self._versions.append((
+            fdc_id,
+            normalize_publication_date(publication_date),
+            food_content_hash(description, category, nutrient_values, portions)
+        ))
+        self._queue_marker(fdc_id, "completed", None)
+
+    def fail(self, fdc_id: int, error: str):
+        """Queue a failure marker so --retry-failed can pick the food up later"""
+        self._queue_marker(fdc_id, "failed", error)
+
+    def _queue_marker(self, fdc_id: int, status: str, error: Optional[str]):
+        self._markers.append((fdc_id, status, error))
+        if len(self._markers) >= self.foods_per_transaction:
+            self.flush()
+
+    def flush(self):
+        """Write all queued foods and their journal entries in one transaction"""
+        if not self._markers:
+            return
+
+        now = datetime.now().isoformat()
+        markers = [(fdc_id, status, error, now) for fdc_id, status, error in self._markers]
+        food_ids = [(food[0],) for food in self._foods]
+
+        try:
+            with self.conn:
+                self.conn.executemany(USDA_FOODS_UPSERT, self._foods)
+                # Replace the whole nutrient set so dropped nutrients disappear
+                self.conn.executemany("DELETE FROM food_nutrients WHERE fdc_id = ?", food_ids)
+                self.conn.executemany("""
+                    INSERT INTO food_nutrients
+                    (fdc_id, nutrient_id, amount)
+                    VALUES (?, ?, ?)
+                """, self._nutrients)
+                self.conn.executemany("DELETE FROM food_portions WHERE fdc_id = ?", food_ids)
+                self.conn.executemany(FOOD_PORTIONS_INSERT, self._portions)
+                self.conn.executemany("""
+                    INSERT OR REPLACE INTO food_versions (fdc_id, publication_date, content_hash)
+                    VALUES (?, ?, ?)
+                """, self._versions)
+                self.conn.executemany(INGEST_STATE_UPSERT, markers)
+            self.written += len(self._foods)
+        except sqlite3.Error as e:
+            # The data was rolled back - journal every food in the group as failed
+            print(f"❌ DB error writing {len(self._foods)} foods: {e}")
+            with self.conn:
+                self.conn.executemany(INGEST_STATE_UPSERT, [
+                    (fdc_id, "failed", f"DB error: {e}", now) for fdc_id, _, _, _ in markers
+                ])
+
+        self._foods.clear()
+        self._nutrients.clear()
+        self._portions.clear()
+        self._versions.clear()
+        self._markers.clear()
+        self._transactions += 1
+
+        if self._transactions % self.checkpoint_every == 0:
+            self.conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def close(self):
+        """Flush remaining foods, fold the WAL back into the database"""
+        self.flush()
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.conn.execute("PRAGMA wal_autocheckpoint=1000")
+
+
+# ==============================================================================
+# Search Index
+# ==============================================================================
+
+# Inserts or updates a food in place, so the usda_foods triggers keep
+# food_search consistent (INSERT OR REPLACE would skip the delete trigger)
+USDA_FOODS_UPSERT = """
+    INSERT INTO usda_foods (fdc_id, description, common_name, category, search_terms)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(fdc_id) DO UPDATE SET
+        description = excluded.description,
+        common_name = excluded.common_name,
+        category = excluded.category,
+        search_terms = excluded.search_terms
+"""
+
+# bm25 column weights: description, common_name, search_terms, brand_name
+SEARCH_BM25_WEIGHTS = (10.0, 5.0, 2.0, 3.0)
+
+# Extra terms for foods whose USDA description contains the key, so everyday
+# ingredient names (as the AI and users write them) hit the SR Legacy wording
+SEARCH_SYNONYMS = {
+    "broilers or fryers": "chicken",
+    "garbanzo": "chickpea chickpeas",
+    "chickpeas": "garbanzo",
+    "scallions": "green onion spring onion",
+    "peppers, sweet": "bell pepper capsicum",
+    "zucchini": "courgette",
+    "eggplant": "aubergine",
+    "coriander (cilantro)": "cilantro coriander",
+    "shrimp": "prawn prawns",
+    "catsup": "ketchup",
+    "frankfurter": "hot dog hotdog",
+    "yogurt": "yoghurt",
+    "ground": "minced mince",
+    "spaghetti": "pasta",
+    "macaroni": "pasta",
+    "noodles": "pasta",
+    "rutabagas": "swede",
+    "beverages": "drink drinks",
+    "alcoholic beverage": "alcohol",
+    "cheese, cottage": "cottage cheese",
+    "cheese, cream": "cream cheese",
+    "oil, olive": "olive oil",
+    "sauce, pasta": "marinara tomato sauce",
+    "bread, wheat": "wheat bread",
+    "milk, reduced fat": "2% milk low fat milk",
+    "milk, lowfat": "1% milk low fat milk",
+    "milk, nonfat": "skim milk",
+    "beans, snap": "green beans string beans",
+    "beans, kidney": "kidney beans",
+    "beans, black": "black beans",
+    "cereals ready-to-eat": "cereal breakfast cereal",
+    "fast foods": "fast food takeaway",
+    "egg, whole": "eggs",
+    "egg, white": "egg whites",
+}
+
+# Trigram tokenizer needs SQLite 3.34+
+TRIGRAM_MIN_SQLITE = (3, 34, 0)
+
+FOOD_SEARCH_SQL = """
+    CREATE VIRTUAL TABLE food_search
+    USING fts5(
+        description,
+        common_name,
+        search_terms,
+        brand_name,
+        content='usda_foods',
+        content_rowid='fdc_id',
+        tokenize='porter unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+"""
+
+FOOD_SEARCH_TRIGRAM_SQL = """
+    CREATE VIRTUAL TABLE food_search_trigram
+    USING fts5(
+        description,
+        common_name,
+        content='usda_foods',
+        content_rowid='fdc_id',
+        tokenize='trigram'
+    )
+"""
+
+# External-content FTS5 indexes must be told the old values to remove them
+SEARCH_TRIGGERS = {
+    "food_search": (
+        "description, common_name, search_terms, brand_name",
+        "{row}.description, {row}.common_name, {row}.search_terms, {row}.brand_name"
+    ),
+    "food_search_trigram": ("description, common_name", "{row}.description, {row}.common_name"),
+}
+
+
+def generate_search_terms(description: Optional[str], category: Optional[str]) -> str:
+    """
+    Searchable terms beyond the description itself
+
+    Category words and SEARCH_SYNONYMS expansions, de-duplicated, so
+    "Chickpeas (garbanzo beans...)" also matches "chickpea", and "Squash,
+    summer, zucchini" matches "courgette".
+    """
+    text = (description or "").lower()
+    terms: List[str] = []
+    for phrase, extra in SEARCH_SYNONYMS.items():
+        if phrase in text:
+            terms.extend(extra.split())
+    if category:
+        terms.extend(category.lower().replace(",", " ").replace("&", " ").split())
+
+    seen = set()
+    return " ".join(t for t in terms if not (t in seen or seen.add(t)))
+
+
+def _search_tables(conn: sqlite3.Connection) -> Dict[str, str]:
+    """Existing FTS tables -> their CREATE statement"""
+    rows = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name IN (?, ?)",
+        tuple(SEARCH_TRIGGERS)
+    )
+    return {name: sql for name, sql in rows}
+
+
+def _create_search_triggers(conn: sqlite3.Connection, table: str):
+    columns, values = SEARCH_TRIGGERS[table]
+    old, new = values.format(row="old"), values.format(row="new")
+    conn.executescript(f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON usda_foods BEGIN
+            INSERT INTO {table} (rowid, {columns}) VALUES (new.fdc_id, {new});
+        END;
+        CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON usda_foods BEGIN
+            INSERT INTO {table} ({table}, rowid, {columns}) VALUES ('delete', old.fdc_id, {old});
+        END;
+        CREATE TRIGGER IF NOT EXISTS {table}_au AFTER UPDATE ON usda_foods BEGIN
+            INSERT INTO {table} ({table}, rowid, {columns}) VALUES ('delete', old.fdc_id, {old});
+            INSERT INTO {table} (rowid, {columns}) VALUES (new.fdc_id, {new});
+        END;
+    """)
+
+
+def _drop_search_table(conn: sqlite3.Connection, table: str):
+    for suffix in ("ai", "ad", "au"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {table}_{suffix}")
+    conn.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+def create_search_index(conn: sqlite3.Connection, trigram: bool = False):
+    """
+    Create food_search (and optionally food_search_trigram) with sync triggers
+
+    Older databases have a food_search without prefix indexes, an explicit
+    content_rowid or the brand_name column; it is dropped, recreated and
+    rebuilt from usda_foods.
+    """
+    existing = _search_tables(conn)
+    wanted = {"food_search": FOOD_SEARCH_SQL}
+    if trigram:
+        if sqlite3.sqlite_version_info < TRIGRAM_MIN_SQLITE:
+            print(f"⚠️  SQLite {sqlite3.sqlite_version} has no trigram tokenizer - skipping trigram index")
+        else:
+            wanted["food_search_trigram"] = FOOD_SEARCH_TRIGRAM_SQL
+
+    for table, create_sql in wanted.items():
+        current = existing.get(table)
+        outdated = table == "food_search" and current is not None and (
+            "prefix=" not in current or "brand_name" not in current
+        )
+        if current is None or outdated:
+            _drop_search_table(conn, table)
+            conn.execute(create_sql)
+            conn.execute(f"INSERT INTO {table}({table}) VALUES('rebuild')")
+        _create_search_triggers(conn, table)
+
+    conn.commit()
+
+
+def backfill_search_terms(conn: sqlite3.Connection) -> int:
+    """Generate search_terms for foods written before they were populated"""
+    rows = conn.execute("""
+        SELECT fdc_id, description, category FROM usda_foods
+        WHERE search_terms IS NULL OR search_terms = ''
+    """).fetchall()
+    updates = [
+        (terms, fdc_id)
+        for fdc_id, description, category in rows
+        if (terms := generate_search_terms(description, category))
+    ]
+    with conn:
+        conn.executemany("UPDATE usda_foods SET search_terms = ? WHERE fdc_id = ?", updates)
+    return len(updates)
+
+
+def rebuild_search_index(conn: sqlite3.Connection):
+    """Rebuild every FTS table from usda_foods in one pass, then merge its segments"""
+    backfill_search_terms(conn)
+    for table in _search_tables(conn):
+        conn.execute(f"INSERT INTO {table}({table}) VALUES('rebuild')")
+        conn.execute(f"INSERT INTO {table}({table}) VALUES('optimize')")
+    conn.commit()
+
+
+# ==============================================================================
+# Response Cache
+# ==============================================================================
+
+class OfflineCacheMiss(LookupError):
+    """Raised in offline mode when a response is not in the cache"""
+
+
+@dataclass
+class CacheEntry:
+    """A cached API response plus the validators needed to revalidate it"""
+    payload: object
+    fetched_at: float
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fresh: bool
+
+
+class ResponseCache:
+    """
+    Content-addressed, gzip-compressed on-disk store of API JSON responses
+
+    Layout:
+        cache_dir/index.db                   key -> digest, fetched_at, validators
+        cache_dir/objects/ab/abcdef....json.gz   payloads, named by SHA-256
+
+    Keys are endpoint-shaped ("food/171287", "search/sr_legacy/200/3"), so a
+    cache directory doubles as a recorded fixture set for tests. Entries older
+    than ttl_seconds are stale: the client revalidates them with
+    If-None-Match / If-Modified-Since, or uses them as-is when offline.
+    Thread-safe; the index is shared by all fetch workers.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, ttl_seconds: Optional[float] = CACHE_TTL_DAYS * 86400):
+        self.root = Path(cache_dir)
+        self.objects = self.root / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index = sqlite3.connect(str(self.root / "index.db"), check_same_thread=False)
+        self._index.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                etag TEXT,
+                last_modified TEXT
+            )
+        """)
+        self._index.commit()
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / f"{digest}.json.gz"
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Look up a response; returns None if never cached or the blob is gone"""
+        with self._lock:
+            row = self._index.execute(
+                "SELECT digest, fetched_at, etag, last_modified FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        digest, fetched_at, etag, last_modified = row
+        try:
+            with gzip.open(self._object_path(digest), "rt", encoding="utf-8") as f:
+                payload = json.load(f)
+        except (FileNotFoundError, OSError, ValueError):
+            self.misses += 1
+            return None
+
+        fresh = self.ttl_seconds is None or time.time() - fetched_at < self.ttl_seconds
+        if fresh:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return CacheEntry(payload, fetched_at, etag, last_modified, fresh)
+
+    def put(self, key: str, payload: object, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Store a response; identical payloads share one blob"""
+        data = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+            with gzip.open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        with self._lock, self._index:
+            self._index.execute(
+                "INSERT OR REPLACE INTO entries (key, digest, fetched_at, etag, last_modified) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, digest, time.time(), etag, last_modified)
+            )
+
+    def touch(self, key: str):
+        """Mark an entry fresh again after a 304 Not Modified"""
+        with self._lock, self._index:
+            self._index.execute("UPDATE entries SET fetched_at = ? WHERE key = ?", (time.time(), key))
+
+
 # ==============================================================================
 # USDA API Client
 # ==============================================================================
 
 class USDAClient:
-    """Client for USDA FoodData Central API with retry logic"""
+    """Client for USDA FoodData Central API with retry logic
+
+    Safe to share across worker threads: every request goes through the
+    shared rate limiter, and the connection pool is sized for max_workers.
+    429s are retried here rather than in urllib3, so the wait is coordinated
+    across all workers instead of each one backing off on its own.
 
-    def __init__(self, api_key: str):
+    With a ResponseCache, fresh cached responses are served without touching
+    the network or the rate limiter. In offline mode only the cache is used.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        api_base: str = USDA_API_BASE,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_workers: int = MAX_WORKERS,
+        cache: Optional[ResponseCache] = None,
+        offline: bool = False
+    ):
         self.api_key = api_key
-        self.session = self._create_session()
+        self.api_base = api_base.rstrip("/")
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.session = self._create_session(pool_size=max_workers)
+        self.cache = cache
+        self.offline = offline
 
-    def _create_session(self) -> requests.Session:
+    def _create_session(self, pool_size: int) -> requests.Session:
         """Create requests session with retry logic"""
         session = requests.Session()
         retry = Retry(
             total=3,
             backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["GET", "POST"]
+            status_forcelist=[500, 502, 503, 504],
+            allowed_methods=["GET", "POST"],
+            respect_retry_after_header=False  # The rate limiter handles Retry-After
         )
-        adapter = HTTPAdapter(max_retries=retry)
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
         session.mount("http://", adapter)
         session.mount("https://", adapter)
         return session
 
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send one rate-limited request, waiting out and retrying 429s"""
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            self.rate_limiter.acquire()
+            response = self.session.request(method, url, **kwargs)
+            self.rate_limiter.observe(response)
+
+            if response.status_code != 429 or attempt == RATE_LIMIT_RETRIES:
+                return response
+            print(f"⏳ Rate limited (429), retrying {url.rsplit('/', 1)[-1]}...")
+
+        return response
+
+    def _get_json(self, cache_key: str, url: str, params: Dict) -> object:
+        """GET a JSON endpoint through the cache, revalidating stale entries"""
+        entry = self.cache.get(cache_key) if self.cache else None
+        if entry and (entry.fresh or self.offline):
+            return entry.payload
+        if self.offline:
+            raise OfflineCacheMiss(f"{cache_key} is not cached (offline mode)")
+
+        headers = {}
+        if entry and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+        response = self._request("GET", url, params=params, headers=headers, timeout=30)
+
+        if entry and response.status_code == 304:
+            self.cache.touch(cache_key)
+            return entry.payload
+
+        response.raise_for_status()
+        payload = response.json()
+        if self.cache:
+            self.cache.put(
+                cache_key,
+                payload,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified")
+            )
+        return payload
+
     def search_foods(self, page_number: int = 1, page_size: int = 200) -> tuple[List[Dict], int]:
         """Get SR Legacy foods with pagination"""
-        url = f"{USDA_API_BASE}/foods/search"
+        url = f"{self.api_base}/foods/search"
         params = {
             "api_key": self.api_key,
             "query": "",  # Empty query gets all foods
@@ -565,92 +1368,245 @@ class USDAClient:
         }
 
         try:
-            response = self.session.get(url, params=params, timeout=30)
-            response.raise_for_status()
-            data = response.json()
+            data = self._get_json(f"search/sr_legacy/{page_size}/{page_number}", url, params)
             return data.get("foods", []), data.get("totalHits", 0)
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, OfflineCacheMiss) as e:
             print(f"❌ API error fetching page {page_number}: {e}")
             return [], 0
 
     def get_food_details(self, fdc_id: int) -> Optional[Dict]:
         """Get detailed food information including all nutrients"""
-        url = f"{USDA_API_BASE}/food/{fdc_id}"
+        url = f"{self.api_base}/food/{fdc_id}"
         params = {"api_key": self.api_key}
 
         try:
-            response = self.session.get(url, params=params, timeout=30)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return self._get_json(f"food/{fdc_id}", url, params)
+        except (requests.exceptions.RequestException, OfflineCacheMiss) as e:
             print(f"❌ API error fetching food {fdc_id}: {e}")
             return None
 
+    def get_foods_details(self, fdc_ids: List[int]) -> Dict[int, Dict]:
+        """
+        Get details for up to BATCH_SIZE foods in a single POST /foods request
+
+        Returns a mapping of fdc_id -> detail for the foods the API returned.
+        Ids missing from the response (or all of them, if the request fails)
+        are simply absent, so callers can fall back to get_food_details.
+
+        Fresh cached foods are served from disk; only the rest are requested,
+        and each returned food is cached under the same key as a single fetch.
+        """
+        found: Dict[int, Dict] = {}
+        if self.cache:
+            for fdc_id in fdc_ids:
+                entry = self.cache.get(f"food/{fdc_id}")
+                if entry and (entry.fresh or self.offline):
+                    found[fdc_id] = entry.payload
+
+        missing = [fdc_id for fdc_id in fdc_ids if fdc_id not in found]
+        if not missing or self.offline:
+            return found
+
+        url = f"{self.api_base}/foods"
+        params = {"api_key": self.api_key}
+        payload = {"fdcIds": missing, "format": "full"}
 
-# ==============================================================================
-# Main Population Logic
-# ==============================================================================
+        try:
+            response = self._request("POST", url, params=params, json=payload, timeout=60)
+            response.raise_for_status()
+            foods = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"❌ API error fetching batch of {len(missing)} foods: {e}")
+            return found
 
-def populate_database(
-    api_key: str,
-    output_path: str,
-    target_foods: int = 5000,
-    resume: bool = False
-):
+        for food in foods:
+            fdc_id = food.get("fdcId")
+            if not fdc_id:
+                continue
+            found[fdc_id] = food
+            if self.cache:
+                self.cache.put(f"food/{fdc_id}", food)
+
+        return found
+
+
+def _batched(items: Iterable[int], size: int) -> Iterator[List[int]]:
+    """Split an iterable into lists of at most size items"""
+    it = iter(items)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+def _fetch_batch(client: USDAClient, batch: List[int]) -> List[Tuple[int, Optional[Dict]]]:
+    """Fetch one batch of details, falling back to per-food requests for gaps"""
+    if len(batch) == 1:
+        return [(batch[0], client.get_food_details(batch[0]))]
+
+    found = client.get_foods_details(batch)
+    return [
+        (fdc_id, found[fdc_id] if fdc_id in found else client.get_food_details(fdc_id))
+        for fdc_id in batch
+    ]
+
+
+def fetch_food_details(
+    client: USDAClient,
+    fdc_ids: Iterable[int],
+    max_workers: int = MAX_WORKERS,
+    batch_size: int = BATCH_SIZE
+) -> Iterator[Tuple[int, Optional[Dict]]]:
     """
-    Main function to populate USDA database
+    Fetch food details concurrently, yielding (fdc_id, detail) as each completes
 
-    Args:
-        api_key: USDA FoodData Central API key
-        output_path: Path to output SQLite database
-        target_foods: Target number of foods to populate
-        resume: Resume from previous run if interrupted
+    Foods are requested batch_size at a time through the multi-food endpoint
+    (batch_size=1 uses GET /food/{fdc_id} only). Any food missing from a
+    batch response is retried individually before it is reported as failed.
+
+    At most 2 * max_workers batches are queued at once, so memory stays flat
+    regardless of how many ids are passed in. Throughput is capped by the
+    client's rate limiter, not by the worker count. Results arrive in
+    completion order, and detail is None for foods that failed.
     """
+    batches = _batched(fdc_ids, max(1, batch_size))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {
+            pool.submit(_fetch_batch, client, batch)
+            for batch in islice(batches, max_workers * 2)
+        }
 
-    # Load or create progress
-    progress = None
-    if resume:
-        progress = Progress.load()
-        if progress:
-            print(f"📂 Resuming from previous run ({len(progress.completed_food_ids)} foods completed)")
-
-    if not progress:
-        progress = Progress(
-            total_foods_target=target_foods,
-            completed_food_ids=[],
-            failed_food_ids=[],
-            last_api_call=None,
-            status="in_progress",
-            nutrients_populated=len(NUTRIENTS),
-            start_time=datetime.now().isoformat()
-        )
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                # Keep the queue topped up before handing results back
+                for batch in islice(batches, 1):
+                    pending.add(pool.submit(_fetch_batch, client, batch))
 
-    # Initialize database
-    conn = sqlite3.Connection(output_path)
-    create_database_schema(conn)
-    populate_nutrients(conn)
+                yield from future.result()
 
-    # Initialize API client
-    client = USDAClient(api_key)
 
-    print(f"🔍 Fetching SR Legacy foods from USDA database...")
-    print(f"📊 Target: ALL SR Legacy foods (~7,793), {len(NUTRIENTS)} nutrients each")
-    print()
+# ==============================================================================
+# Delta Updates
+# ==============================================================================
 
-    # Collect unique foods via pagination
-    collected_foods: Dict[int, Dict] = {}  # fdc_id -> food_data
-    cursor = conn.cursor()
+@dataclass
+class DeltaReport:
+    """What a delta rebuild changed, for the console and --diff-report"""
+    added: List[Dict] = field(default_factory=list)
+    changed: List[Dict] = field(default_factory=list)
+    removed: List[Dict] = field(default_factory=list)
+    unchanged: int = 0
+
+    def record(
+        self,
+        conn: sqlite3.Connection,
+        stored_versions: Dict[int, Tuple[Optional[str], str]],
+        fdc_id: int,
+        description: str,
+        category: Optional[str],
+        nutrient_values: Dict[int, float],
+        portions: Optional[List[tuple]] = None
+    ) -> str:
+        """Classify a freshly fetched food against what is stored"""
+        stored = stored_versions.get(fdc_id)
+        if stored is None:
+            self.added.append({"fdc_id": fdc_id, "description": description})
+            return "added"
+
+        if stored[1] == food_content_hash(description, category, nutrient_values, portions):
+            self.unchanged += 1
+            return "unchanged"
+
+        old_values = dict(conn.execute(
+            "SELECT nutrient_id, amount FROM food_nutrients WHERE fdc_id = ?", (fdc_id,)
+        ).fetchall())
+        self.changed.append({
+            "fdc_id": fdc_id,
+            "description": description,
+            "nutrients": diff_nutrients(old_values, nutrient_values)
+        })
+        return "changed"
+
+    def print_summary(self, limit: int = 20):
+        print()
+        print("=" * 70)
+        print("📋 DELTA REPORT")
+        print("=" * 70)
+        print(f"Added:               {len(self.added)}")
+        print(f"Changed:             {len(self.changed)}")
+        print(f"Removed:             {len(self.removed)}")
+        print(f"Unchanged:           {self.unchanged}")
+
+        for food in self.added[:limit]:
+            print(f"  + [{food['fdc_id']}] {food['description']}")
+        for food in self.changed[:limit]:
+            print(f"  ~ [{food['fdc_id']}] {food['description']}")
+            for change in food["nutrients"]:
+                print(f"      {change['name']}: {change['old']} → {change['new']} {change['unit']}")
+        for food in self.removed[:limit]:
+            print(f"  - [{food['fdc_id']}] {food['description']}")
+
+        hidden = sum(max(0, len(foods) - limit) for foods in (self.added, self.changed, self.removed))
+        if hidden:
+            print(f"  ... {hidden} more (use --diff-report for the full list)")
+
+
+def load_food_versions(conn: sqlite3.Connection) -> Dict[int, Tuple[Optional[str], str]]:
+    """fdc_id -> (publication_date, content_hash) for every stored food"""
+    rows = conn.execute("SELECT fdc_id, publication_date, content_hash FROM food_versions")
+    return {fdc_id: (published, content_hash) for fdc_id, published, content_hash in rows}
+
+
+def diff_nutrients(old: Dict[int, float], new: Dict[int, float]) -> List[Dict]:
+    """Per-nutrient value changes between two versions of a food"""
+    changes = []
+    for nutrient_id in sorted(old.keys() | new.keys()):
+        before, after = old.get(nutrient_id), new.get(nutrient_id)
+        if before is not None and after is not None and abs(before - after) < 1e-9:
+            continue
+
+        nutrient = NUTRIENT_MAP.get(nutrient_id)
+        changes.append({
+            "nutrient_id": nutrient_id,
+            "name": nutrient.name if nutrient else str(nutrient_id),
+            "unit": nutrient.unit if nutrient else "",
+            "old": before,
+            "new": after
+        })
+    return changes
+
+
+def delete_foods(conn: sqlite3.Connection, fdc_ids: Iterable[int]) -> List[Dict]:
+    """Remove foods everywhere (triggers update food_search); returns what was removed"""
+    ids = [(fdc_id,) for fdc_id in fdc_ids]
+    removed = []
+    for (fdc_id,) in ids:
+        row = conn.execute("SELECT description FROM usda_foods WHERE fdc_id = ?", (fdc_id,)).fetchone()
+        removed.append({"fdc_id": fdc_id, "description": row[0] if row else None})
+
+    with conn:
+        for table in ("food_nutrients", "food_portions", "usda_foods", "food_versions", "ingest_state"):
+            conn.executemany(f"DELETE FROM {table} WHERE fdc_id = ?", ids)
+
+    return removed
+
+
+# ==============================================================================
+# Main Population Logic
+# ==============================================================================
+
+def collect_sr_legacy_foods(client: USDAClient, skip_ids: Set[int]) -> Tuple[Dict[int, Dict], int]:
+    """Page through the SR Legacy search results, returning (fdc_id -> summary, total hits)"""
+    collected_foods: Dict[int, Dict] = {}
 
     # Get first page to determine total count
     page_size = 200  # Max allowed by API
     page_number = 1
 
     foods, total_hits = client.search_foods(page_number=page_number, page_size=page_size)
-    progress.last_api_call = datetime.now().isoformat()
 
     if total_hits == 0:
         print("❌ No SR Legacy foods found. Check API key and connection.")
-        return
+        return collected_foods, 0
 
     total_pages = (total_hits + page_size - 1) // page_size  # Ceiling division
     print(f"📦 Found {total_hits} total SR Legacy foods across {total_pages} pages")
@@ -659,21 +1615,17 @@ def populate_database(
     # Process first page
     for food in foods:
         fdc_id = food.get("fdcId")
-        if fdc_id and fdc_id not in progress.completed_food_ids:
+        if fdc_id and fdc_id not in skip_ids:
             collected_foods[fdc_id] = food
 
     print(f"[Page 1/{total_pages}] ✅ Collected {len(foods)} foods (total: {len(collected_foods)})")
 
     # Iterate through remaining pages
     for page_number in range(2, total_pages + 1):
-        # No rate limiting during pagination - only 39 API calls total
-        # Rate limiting is enforced during detail fetching phase
-
         print(f"[Page {page_number}/{total_pages}] Fetching...", end=' ')
 
         # Get page
         foods, _ = client.search_foods(page_number=page_number, page_size=page_size)
-        progress.last_api_call = datetime.now().isoformat()
 
         if not foods:
             print("⚠️  No foods returned")
@@ -686,8 +1638,8 @@ def populate_database(
             if not fdc_id or fdc_id in collected_foods:
                 continue
 
-            # Skip if already in completed list
-            if fdc_id in progress.completed_food_ids:
+            # Skip if already completed in a previous run
+            if fdc_id in skip_ids:
                 continue
 
             collected_foods[fdc_id] = food
@@ -695,120 +1647,206 @@ def populate_database(
 
         print(f"✅ +{added} foods (total: {len(collected_foods)})")
 
-        # Save progress every 10 pages
-        if page_number % 10 == 0:
-            progress.save()
-
-        # Small delay to be nice to API
-        time.sleep(0.1)
+    return collected_foods, total_hits
 
-    print()
-    print(f"📦 Collected {len(collected_foods)} unique foods")
-    print(f"🔄 Now fetching detailed nutrient data...")
-    print()
 
-    # Fetch detailed nutrient data for each food
-    for i, (fdc_id, food_summary) in enumerate(collected_foods.items(), 1):
-        # Skip if already processed
-        if fdc_id in progress.completed_food_ids:
-            continue
-
-        # Rate limiting
-        progress.wait_for_rate_limit()
-
-        print(f"[{i}/{len(collected_foods)}] {food_summary.get('description', 'Unknown')[:60]}...", end=' ')
+def populate_database(
+    api_key: str,
+    output_path: str,
+    target_foods: int = 5000,
+    resume: bool = False,
+    retry_failed: bool = False,
+    api_base: str = USDA_API_BASE,
+    workers: int = MAX_WORKERS,
+    rate_limit: int = RATE_LIMIT_PER_HOUR,
+    batch_size: int = BATCH_SIZE,
+    write_batch: int = WRITE_BATCH_FOODS,
+    cache_dir: Optional[str] = CACHE_DIR,
+    cache_ttl_days: float = CACHE_TTL_DAYS,
+    offline: bool = False,
+    delta: bool = False,
+    diff_report_path: Optional[str] = None,
+    trigram: bool = False
+):
+    """
+    Main function to populate USDA database
 
-        # Get detailed food data
-        food_detail = client.get_food_details(fdc_id)
-        progress.last_api_call = datetime.now().isoformat()
+    Args:
+        api_key: USDA FoodData Central API key
+        output_path: Path to output SQLite database
+        target_foods: Target number of foods to populate
+        resume: Resume from previous run if interrupted
+        retry_failed: Only re-fetch foods whose last attempt failed
+        api_base: FoodData Central base URL (point at a mock server for testing)
+        workers: Number of concurrent detail requests
+        rate_limit: Maximum API calls per rolling hour
+        batch_size: Foods per detail request (1 disables the batch endpoint)
+        write_batch: Foods per database write transaction
+        cache_dir: On-disk response cache directory (None disables caching)
+        cache_ttl_days: Age after which cached responses are revalidated
+        offline: Serve everything from the cache, never touch the network
+        delta: Only refetch new/changed foods, delete removed ones, update FTS in place
+        diff_report_path: Write the delta report as JSON to this path
+        trigram: Also build the trigram substring index (food_search_trigram)
+    """
+    start_time = datetime.now()
 
-        if not food_detail:
-            print("❌ Failed")
-            progress.failed_food_ids.append(fdc_id)
-            continue
+    # Initialize database
+    conn = sqlite3.Connection(output_path)
+    create_database_schema(conn, trigram=trigram)
+    populate_nutrients(conn)
+    writer = FoodWriter(conn, foods_per_transaction=write_batch)
+
+    # Initialize API client (a delta run must see upstream, so it revalidates everything)
+    cache_ttl = 0 if delta else cache_ttl_days * 86400
+    cache = ResponseCache(cache_dir, ttl_seconds=cache_ttl) if cache_dir else None
+    rate_limiter = RateLimiter(max_calls=rate_limit)
+    client = USDAClient(
+        api_key,
+        api_base=api_base,
+        rate_limiter=rate_limiter,
+        max_workers=workers,
+        cache=cache,
+        offline=offline
+    )
 
-        # Extract nutrients
-        nutrients_data = food_detail.get("foodNutrients", [])
-        nutrient_values = {}
+    report: Optional[DeltaReport] = None
+    stored_versions: Dict[int, Tuple[Optional[str], str]] = {}
+
+    if retry_failed:
+        # No pagination needed - the journal already knows which foods failed
+        failed_ids = load_failed_ids(conn)
+        print(f"🔁 Retrying {len(failed_ids)} failed foods")
+        collected_foods: Dict[int, Dict] = {fdc_id: {} for fdc_id in sorted(failed_ids)}
+    else:
+        completed_ids: Set[int] = set()
+        if resume:
+            completed_ids = load_completed_ids(conn)
+            print(f"📂 Resuming from previous run ({len(completed_ids)} foods completed)")
+
+        print(f"🔍 Fetching SR Legacy foods from USDA database...")
+        print(f"📊 Target: ALL SR Legacy foods (~7,793), {len(NUTRIENTS)} nutrients each")
+        print()
 
-        for nutrient in nutrients_data:
-            nutrient_id = nutrient.get("nutrient", {}).get("id")
-            amount = nutrient.get("amount")
+        collected_foods, total_hits = collect_sr_legacy_foods(client, skip_ids=completed_ids)
+        if not collected_foods and not completed_ids:
+            return
 
-            if nutrient_id in NUTRIENT_IDS and amount is not None:
-                nutrient_values[nutrient_id] = amount
+        print()
+        print(f"📦 Collected {len(collected_foods)} unique foods")
+
+        if delta:
+            report = DeltaReport()
+            stored_versions = load_food_versions(conn)
+
+            # Only trust "missing upstream" when every page came back
+            if len(collected_foods) < total_hits:
+                print(f"⚠️  Only {len(collected_foods)}/{total_hits} foods listed - skipping removals")
+            else:
+                report.removed = delete_foods(conn, sorted(stored_versions.keys() - collected_foods.keys()))
+
+            # Same upstream publication date as stored means nothing to refetch
+            for fdc_id in list(collected_foods):
+                stored = stored_versions.get(fdc_id)
+                published = normalize_publication_date(collected_foods[fdc_id].get("publishedDate"))
+                if stored and published and stored[0] == published:
+                    del collected_foods[fdc_id]
+                    report.unchanged += 1
+
+            print(f"🔀 Delta: {len(collected_foods)} new or possibly changed, "
+                  f"{len(report.removed)} removed, {report.unchanged} unchanged by date")
+
+    print(f"🔄 Now fetching detailed nutrient data "
+          f"({workers} workers, {batch_size} foods/request, {rate_limit} calls/hour)...")
+    print()
 
-        # Insert food
-        try:
-            cursor.execute("""
-                INSERT OR REPLACE INTO usda_foods
-                (fdc_id, description, common_name, category, search_terms)
-                VALUES (?, ?, ?, ?, ?)
-            """, (
-                fdc_id,
-                food_detail.get("description"),
-                food_summary.get("description"),  # Use search result as common name
-                food_detail.get("foodCategory", {}).get("description"),
-                ""  # Will be populated later if needed
-            ))
-
-            # Insert nutrients
-            for nutrient_id, amount in nutrient_values.items():
-                cursor.execute("""
-                    INSERT OR REPLACE INTO food_nutrients
-                    (fdc_id, nutrient_id, amount)
-                    VALUES (?, ?, ?)
-                """, (fdc_id, nutrient_id, amount))
+    pending_ids = list(collected_foods)
 
-            conn.commit()
-            progress.completed_food_ids.append(fdc_id)
+    # Fetch detailed nutrient data concurrently; DB writes stay on this thread
+    try:
+        for i, (fdc_id, food_detail) in enumerate(
+            fetch_food_details(client, pending_ids, workers, batch_size), 1
+        ):
+            food_summary = collected_foods[fdc_id]
+            label = food_summary.get("description") or f"fdc_id {fdc_id}"
 
-            print(f"✅ {len(nutrient_values)} nutrients")
+            print(f"[{i}/{len(pending_ids)}] {label[:60]}...", end=' ')
 
-        except sqlite3.Error as e:
-            print(f"❌ DB error: {e}")
-            progress.failed_food_ids.append(fdc_id)
+            if not food_detail:
+                print("❌ Failed")
+                writer.fail(fdc_id, "No data returned by API")
+                continue
 
-        # Save progress every 50 foods
-        if i % 50 == 0:
-            progress.save()
-            print(f"💾 Progress saved ({len(progress.completed_food_ids)} foods completed)")
+            nutrient_values = extract_nutrient_values(food_detail)
+            description = food_detail.get("description")
+            category = food_detail.get("foodCategory", {}).get("description")
+            portions = extract_portions(fdc_id, food_detail, nutrient_values)
 
-        # Small delay
-        time.sleep(0.1)
+            # Unchanged foods are still rewritten so their publication date is recorded
+            outcome = ""
+            if report is not None:
+                outcome = report.record(
+                    conn, stored_versions, fdc_id, description, category, nutrient_values, portions
+                )
 
-    # Build FTS5 search index
-    print()
-    print("🔍 Building FTS5 search index...")
-    cursor.execute("""
-        INSERT INTO food_search (rowid, description, common_name, search_terms)
-        SELECT fdc_id, description, common_name, search_terms
-        FROM usda_foods
-    """)
+            writer.add(
+                fdc_id,
+                description,
+                # Use search result as common name (retries only have the detail)
+                food_summary.get("description") or description,
+                category,
+                nutrient_values,
+                publication_date=food_detail.get("publicationDate"),
+                portions=portions
+            )
+            print(f"✅ {len(nutrient_values)} nutrients, {len(portions)} portions {outcome}".rstrip())
+    finally:
+        # Commit whatever is buffered, even when interrupted
+        writer.close()
+
+    # Build FTS5 search index (delta runs already updated it in place via triggers)
+    if report is None:
+        print()
+        print("🔍 Building FTS5 search index...")
+        rebuild_search_index(conn)
+    else:
+        backfill_search_terms(conn)
 
-    # Optimize database
+    # Optimize database (VACUUM cannot run inside a transaction)
     print("⚙️  Optimizing database...")
-    cursor.execute("ANALYZE")
-    cursor.execute("VACUUM")
-
-    conn.commit()
+    state = summarize_ingest_state(conn)
+    conn.execute("ANALYZE")
+    conn.execute("VACUUM")
     conn.close()
 
-    # Update progress
-    progress.status = "completed"
-    progress.end_time = datetime.now().isoformat()
-    progress.save()
-
     # Print summary
     print()
     print("=" * 70)
     print("✅ DATABASE POPULATION COMPLETE")
     print("=" * 70)
-    print(f"Foods populated:     {len(progress.completed_food_ids)}")
-    print(f"Foods failed:        {len(progress.failed_food_ids)}")
+    print(f"Foods populated:     {state.get('completed', 0)}")
+    print(f"Foods failed:        {state.get('failed', 0)}")
     print(f"Nutrients tracked:   {len(NUTRIENTS)}")
     print(f"Database size:       {Path(output_path).stat().st_size / 1024 / 1024:.1f} MB")
-    print(f"Duration:            {datetime.now() - datetime.fromisoformat(progress.start_time)}")
+    print(f"Duration:            {datetime.now() - start_time}")
+    if cache:
+        print(f"Cache hits/misses:   {cache.hits}/{cache.misses}")
+    throttle = rate_limiter.stats()
+    print(f"API calls:           {throttle['calls']} "
+          f"({throttle['throttled_calls']} throttled, {throttle['throttle_seconds']} worker-seconds waiting, "
+          f"{throttle['rate_limited_responses']} × 429)")
+    if throttle["min_server_remaining"] is not None:
+        print(f"Server quota left:   {throttle['server_remaining']} (low: {throttle['min_server_remaining']})")
+    if state.get("failed"):
+        print("Retry failures with: python populate_usda_db.py --api-key YOUR_KEY --retry-failed")
+    print(f"Bundle with:         python finalize_usda_db.py --db {output_path} --output BUNDLE.db")
+
+    if report is not None:
+        report.print_summary()
+        if diff_report_path:
+            with open(diff_report_path, "w") as f:
+                json.dump(asdict(report), f, indent=2)
+            print(f"📝 Diff report written to {diff_report_path}")
     print()
 
     # Validate
@@ -844,6 +1882,11 @@ def validate_database(db_path: str):
     avg_nutrients = cursor.fetchone()[0]
     print(f"✓ Average nutrients per food: {avg_nutrients:.1f}")
 
+    # Portions (household measures)
+    cursor.execute("SELECT COUNT(*), COUNT(DISTINCT fdc_id) FROM food_portions")
+    portion_count, foods_with_portions = cursor.fetchone()
+    print(f"✓ Portions: {portion_count} ({foods_with_portions} foods)")
+
     # Test search performance
     start = time.time()
     cursor.execute("""
@@ -895,13 +1938,17 @@ def validate_database(db_path: str):
 # ==============================================================================
 
 def main():
+    if requests is None:
+        print("Error: 'requests' library not installed")
+        print("Install with: pip install requests")
+        sys.exit(1)
+
     parser = argparse.ArgumentParser(
         description="Populate USDA nutrition database from FoodData Central API"
     )
     parser.add_argument(
         "--api-key",
-        required=True,
-        help="USDA FoodData Central API key"
+        help="USDA FoodData Central API key (not needed with --offline)"
     )
     parser.add_argument(
         "--output",
@@ -919,9 +1966,85 @@ def main():
         action="store_true",
         help="Resume from previous interrupted run"
     )
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="Only re-fetch foods whose last attempt failed"
+    )
+    parser.add_argument(
+        "--api-base",
+        default=USDA_API_BASE,
+        help=f"FoodData Central base URL, e.g. a local mock server (default: {USDA_API_BASE})"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=MAX_WORKERS,
+        help=f"Concurrent detail requests (default: {MAX_WORKERS})"
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=int,
+        default=RATE_LIMIT_PER_HOUR,
+        help=f"Maximum API calls per rolling hour (default: {RATE_LIMIT_PER_HOUR})"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BATCH_SIZE,
+        help=f"Foods per detail request, 1 disables batching (default: {BATCH_SIZE})"
+    )
+    parser.add_argument(
+        "--write-batch",
+        type=int,
+        default=WRITE_BATCH_FOODS,
+        help=f"Foods per database write transaction (default: {WRITE_BATCH_FOODS})"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=CACHE_DIR,
+        help=f"On-disk API response cache (default: {CACHE_DIR})"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Disable the response cache"
+    )
+    parser.add_argument(
+        "--cache-ttl-days",
+        type=float,
+        default=CACHE_TTL_DAYS,
+        help=f"Revalidate cached responses older than this (default: {CACHE_TTL_DAYS})"
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Rebuild entirely from the response cache without network access"
+    )
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        help="Update an existing database in place: refetch new/changed foods, delete removed ones"
+    )
+    parser.add_argument(
+        "--trigram",
+        action="store_true",
+        help="Also build a trigram FTS5 index for substring/typo-tolerant search (SQLite 3.34+)"
+    )
+    parser.add_argument(
+        "--diff-report",
+        help="With --delta, also write the added/changed/removed report as JSON"
+    )
 
     args = parser.parse_args()
 
+    if not args.api_key and not args.offline:
+        parser.error("--api-key is required unless --offline is set")
+    if args.offline and args.no_cache:
+        parser.error("--offline needs the response cache")
+    if args.delta and (args.resume or args.retry_failed):
+        parser.error("--delta cannot be combined with --resume or --retry-failed")
+
     # Create output directory if needed
     output_path = Path(args.output)
     output_path.parent.mkdir(parents=True, exist_ok=True)
@@ -932,7 +2055,19 @@ def main():
             api_key=args.api_key,
             output_path=str(output_path),
             target_foods=args.foods,
-            resume=args.resume
+            resume=args.resume,
+            retry_failed=args.retry_failed,
+            api_base=args.api_base,
+            workers=args.workers,
+            rate_limit=args.rate_limit,
+            batch_size=args.batch_size,
+            write_batch=args.write_batch,
+            cache_dir=None if args.no_cache else args.cache_dir,
+            cache_ttl_days=args.cache_ttl_days,
+            offline=args.offline,
+            delta=args.delta,
+            diff_report_path=args.diff_report,
+            trigram=args.trigram
         )
     except KeyboardInterrupt:
         print()
@@ -17,6 +17,8 @@ import os
 import requests
 from typing import Dict, List, Tuple
 
+from populate_usda_db import create_search_index, generate_search_terms
+
 # USDA FoodData Central API (requires API key)
 USDA_API_KEY = "YOUR_API_KEY"  # Get from https://fdc.nal.usda.gov/api-key-signup.html
 USDA_API_URL = "https://api.nal.usda.gov/fdc/v1"
@@ -172,19 +174,11 @@ def create_database(db_path: str = "usda_nutrients.db") -> sqlite3.Connection:
     c.execute("CREATE INDEX idx_nutrient_category ON nutrients(category)")
     c.execute("CREATE INDEX idx_food_nutrients_fdc ON food_nutrients(fdc_id)")
 
-    # Create FTS5 virtual table for full-text search
-    c.execute('''
-        CREATE VIRTUAL TABLE food_search
-        USING fts5(
-            description,
-            common_name,
-            search_terms,
-            content='usda_foods',
-            tokenize='porter'
-        )
-    ''')
-
     conn.commit()
+
+    # FTS5 full-text search, same definition as populate_usda_db.py
+    # (rowid = fdc_id, kept in sync by triggers on usda_foods)
+    create_search_index(conn)
     return conn
 
 
@@ -350,8 +344,7 @@ def populate_foods_table(conn: sqlite3.Connection, foods: List[Dict]):
         category = food.get("foodCategory", "Other")
 
         # Generate search terms
-        search_terms = description.lower()
-        search_terms += f" {category.lower()}"
+        search_terms = generate_search_terms(description, category)
 
         # Extract common name (first part of description)
         common_name = description.split(",")[0] if "," in description else description
@@ -377,12 +370,7 @@ def populate_foods_table(conn: sqlite3.Connection, foods: List[Dict]):
         except sqlite3.IntegrityError:
             print(f"⚠️ Duplicate food: {description}")
 
-    # Update FTS index
-    c.execute('''
-        INSERT INTO food_search(description, common_name, search_terms)
-        SELECT description, common_name, search_terms FROM usda_foods
-    ''')
-
+    # food_search is updated by the usda_foods triggers
     conn.commit()
     print(f"✅ Populated {len(foods)} foods")
 
@@ -451,7 +439,7 @@ def test_search(conn: sqlite3.Connection):
         c.execute('''
             SELECT f.fdc_id, f.description, f.category
             FROM food_search s
-            JOIN usda_foods f ON f.rowid = s.rowid
+            JOIN usda_foods f ON f.fdc_id = s.rowid
             WHERE food_search MATCH ?
             ORDER BY rank
             LIMIT 3
@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+Bulk Re-enrichment of Unmatched Meal Ingredients
+
+Fixes meal_ingredients rows the app gave up on (enrichment_attempted = true,
+usda_fdc_id null) on the server, instead of waiting for each user's device to
+re-run BackgroundEnrichmentService. Rows the app left unmatched on purpose
+(blacklisted ingredients, saved with enrichment_method "none") are excluded:
+
+    1. Keyset-page through unmatched rows (id > last id, ordered by id)
+    2. Match each page locally: ingredient_shortcuts (one primary-key lookup
+       on the cleaned name), then the character n-gram matcher for the rest
+    3. Compute micronutrients_json the way LocalUSDAService.getMicronutrients
+       does (per-100g amounts scaled to the ingredient's grams, RDA %)
+    4. Write every match in the page back with one bulk upsert
+
+Talks plain PostgREST over HTTP (Supabase serves it at /rest/v1), so the job
+runs unchanged against a local PostgREST or any compatible stand-in via
+--rest-url. Rows without a confident match are left untouched.
+
+Usage:
+    SUPABASE_URL=... SUPABASE_SERVICE_ROLE_KEY=... python reenrich_ingredients.py --db Food1/Data/usda_nutrients.db
+    python reenrich_ingredients.py --db usda.db --rest-url http://localhost:3000 --key local --dry-run
+    python reenrich_ingredients.py --db usda.db --batch-size 200 --limit 1000 --min-score 0.7
+"""
+
+import sqlite3
+import argparse
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+from ngram_matcher import NgramIndex, default_index_path, load_or_build
+
+# Shared cleanIngredientName port (evaluation/ingredient_normalizer.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "evaluation"))
+from ingredient_normalizer import BLACKLISTED_INGREDIENTS, clean_ingredient_name  # noqa: E402
+
+
+# ==============================================================================
+# Configuration
+# ==============================================================================
+
+BATCH_SIZE = 500  # Rows per keyset page (and per bulk upsert)
+MIN_SCORE = 0.6  # Cosine similarity an n-gram match needs to be written
+REQUEST_TIMEOUT = 30
+TABLE = "meal_ingredients"
+
+# Columns read per row; the NOT NULL ones are echoed back so the upsert's
+# insert half is valid (PostgREST upserts are INSERT ... ON CONFLICT)
+SELECT_COLUMNS = "id,meal_id,name,quantity,unit"
+
+# SyncService maps both "Shortcut" and fuzzy search matches to fuzzy_match
+ENRICHMENT_METHOD = "fuzzy_match"
+
+# ...and "Blacklisted" to none: deliberately unmatched, never re-enriched
+BLACKLISTED_METHOD = "none"
+
+GRAM_UNITS = {"g", "gram", "grams"}
+
+# Same exclusions as LocalUSDAService.getMicronutrients
+MICRONUTRIENTS_SQL = """
+    SELECT n.name, n.unit, fn.amount
+    FROM food_nutrients fn
+    INNER JOIN nutrients n ON fn.nutrient_id = n.nutrient_id
+    WHERE fn.fdc_id = ?
+    AND n.name NOT IN ('Protein', 'Carbohydrate', 'Total Fat', 'Energy')
+"""
+
+# RDAValues.getRDA(for:) in LocalUSDAService.swift, keyed by USDA nutrient name
+RDA_BY_NUTRIENT = {
+    "Calcium": 1300.0,
+    "Iron": 18.0,
+    "Magnesium": 400.0,
+    "Potassium": 4700.0,
+    "Zinc": 11.0,
+    "Sodium": 2300.0,
+    "Phosphorus": 700.0,
+    "Copper": 0.9,
+    "Selenium": 55.0,
+    "Vitamin A": 900.0,
+    "Vitamin C": 90.0,
+    "Vitamin D": 20.0,
+    "Vitamin E": 15.0,
+    "Vitamin B12": 2.4,
+    "Folate": 400.0,
+    "Folate (Vitamin B9)": 400.0,
+    "Vitamin K": 120.0,
+    "Thiamin": 1.2,
+    "Vitamin B1 (Thiamin)": 1.2,
+    "Riboflavin": 1.3,
+    "Vitamin B2 (Riboflavin)": 1.3,
+    "Niacin": 16.0,
+    "Vitamin B3 (Niacin)": 16.0,
+    "Pantothenic acid": 5.0,
+    "Vitamin B5 (Pantothenic Acid)": 5.0,
+    "Vitamin B-6": 1.3,
+    "Vitamin B6": 1.3,
+}
+
+
+# ==============================================================================
+# Micronutrients (port of LocalUSDAService.getMicronutrients)
+# ==============================================================================
+
+def nutrient_category(name: str) -> str:
+    """Port of NutrientCategory.categorize (raw values of the Swift enum)"""
+    lower = name.lower()
+    if any(word in lower for word in ("vitamin", "folate", "choline", "biotin")):
+        return "vitamin"
+    if any(word in lower for word in ("sodium", "potassium", "chloride")):
+        return "electrolyte"
+    if any(word in lower for word in (
+        "calcium", "iron", "magnesium", "zinc", "copper", "manganese",
+        "selenium", "phosphorus", "chromium", "molybdenum", "iodine"
+    )):
+        return "mineral"
+    if "fiber" in lower or "sugar" in lower:
+        return "fiber"
+    if any(word in lower for word in ("fat", "fatty", "omega", "cholesterol")):
+        return "fattyAcid"
+    return "other"
+
+
+def micronutrients(conn: sqlite3.Connection, fdc_id: int, grams: float) -> List[Dict[str, object]]:
+    """[Micronutrient] as the app's JSONEncoder writes it into cachedMicronutrientsJSON"""
+    result = []
+    for name, unit, amount_per_100g in conn.execute(MICRONUTRIENTS_SQL, (fdc_id,)):
+        amount = amount_per_100g * (grams / 100.0)
+        rda = RDA_BY_NUTRIENT.get(name, 0.0)
+        result.append({
+            "name": name,
+            "amount": amount,
+            "unit": unit,
+            "rdaPercent": (amount / rda) * 100 if rda > 0 else 0,
+            "category": nutrient_category(name),
+        })
+    return result
+
+
+# ==============================================================================
+# Matching
+# ==============================================================================
+
+@dataclass
+class MatchStats:
+    scanned: int = 0
+    shortcut: int = 0
+    ngram: int = 0
+    unmatched: int = 0
+    blacklisted: int = 0
+    skipped_units: int = 0
+    skipped_quantity: int = 0
+    written: int = 0
+    pages: int = 0
+    unmatched_names: Dict[str, int] = field(default_factory=dict)
+
+
+class LocalMatcher:
+    """
+    ingredient_shortcuts first, then the n-gram matcher above min_score
+
+    Blacklisted names are never matched, like FuzzyMatchingService.matchWithMethod.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, index: NgramIndex, min_score: float = MIN_SCORE):
+        self.conn = conn
+        self.index = index
+        self.min_score = min_score
+        self.has_shortcuts = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ingredient_shortcuts'"
+        ).fetchone() is not None
+
+    def shortcut(self, cleaned: str) -> Optional[int]:
+        if not self.has_shortcuts:
+            return None
+        row = self.conn.execute("SELECT fdc_id FROM ingredient_shortcuts WHERE name = ?", (cleaned,)).fetchone()
+        return row[0] if row else None
+
+    def match_page(self, names: List[str]) -> List[Optional[tuple]]:
+        """
+        (fdc_id, method) per name; the n-gram misses are scored in one batch
+
+        Blacklisted names get (None, "blacklisted"); names with no match, None.
+        """
+        cleaned = [clean_ingredient_name(name) for name in names]
+        matches: List[Optional[tuple]] = [None] * len(names)
+
+        pending = []
+        for i, name in enumerate(cleaned):
+            if name in BLACKLISTED_INGREDIENTS:
+                matches[i] = (None, "blacklisted")
+                continue
+            fdc_id = self.shortcut(name) if name else None
+            if fdc_id is not None:
+                matches[i] = (fdc_id, "shortcut")
+            elif name:
+                pending.append(i)
+
+        if pending:
+            for i, candidates in zip(pending, self.index.match([cleaned[i] for i in pending], k=1)):
+                if candidates and candidates[0][1] >= self.min_score:
+                    matches[i] = (candidates[0][0], "ngram")
+        return matches
+
+
+# ==============================================================================
+# PostgREST
+# ==============================================================================
+
+class PostgrestTable:
+    """Minimal PostgREST client: keyset-paged reads and bulk upserts of one table"""
+
+    def __init__(self, rest_url: str, key: str, table: str = TABLE):
+        self.url = f"{rest_url.rstrip('/')}/{table}"
+        self.session = requests.Session()
+        self.session.headers.update({
+            "apikey": key,
+            "Authorization": f"Bearer {key}",
+            "Content-Type": "application/json",
+        })
+        retry = Retry(total=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504],
+                      allowed_methods=["GET", "POST"])
+        adapter = HTTPAdapter(max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def unmatched_page(self, after_id: Optional[str], limit: int) -> List[Dict]:
+        """
+        Next page of attempted-but-unmatched rows with id > after_id
+
+        Rows the app left unmatched on purpose (enrichment_method "none")
+        are filtered out; a NULL method still counts as unmatched.
+        """
+        params = {
+            "select": SELECT_COLUMNS,
+            "usda_fdc_id": "is.null",
+            "enrichment_attempted": "is.true",
+            "or": f"(enrichment_method.is.null,enrichment_method.neq.{BLACKLISTED_METHOD})",
+            "order": "id.asc",
+            "limit": str(limit),
+        }
+        if after_id is not None:
+            params["id"] = f"gt.{after_id}"
+        response = self.session.get(self.url, params=params, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+    def upsert(self, rows: List[Dict]):
+        """One INSERT ... ON CONFLICT (id) DO UPDATE for the whole page"""
+        response = self.session.post(
+            self.url,
+            params={"on_conflict": "id"},
+            headers={"Prefer": "resolution=merge-duplicates,return=minimal"},
+            data=json.dumps(rows),
+            timeout=REQUEST_TIMEOUT
+        )
+        response.raise_for_status()
+
+
+# ==============================================================================
+# Job
+# ==============================================================================
+
+def reenrich(
+    table: PostgrestTable,
+    conn: sqlite3.Connection,
+    matcher: LocalMatcher,
+    batch_size: int = BATCH_SIZE,
+    limit: Optional[int] = None,
+    dry_run: bool = False
+) -> MatchStats:
+    """
+    Page through unmatched rows by id and write back every confident match
+
+    Keyset pagination (id > last seen) stays correct while matched rows drop
+    out of the filter underneath it, which OFFSET paging would not.
+    """
+    stats = MatchStats()
+    descriptions: Dict[int, str] = {}
+    after_id = None
+
+    while limit is None or stats.scanned < limit:
+        page_size = batch_size if limit is None else min(batch_size, limit - stats.scanned)
+        rows = table.unmatched_page(after_id, page_size)
+        if not rows:
+            break
+        stats.pages += 1
+        stats.scanned += len(rows)
+        after_id = rows[-1]["id"]
+
+        updates = []
+        for row, match in zip(rows, matcher.match_page([row["name"] for row in rows])):
+            if match is None:
+                stats.unmatched += 1
+                stats.unmatched_names[row["name"]] = stats.unmatched_names.get(row["name"], 0) + 1
+                continue
+            fdc_id, method = match
+            if method == "blacklisted":
+                stats.blacklisted += 1
+                continue
+            if (row.get("unit") or "").lower() not in GRAM_UNITS:
+                stats.skipped_units += 1
+                continue
+            # Micronutrients scale with the grams; without them there's nothing to write
+            if row.get("quantity") is None:
+                stats.skipped_quantity += 1
+                continue
+
+            setattr(stats, method, getattr(stats, method) + 1)
+            if fdc_id not in descriptions:
+                found = conn.execute("SELECT description FROM usda_foods WHERE fdc_id = ?", (fdc_id,)).fetchone()
+                descriptions[fdc_id] = found[0] if found else None
+
+            updates.append({
+                **row,
+                "usda_fdc_id": fdc_id,
+                "usda_description": descriptions[fdc_id],
+                "enrichment_attempted": True,
+                "enrichment_method": ENRICHMENT_METHOD,
+                # The app stores the encoded [Micronutrient] as a JSON string, not an array
+                "micronutrients_json": json.dumps(micronutrients(conn, fdc_id, float(row["quantity"]))),
+            })
+
+        if updates and not dry_run:
+            table.upsert(updates)
+            stats.written += len(updates)
+
+        print(f"  📄 Page {stats.pages}: {len(rows)} rows, {len(updates)} matched "
+              f"({stats.scanned:,} scanned so far)")
+
+        if len(rows) < page_size:
+            break
+
+    return stats
+
+
+def print_summary(stats: MatchStats, elapsed: float, dry_run: bool):
+    print()
+    print("=" * 70)
+    print("✅ RE-ENRICHMENT COMPLETE" + (" (dry run, nothing written)" if dry_run else ""))
+    print("=" * 70)
+    print(f"Rows scanned:        {stats.scanned:,} in {stats.pages} pages")
+    print(f"Shortcut matches:    {stats.shortcut:,}")
+    print(f"N-gram matches:      {stats.ngram:,}")
+    print(f"Unmatched:           {stats.unmatched:,}")
+    if stats.blacklisted:
+        print(f"Blacklisted:         {stats.blacklisted:,}")
+    if stats.skipped_units:
+        print(f"Skipped (non-gram):  {stats.skipped_units:,}")
+    if stats.skipped_quantity:
+        print(f"Skipped (no qty):    {stats.skipped_quantity:,}")
+    print(f"Rows written:        {stats.written:,}")
+    print(f"Elapsed:             {elapsed:.1f}s ({stats.scanned / elapsed if elapsed else 0:,.0f} rows/s)")
+
+    if stats.unmatched_names:
+        top = sorted(stats.unmatched_names.items(), key=lambda item: -item[1])[:15]
+        print("\nMost frequent unmatched names (shortcut candidates):")
+        for name, count in top:
+            print(f"  - {name} ({count})")
+    print()
+
+
+# ==============================================================================
+# CLI
+# ==============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-enrich unmatched meal_ingredients rows from the local USDA database")
+    parser.add_argument("--db", required=True, help="USDA database (with ingredient_shortcuts, if built)")
+    parser.add_argument("--index", help="N-gram index (default: <db>.ngrams.npz, built if missing)")
+    parser.add_argument("--rest-url", help="PostgREST base URL (default: $SUPABASE_URL/rest/v1)")
+    parser.add_argument("--key", help="API key (default: $SUPABASE_SERVICE_ROLE_KEY)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help=f"Rows per page and upsert (default: {BATCH_SIZE})")
+    parser.add_argument("--limit", type=int, help="Stop after this many rows")
+    parser.add_argument("--min-score", type=float, default=MIN_SCORE, help=f"Minimum n-gram score (default: {MIN_SCORE})")
+    parser.add_argument("--dry-run", action="store_true", help="Match and report without writing")
+
+    args = parser.parse_args()
+
+    rest_url = args.rest_url or (f"{os.environ['SUPABASE_URL'].rstrip('/')}/rest/v1" if os.environ.get("SUPABASE_URL") else None)
+    key = args.key or os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+    if not rest_url or not key:
+        parser.error("set SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY, or pass --rest-url and --key")
+    if not Path(args.db).exists():
+        print(f"❌ Database not found: {args.db}")
+        sys.exit(1)
+
+    conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    index, built = load_or_build(conn, args.index or default_index_path(args.db))
+    matcher = LocalMatcher(conn, index, min_score=args.min_score)
+    print(f"{'🔨 Built' if built else '📂 Loaded'} n-gram index ({index.food_count:,} foods); "
+          f"shortcut table: {'yes' if matcher.has_shortcuts else 'no'}")
+    print(f"🔄 Re-enriching unmatched {TABLE} rows from {rest_url}")
+
+    start = time.time()
+    stats = reenrich(
+        PostgrestTable(rest_url, key),
+        conn,
+        matcher,
+        batch_size=args.batch_size,
+        limit=args.limit,
+        dry_run=args.dry_run
+    )
+    print_summary(stats, time.time() - start, args.dry_run)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
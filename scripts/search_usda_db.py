@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+USDA Database Search Helper
+
+Query helpers for the FTS5 indexes built by populate_usda_db.py, next to
+the LIKE query the app currently runs, so both can be compared on the same
+database:
+
+    - like      LocalUSDAService.search (full scan, ranked by matched words)
+    - fts       food_search MATCH with prefix queries, ranked by weighted bm25
+    - trigram   food_search_trigram MATCH (substring search, if built)
+
+--portion resolves a household measure ("1 cup rice", "2 eggs") to grams
+through food_portions, without asking the model for estimated_grams.
+
+Usage:
+    python search_usda_db.py --db Food1/Data/usda_nutrients.db "chicken breast"
+    python search_usda_db.py --db Food1/Data/usda_nutrients.db --method like "greek yogurt"
+    python search_usda_db.py --db Food1/Data/usda_nutrients.db --compare
+    python search_usda_db.py --db Food1/Data/usda_nutrients.db --portion "1 cup rice"
+"""
+
+import sqlite3
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from benchmark_usda_db import (
+    SEARCH_LIMIT,
+    STOPWORDS,
+    Workload,
+    build_like_search,
+    clean_search_query,
+    print_results,
+    run_workload,
+    sample_vocabulary,
+)
+from populate_usda_db import SEARCH_BM25_WEIGHTS
+
+
+# ==============================================================================
+# Query Builders
+# ==============================================================================
+
+def search_words(query: str) -> List[str]:
+    """Words the app would search for, reduced to FTS-safe tokens"""
+    words = []
+    for word in clean_search_query(query).split(" "):
+        if word and word not in STOPWORDS:
+            # Quotes, parentheses etc. are FTS5 syntax; keep letters and digits
+            token = re.sub(r"[^\w]+", "", word)
+            if token:
+                words.append(token)
+    return words
+
+
+def build_fts_search(
+    query: str,
+    limit: int = SEARCH_LIMIT,
+    weights: Tuple[float, ...] = SEARCH_BM25_WEIGHTS
+) -> Optional[Tuple[str, List]]:
+    """
+    food_search MATCH equivalent of the app's OR-of-words LIKE search
+
+    Every word becomes a prefix query ("chick"*), served by the prefix='2 3'
+    indexes for short words; bm25 ranks foods matching more (and rarer)
+    words higher, like the app's matched-word count but weighted by column.
+    """
+    words = search_words(query)
+    if not words:
+        return None
+
+    match = " OR ".join(f'"{word}"*' for word in words)
+    weight_args = ", ".join(str(w) for w in weights)
+    sql = f"""
+        SELECT f.fdc_id, f.description, f.common_name, f.category
+        FROM food_search
+        JOIN usda_foods f ON f.fdc_id = food_search.rowid
+        WHERE food_search MATCH ?
+        ORDER BY bm25(food_search, {weight_args})
+        LIMIT ?
+    """
+    return sql, [match, limit]
+
+
+def build_trigram_search(query: str, limit: int = SEARCH_LIMIT) -> Optional[Tuple[str, List]]:
+    """Substring search through food_search_trigram (words under 3 chars are dropped)"""
+    words = [word for word in search_words(query) if len(word) >= 3]
+    if not words:
+        return None
+
+    sql = """
+        SELECT f.fdc_id, f.description, f.common_name, f.category
+        FROM food_search_trigram
+        JOIN usda_foods f ON f.fdc_id = food_search_trigram.rowid
+        WHERE food_search_trigram MATCH ?
+        ORDER BY bm25(food_search_trigram)
+        LIMIT ?
+    """
+    return sql, [" OR ".join(f'"{word}"' for word in words), limit]
+
+
+BUILDERS = {
+    "like": build_like_search,
+    "fts": build_fts_search,
+    "trigram": build_trigram_search,
+}
+
+
+def has_table(conn: sqlite3.Connection, name: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone() is not None
+
+
+def search(conn: sqlite3.Connection, query: str, method: str = "fts", limit: int = SEARCH_LIMIT) -> List[tuple]:
+    """Run one search, returning (fdc_id, description, common_name, category) rows"""
+    built = BUILDERS[method](query, limit)
+    if built is None:
+        return []
+    return conn.execute(*built).fetchall()
+
+
+# ==============================================================================
+# Portions
+# ==============================================================================
+
+# Unit spellings -> the word USDA uses in modifier/unit
+UNIT_ALIASES = {
+    "cups": "cup", "c": "cup",
+    "tablespoon": "tbsp", "tablespoons": "tbsp", "tbs": "tbsp",
+    "teaspoon": "tsp", "teaspoons": "tsp",
+    "slices": "slice", "pieces": "piece", "pcs": "piece",
+    "ounce": "oz", "ounces": "oz",
+    "pats": "pat", "sticks": "stick", "cloves": "clove",
+    "medium": "medium", "large": "large", "small": "small",
+}
+
+# Preferred portion for a bare count ("2 eggs")
+DEFAULT_SIZES = ["medium", "large", "small"]
+
+QUANTITY_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?|\d+/\d+)\s+(.*)$")
+
+
+def parse_measure(text: str) -> Tuple[float, Optional[str], str]:
+    """Split "1 cup rice" into (1.0, "cup", "rice"); "2 eggs" into (2.0, None, "eggs")"""
+    match = QUANTITY_PATTERN.match(text.lower())
+    if not match:
+        return 1.0, None, text.strip()
+
+    raw_quantity, rest = match.groups()
+    if "/" in raw_quantity:
+        numerator, denominator = raw_quantity.split("/")
+        quantity = float(numerator) / float(denominator)
+    else:
+        quantity = float(raw_quantity)
+
+    first, _, remainder = rest.partition(" ")
+    unit = UNIT_ALIASES.get(first, first if first in UNIT_ALIASES.values() else None)
+    if unit and remainder:
+        return quantity, unit, remainder
+    return quantity, None, rest
+
+
+def portion_grams(
+    conn: sqlite3.Connection,
+    fdc_id: int,
+    quantity: float,
+    unit: Optional[str]
+) -> Optional[Dict[str, object]]:
+    """
+    Grams (and macros) for quantity × unit of a food, from food_portions
+
+    Matches the unit against the portion's unit or the leading word of its
+    modifier; a bare count prefers medium, then large, then small, then the
+    first listed portion. Returns None when nothing matches.
+    """
+    portions = conn.execute("""
+        SELECT description, amount, unit, modifier, gram_weight,
+               energy_kcal, protein_g, carbohydrate_g, fat_g
+        FROM food_portions WHERE fdc_id = ? ORDER BY sequence
+    """, (fdc_id,)).fetchall()
+    if not portions:
+        return None
+
+    def measure_word(portion) -> str:
+        return (portion[2] or (portion[3] or "").split(",")[0].split(" ")[0]).lower()
+
+    chosen = None
+    if unit:
+        chosen = next((p for p in portions if measure_word(p) == unit), None)
+    else:
+        for size in DEFAULT_SIZES:
+            chosen = next((p for p in portions if measure_word(p) == size), None)
+            if chosen:
+                break
+        chosen = chosen or portions[0]
+    if chosen is None:
+        return None
+
+    description, amount, _, _, gram_weight, *macros = chosen
+    factor = quantity / (amount or 1.0)
+    return {
+        "portion": description,
+        "grams": round(gram_weight * factor, 1),
+        "energy_kcal": round(macros[0] * factor, 1) if macros[0] is not None else None,
+        "protein_g": round(macros[1] * factor, 1) if macros[1] is not None else None,
+        "carbohydrate_g": round(macros[2] * factor, 1) if macros[2] is not None else None,
+        "fat_g": round(macros[3] * factor, 1) if macros[3] is not None else None,
+    }
+
+
+# ==============================================================================
+# Comparison
+# ==============================================================================
+
+def compare_methods(
+    conn: sqlite3.Connection,
+    queries: int = 50,
+    iterations: int = 200,
+    seed: int = 1234
+):
+    """Time every available method over the same sampled 1-3 word queries"""
+    rng = random.Random(seed)
+    vocabulary = sample_vocabulary(conn)
+    sampled = [" ".join(rng.sample(vocabulary, rng.randint(1, 3))) for _ in range(queries)]
+
+    methods = ["like", "fts"] + (["trigram"] if has_table(conn, "food_search_trigram") else [])
+    results = []
+    for method in methods:
+        cases = [built for q in sampled if (built := BUILDERS[method](q, SEARCH_LIMIT))]
+        results.append(run_workload(conn, Workload(method, cases), iterations=iterations))
+
+    print_results(results, show_plans=True)
+    like, fts = results[0], results[1]
+    if fts.p50_ms and like.p50_ms:
+        ratio = like.p50_ms / fts.p50_ms
+        comparison = f"{ratio:.1f}× faster" if ratio >= 1 else f"{1 / ratio:.1f}× slower"
+        print()
+        print(f"⚡ FTS5 p50 is {comparison} than LIKE "
+              f"({fts.p50_ms:.3f}ms vs {like.p50_ms:.3f}ms)")
+
+
+# ==============================================================================
+# CLI
+# ==============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Search a USDA database with FTS5 or the app's LIKE query")
+    parser.add_argument("query", nargs="*", help="Search query")
+    parser.add_argument("--db", default="Food1/Data/usda_nutrients.db", help="Database to search")
+    parser.add_argument("--method", choices=sorted(BUILDERS), default="fts", help="Search method (default: fts)")
+    parser.add_argument("--limit", type=int, default=10, help="Maximum results (default: 10)")
+    parser.add_argument("--compare", action="store_true", help="Benchmark LIKE vs FTS5 (vs trigram) latency")
+    parser.add_argument("--portion", help='Resolve a household measure to grams, e.g. "1 cup rice"')
+
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"❌ Database not found: {args.db}")
+        sys.exit(1)
+
+    conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    if not has_table(conn, "food_search"):
+        print("❌ No food_search index - rebuild with populate_usda_db.py")
+        sys.exit(1)
+
+    if args.compare:
+        compare_methods(conn)
+    elif args.portion:
+        quantity, unit, food = parse_measure(args.portion)
+        rows = search(conn, food, method=args.method, limit=1)
+        if not rows:
+            print(f"❌ No food found for '{food}'")
+            sys.exit(1)
+        fdc_id, description = rows[0][0], rows[0][1]
+        resolved = portion_grams(conn, fdc_id, quantity, unit)
+        if resolved is None:
+            print(f"❌ No {unit or 'household'} portion for [{fdc_id}] {description}")
+            sys.exit(1)
+        print(f"⚖️  {args.portion} → [{fdc_id}] {description}")
+        print(f"   {quantity:g} × {resolved['portion']} = {resolved['grams']} g, "
+              f"{resolved['energy_kcal']} kcal, P {resolved['protein_g']} g, "
+              f"C {resolved['carbohydrate_g']} g, F {resolved['fat_g']} g")
+    elif args.query:
+        query = " ".join(args.query)
+        start = time.perf_counter()
+        rows = search(conn, query, method=args.method, limit=args.limit)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"🔎 '{query}' via {args.method}: {len(rows)} results in {elapsed:.2f}ms")
+        for fdc_id, description, _, category in rows:
+            print(f"  - [{fdc_id}] {description} ({category})")
+    else:
+        parser.error("give a query or --compare")
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+-- Migration: Add Indexes for the Admin Dashboard Aggregates
+-- Apply MANUALLY, one statement at a time, outside a transaction (see below)
+--
+-- PURPOSE:
+-- Partial indexes over live (not soft-deleted) meals, so the aggregate
+-- functions in 20261016_add_admin_dashboard_aggregates.sql can scan just a
+-- time window, for all users or one user.
+--
+-- IMPORTANT:
+-- Built CONCURRENTLY so app sync writes to meals aren't blocked while the
+-- indexes build. CREATE INDEX CONCURRENTLY fails inside a transaction block,
+-- and both the Supabase CLI (db push) and the Dashboard SQL Editor send a
+-- file's statements as one batch/transaction. Run each CREATE INDEX below on
+-- its own, outside a transaction:
+--   - SQL Editor: paste and run ONE statement per execution
+--   - psql: psql "$DATABASE_URL" -c "CREATE INDEX CONCURRENTLY ..."
+--     (one -c per statement, no --single-transaction)
+--
+-- If a build fails it leaves an INVALID index behind, which IF NOT EXISTS
+-- would then skip. Drop it (DROP INDEX CONCURRENTLY <name>) and rerun.
+
+-- ============================================================================
+-- PART 1: Indexes for Time-Windowed Scans
+-- ============================================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_meals_live_timestamp
+ON meals(timestamp)
+WHERE deleted_at IS NULL;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_meals_live_user_timestamp
+ON meals(user_id, timestamp)
+WHERE deleted_at IS NULL;
+
+-- ============================================================================
+-- VERIFICATION QUERY (run after migration to confirm success):
+-- ============================================================================
+-- SELECT indexname, indexdef FROM pg_indexes
+-- WHERE tablename = 'meals' AND indexname LIKE 'idx_meals_live_%';
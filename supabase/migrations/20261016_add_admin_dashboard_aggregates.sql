@@ -0,0 +1,190 @@
+-- Migration: Add Aggregate Functions for the Admin Dashboard
+-- Apply via Supabase Dashboard SQL Editor or CLI
+--
+-- PURPOSE:
+-- The admin dashboard used to download every meal to count and group them
+-- in pandas. These functions return the aggregates directly, so each chart
+-- costs a few hundred rows instead of the whole meals table.
+--
+-- All functions take the same optional filters:
+--   p_user_id  - only this user's meals (NULL = all users)
+--   p_since    - only meals with timestamp >= p_since (NULL = all time)
+--
+-- Soft-deleted meals (deleted_at set) are always excluded.
+-- Days and hours are bucketed in UTC, matching the dashboard.
+--
+-- Called via PostgREST RPC (client.rpc) with the service role key only.
+--
+-- The supporting indexes are in their own migration
+-- (20261016_add_admin_dashboard_aggregate_indexes.sql) because they are
+-- built CONCURRENTLY: apply that file manually, one statement at a time,
+-- outside a transaction (see its header).
+
+-- ============================================================================
+-- PART 1: Meals in Scope
+-- ============================================================================
+
+-- Live meals matching the dashboard filters; every aggregate reads from this.
+-- Plain SQL so the planner inlines it. The time filter is a single range
+-- (COALESCE rather than OR) so it can use the partial indexes from
+-- 20261016_add_admin_dashboard_aggregate_indexes.sql.
+CREATE OR REPLACE FUNCTION admin_scoped_meals(
+    p_user_id UUID DEFAULT NULL,
+    p_since TIMESTAMPTZ DEFAULT NULL
+)
+RETURNS SETOF meals AS $$
+    SELECT *
+    FROM meals
+    WHERE deleted_at IS NULL
+      AND (p_user_id IS NULL OR user_id = p_user_id)
+      AND timestamp >= COALESCE(p_since, '-infinity');
+$$ LANGUAGE sql STABLE;
+
+-- ============================================================================
+-- PART 2: Activity Aggregates
+-- ============================================================================
+
+-- Meals per UTC day
+CREATE OR REPLACE FUNCTION admin_meals_per_day(
+    p_user_id UUID DEFAULT NULL,
+    p_since TIMESTAMPTZ DEFAULT NULL
+)
+RETURNS TABLE (date DATE, count BIGINT) AS $$
+    SELECT (timestamp AT TIME ZONE 'UTC')::date AS date, count(*) AS count
+    FROM admin_scoped_meals(p_user_id, p_since)
+    GROUP BY 1
+    ORDER BY 1;
+$$ LANGUAGE sql STABLE;
+
+-- Meals per (day of week, hour) for the heatmap; day_of_week 0 = Monday
+CREATE OR REPLACE FUNCTION admin_hourly_activity(
+    p_user_id UUID DEFAULT NULL,
+    p_since TIMESTAMPTZ DEFAULT NULL
+)
+RETURNS TABLE (day_of_week INT, hour INT, count BIGINT) AS $$
+    SELECT
+        extract(isodow FROM timestamp AT TIME ZONE 'UTC')::int - 1 AS day_of_week,
+        extract(hour FROM timestamp AT TIME ZONE 'UTC')::int AS hour,
+        count(*) AS count
+    FROM admin_scoped_meals(p_user_id, p_since)
+    GROUP BY 1, 2
+    ORDER BY 1, 2;
+$$ LANGUAGE sql STABLE;
+
+-- Headline numbers for the home page
+-- meals/active users over the last 7 and 30 days are counted from now(),
+-- within whatever p_since already allows
+CREATE OR REPLACE FUNCTION admin_activity_stats(
+    p_user_id UUID DEFAULT NULL,
+    p_since TIMESTAMPTZ DEFAULT NULL
+)
+RETURNS TABLE (
+    total_users BIGINT,
+    total_meals BIGINT,
+    total_ingredients BIGINT,
+    meals_last_7_days BIGINT,
+    meals_last_30_days BIGINT,
+    active_users_7d BIGINT,
+    active_users_30d BIGINT
+) AS $$
+    WITH scoped AS (
+        SELECT id, user_id, timestamp FROM admin_scoped_meals(p_user_id, p_since)
+    )
+    SELECT
+        (SELECT count(*) FROM profiles WHERE p_user_id IS NULL OR id = p_user_id),
+        (SELECT count(*) FROM scoped),
+        (SELECT count(*) FROM meal_ingredients mi JOIN scoped s ON s.id = mi.meal_id),
+        (SELECT count(*) FROM scoped WHERE timestamp >= now() - INTERVAL '7 days'),
+        (SELECT count(*) FROM scoped WHERE timestamp >= now() - INTERVAL '30 days'),
+        (SELECT count(DISTINCT user_id) FROM scoped WHERE timestamp >= now() - INTERVAL '7 days'),
+        (SELECT count(DISTINCT user_id) FROM scoped WHERE timestamp >= now() - INTERVAL '30 days');
+$$ LANGUAGE sql STABLE;
+
+-- ============================================================================
+-- PART 3: Distribution Aggregates
+-- ============================================================================
+
+-- Meals per meal type, with share of the typed total (0-100, one decimal)
+CREATE OR REPLACE FUNCTION admin_meal_type_distribution(
+    p_user_id UUID DEFAULT NULL,
+    p_since TIMESTAMPTZ DEFAULT NULL
+)
+RETURNS TABLE (meal_type TEXT, count BIGINT, percentage NUMERIC) AS $$
+    SELECT
+        meal_type,
+        count(*) AS count,
+        round(count(*) * 100.0 / sum(count(*)) OVER (), 1) AS percentage
+    FROM admin_scoped_meals(p_user_id, p_since)
+    WHERE meal_type IS NOT NULL
+    GROUP BY meal_type
+    ORDER BY count DESC;
+$$ LANGUAGE sql STABLE;
+
+-- Meals per sync status, with share of the total (meals with a status)
+CREATE OR REPLACE FUNCTION admin_sync_status_distribution(
+    p_user_id UUID DEFAULT NULL,
+    p_since TIMESTAMPTZ DEFAULT NULL
+)
+RETURNS TABLE (sync_status TEXT, count BIGINT, percentage NUMERIC) AS $$
+    SELECT
+        sync_status,
+        count(*) AS count,
+        round(count(*) * 100.0 / sum(count(*)) OVER (), 1) AS percentage
+    FROM admin_scoped_meals(p_user_id, p_since)
+    WHERE sync_status IS NOT NULL
+    GROUP BY sync_status
+    ORDER BY count DESC;
+$$ LANGUAGE sql STABLE;
+
+-- Average macros per meal type (NULLs ignored, like pandas mean)
+CREATE OR REPLACE FUNCTION admin_avg_macros_by_meal_type(
+    p_user_id UUID DEFAULT NULL,
+    p_since TIMESTAMPTZ DEFAULT NULL
+)
+RETURNS TABLE (
+    meal_type TEXT,
+    avg_calories NUMERIC,
+    avg_protein NUMERIC,
+    avg_carbs NUMERIC,
+    avg_fat NUMERIC
+) AS $$
+    SELECT
+        meal_type,
+        round(avg(total_calories)::numeric, 1),
+        round(avg(total_protein_g)::numeric, 1),
+        round(avg(total_carbs_g)::numeric, 1),
+        round(avg(total_fat_g)::numeric, 1)
+    FROM admin_scoped_meals(p_user_id, p_since)
+    WHERE meal_type IS NOT NULL
+    GROUP BY meal_type
+    ORDER BY meal_type;
+$$ LANGUAGE sql STABLE;
+
+-- ============================================================================
+-- PART 4: Restrict to the Service Role
+-- ============================================================================
+
+-- These aggregate across all users, so app users must not be able to call
+-- them (functions are executable by PUBLIC by default)
+REVOKE EXECUTE ON FUNCTION admin_scoped_meals(UUID, TIMESTAMPTZ) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION admin_meals_per_day(UUID, TIMESTAMPTZ) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION admin_hourly_activity(UUID, TIMESTAMPTZ) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION admin_activity_stats(UUID, TIMESTAMPTZ) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION admin_meal_type_distribution(UUID, TIMESTAMPTZ) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION admin_sync_status_distribution(UUID, TIMESTAMPTZ) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION admin_avg_macros_by_meal_type(UUID, TIMESTAMPTZ) FROM PUBLIC, anon, authenticated;
+
+GRANT EXECUTE ON FUNCTION admin_scoped_meals(UUID, TIMESTAMPTZ) TO service_role;
+GRANT EXECUTE ON FUNCTION admin_meals_per_day(UUID, TIMESTAMPTZ) TO service_role;
+GRANT EXECUTE ON FUNCTION admin_hourly_activity(UUID, TIMESTAMPTZ) TO service_role;
+GRANT EXECUTE ON FUNCTION admin_activity_stats(UUID, TIMESTAMPTZ) TO service_role;
+GRANT EXECUTE ON FUNCTION admin_meal_type_distribution(UUID, TIMESTAMPTZ) TO service_role;
+GRANT EXECUTE ON FUNCTION admin_sync_status_distribution(UUID, TIMESTAMPTZ) TO service_role;
+GRANT EXECUTE ON FUNCTION admin_avg_macros_by_meal_type(UUID, TIMESTAMPTZ) TO service_role;
+
+-- ============================================================================
+-- VERIFICATION QUERY (run after migration to confirm success):
+-- ============================================================================
+-- SELECT * FROM admin_activity_stats();
+-- SELECT * FROM admin_meals_per_day(NULL, now() - INTERVAL '30 days');
+-- SELECT * FROM admin_meal_type_distribution();